@@ -2,6 +2,7 @@ import cv2
 import numpy as np
 import time
 import threading
+import queue
 import os
 import signal
 import sys
@@ -12,15 +13,20 @@ from fingerprint_utils import FingerprintSensor
 from lcd_utils import LCD
 from selenoid_utils import Selenoid
 from database_utils import AccessDatabase
-from mtcnn_utils import detect_face_mtcnn
-from arcface_utils import preprocess_face, extract_embedding, compute_similarity
+from camera_service import CameraService
+from preview import get_preview
+from unknown_evidence import EvidenceRecorder, preroll_frames
+import mtcnn_utils
+import arcface_utils
+from face_tracker import FaceTracker
+from face_quality import FaceQualityGate
+from arcface_utils import preprocess_face, extract_embedding, embed_face, EmbeddingCache, compute_similarity
 from head_pose import calculate_face_orientation, is_face_frontal
 
 # Konstanta
 # Gunakan daftar kamera yang akan dicoba secara berurutan
 CAMERA_DEVICES = ['/dev/video1', '/dev/video2', 0]  # Coba /dev/video1 dulu, lalu /dev/video2, lalu indeks 0
 FACE_RECOGNITION_THRESHOLD = 0.6
-UNKNOWN_CAPTURE_DELAY = 2  # Delay capture 2 detik untuk wajah tidak dikenal
 ACCESS_TIMEOUT = 10  # Timeout 10 detik untuk verifikasi wajah setelah sidik jari
 
 class AccessControlSystem:
@@ -40,7 +46,23 @@ class AccessControlSystem:
         self.current_user = None
         self.face_verification_mode = False
         self.face_verification_start_time = 0
-        self.unknown_capture_timer = 0
+        
+        # Bukti wajah tidak dikenal dipilih dari pre-roll kamera dan disimpan di background;
+        # path yang tersimpan dicatat ke database oleh loop kamera
+        self.evidence = EvidenceRecorder()
+        self.unknown_evidence = queue.Queue()
+        
+        # MTCNN hanya dijalankan berkala; di antaranya wajah diikuti dengan optical flow
+        self.face_tracker = FaceTracker()
+        
+        # Crop buram, gelap/terlalu terang, kecil atau pose ekstrem tidak di-embed
+        self.quality_gate = FaceQualityGate()
+        
+        # Embedding crop yang hampir sama dipakai ulang selama EMBEDDING_CACHE_TTL detik
+        self.embedding_cache = EmbeddingCache()
+        
+        # Preview opsional dengan frame rate terbatas; headless (tanpa display) tidak menggambar apa pun
+        self.preview = get_preview()
         
         # Thread
         self.fingerprint_thread = None
@@ -50,6 +72,10 @@ class AccessControlSystem:
         """Inisialisasi semua komponen sistem"""
         print("Inisialisasi sistem kontrol akses...")
         
+        # Muat model wajah di background sementara database, LCD, dan sensor disiapkan
+        mtcnn_utils.warmup_in_background()
+        arcface_utils.warmup_in_background()
+        
         # Buat direktori jika belum ada
         os.makedirs('data', exist_ok=True)
         
@@ -87,27 +113,16 @@ class AccessControlSystem:
             print("Sistem sudah berjalan")
             return
         
-        # Inisialisasi kamera - coba semua device yang tersedia
-        self.cap = None
-        for device in self.camera_devices:
-            try:
-                print(f"Mencoba membuka kamera {device}...")
-                self.cap = cv2.VideoCapture(device)
-                if self.cap is not None and self.cap.isOpened():
-                    self.camera_index = device
-                    print(f"Berhasil membuka kamera {device}")
-                    break
-                else:
-                    print(f"Tidak dapat membuka kamera {device}")
-            except Exception as e:
-                print(f"Error saat membuka kamera {device}: {e}")
-                if self.cap:
-                    self.cap.release()
-                    self.cap = None
-        
-        if self.cap is None or not self.cap.isOpened():
+        # Inisialisasi kamera - coba semua device yang tersedia; kamera tetap terbuka
+        # selama sistem berjalan dan dibuka ulang otomatis jika terputus
+        self.cap = CameraService(self.camera_devices)
+        if not self.cap.open():
             print("GAGAL: Tidak dapat membuka kamera manapun")
             return False
+        self.camera_index = self.cap.device
+        
+        # Thread grabber menguras kamera ke ring buffer; loop kamera tidak lagi memblok capture
+        self.cap.start_grabber()
         
         self.running = True
         
@@ -146,8 +161,8 @@ class AccessControlSystem:
             self.camera_thread.join(timeout=1.0)
         
         # Tutup kamera jika terbuka
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
+        if self.cap:
+            self.cap.close()
         
         # Bersihkan komponen
         self.selenoid.cleanup()
@@ -155,7 +170,9 @@ class AccessControlSystem:
         self.lcd.backlight(False)
         self.db.close()
         
-        cv2.destroyAllWindows()
+        self.preview.close()
+        print(f"Gerbang kualitas: {self.quality_gate.summary()}")
+        print(f"Cache embedding: {self.embedding_cache.summary()}")
         print("Sistem kontrol akses dihentikan")
     
     def signal_handler(self, sig, frame):
@@ -209,8 +226,9 @@ class AccessControlSystem:
                         self.lcd.display("Sidik Jari", 1)
                         self.lcd.display("Tidak Dikenal!", 2)
                         
-                        # Aktifkan timer untuk mengambil gambar orang tidak dikenal
-                        self.unknown_capture_timer = time.time()
+                        # Frame wajah terbaik dari beberapa detik terakhir disimpan di background
+                        self.evidence.submit(preroll_frames(self.cap.handle()), self.db.unknown_dir,
+                                             on_saved=self.unknown_evidence.put)
                         
                         # Reset setelah beberapa detik
                         time.sleep(3)
@@ -223,20 +241,27 @@ class AccessControlSystem:
     
     def camera_process_loop(self):
         """Loop untuk memproses gambar dari kamera"""
+        camera = self.cap.handle()
         while self.running:
-            # Baca frame dari kamera
-            ret, frame = self.cap.read()
-            if not ret:
+            # Frame terbaru dari grabber (view read-only tanpa salinan); frame yang datang
+            # selama inferensi dilewati
+            timestamp, frame = camera.latest()
+            if frame is None:
                 print("Error: Gagal membaca frame dari kamera")
                 time.sleep(1)
                 continue
             
-            # Tampilkan frame (opsional, hapus jika tidak diperlukan)
-            if self.face_verification_mode:
-                cv2.imshow("Verifikasi Wajah", frame)
+            # Sesi verifikasi baru selalu dimulai dengan deteksi penuh
+            if not self.face_verification_mode:
+                self.face_tracker.reset()
+                self.embedding_cache.clear()
             
             # Jika dalam mode verifikasi wajah
             if self.face_verification_mode:
+                # Anotasi hanya dicatat jika frame ini akan ditampilkan preview (tidak pernah
+                # dalam mode headless); frame di ring buffer tidak disalin
+                overlay = self.preview.overlay()
+                
                 # Cek timeout
                 current_time = time.time()
                 if current_time - self.face_verification_start_time > ACCESS_TIMEOUT:
@@ -256,20 +281,23 @@ class AccessControlSystem:
                     self.lcd.display("Pada Sensor", 2)
                     
                     # Tutup jendela kamera
-                    cv2.destroyWindow("Verifikasi Wajah")
+                    self.preview.close_window("Verifikasi Wajah")
                     continue
                 
-                # Deteksi wajah
-                face_img, bbox = detect_face_mtcnn(frame)
+                # Deteksi wajah (MTCNN + tracking)
+                face_img, bbox = self.face_tracker.update(frame)
                 
                 if face_img is not None and bbox is not None:
-                    # Pra-pemrosesan wajah
-                    face_tensor = preprocess_face(face_img)
+                    quality_ok, quality_reason = self.quality_gate.check(
+                        face_img, bbox, self.face_tracker.landmarks, frame.shape)
+                    if not quality_ok:
+                        overlay.text(f"Kualitas rendah: {quality_reason}", 
+                                 (10, 90), 0.6, (0, 165, 255), 2)
                     
-                    if face_tensor is not None:
-                        # Ekstrak embedding
-                        embedding = extract_embedding(face_tensor)
-                        
+                    # Ekstrak embedding (crop yang hampir sama memakai cache)
+                    embedding = embed_face(face_img, bbox, self.embedding_cache) if quality_ok else None
+                    
+                    if embedding is not None:
                         # Dapatkan nama pengguna saat ini
                         current_name = self.current_user["name"]
                         
@@ -280,8 +308,8 @@ class AccessControlSystem:
                             similarity = compute_similarity(embedding, stored_embedding)
                             
                             # Tampilkan similarity
-                            cv2.putText(frame, f"Similarity: {similarity:.4f}", 
-                                     (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                            overlay.text(f"Similarity: {similarity:.4f}", 
+                                     (10, 30), 0.7, (0, 255, 0), 2)
                             
                             # Jika similarity di atas threshold
                             if similarity >= FACE_RECOGNITION_THRESHOLD:
@@ -314,46 +342,37 @@ class AccessControlSystem:
                                 self.lcd.display("Pada Sensor", 2)
                                 
                                 # Tutup jendela kamera
-                                cv2.destroyWindow("Verifikasi Wajah")
+                                self.preview.close_window("Verifikasi Wajah")
                             else:
                                 # Tampilkan di frame
-                                cv2.putText(frame, "Verifikasi wajah gagal", 
-                                         (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                                overlay.text("Verifikasi wajah gagal", 
+                                         (10, 60), 0.7, (0, 0, 255), 2)
                         else:
                             # Pengguna belum memiliki data wajah
-                            cv2.putText(frame, "Data wajah belum terdaftar", 
-                                     (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                            overlay.text("Data wajah belum terdaftar", 
+                                     (10, 30), 0.7, (0, 0, 255), 2)
                             
                             # Tanyakan apakah ingin mendaftarkan wajah
-                            cv2.putText(frame, "Tekan 'Y' untuk mendaftarkan wajah", 
-                                     (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+                            overlay.text("Tekan 'Y' untuk mendaftarkan wajah", 
+                                     (10, 60), 0.7, (255, 0, 0), 2)
                             
                             # Tampilkan pesan di LCD
                             self.lcd.clear()
                             self.lcd.display("Tidak Ada Data", 1)
                             self.lcd.display("Wajah Y=Daftar", 2)
                     
-                    # Update tampilan
-                    cv2.imshow("Verifikasi Wajah", frame)
+                # Update tampilan (thread preview, dibatasi PREVIEW_MAX_FPS); jendela yang sudah
+                # ditutup karena verifikasi selesai tidak dibuka lagi
+                if self.face_verification_mode:
+                    self.preview.submit("Verifikasi Wajah", frame, overlay)
             
-            # Jika timer untuk mengambil gambar orang tidak dikenal aktif
-            elif self.unknown_capture_timer > 0:
-                current_time = time.time()
-                if current_time - self.unknown_capture_timer > UNKNOWN_CAPTURE_DELAY:
-                    # Simpan gambar orang tidak dikenal
-                    image_path = self.db.save_unknown_face(frame)
-                    
-                    if image_path:
-                        print(f"Gambar orang tidak dikenal disimpan: {image_path}")
-                        
-                        # Log akses tidak dikenal
-                        self.db.log_unknown_access(image_path, None, "Sidik jari tidak dikenal")
-                    
-                    # Reset timer
-                    self.unknown_capture_timer = 0
+            # Catat bukti wajah tidak dikenal yang sudah disimpan oleh job background
+            while not self.unknown_evidence.empty():
+                image_path = self.unknown_evidence.get_nowait()
+                self.db.log_unknown_access(image_path, None, "Sidik jari tidak dikenal")
             
             # Handle keyboard input
-            key = cv2.waitKey(1) & 0xFF
+            key = self.preview.key()
             
             # Tekan 'q' untuk keluar
             if key == ord('q'):
@@ -371,8 +390,7 @@ class AccessControlSystem:
                         embedding = extract_embedding(face_tensor)
                         
                         # Simpan embedding dengan nama pengguna
-                        self.db.embeddings[self.current_user["name"]] = embedding
-                        self.db.save_embeddings()
+                        self.db.set_face_embedding(self.current_user["name"], embedding)
                         
                         print(f"Data wajah untuk {self.current_user['name']} berhasil didaftarkan")
                         
@@ -403,7 +421,7 @@ class AccessControlSystem:
                         self.lcd.display("Pada Sensor", 2)
                         
                         # Tutup jendela kamera
-                        cv2.destroyWindow("Verifikasi Wajah")
+                        self.preview.close_window("Verifikasi Wajah")
             
             # Delay untuk mengurangi beban CPU
             time.sleep(0.03)
@@ -3,8 +3,8 @@ import numpy as np
 import argparse
 import os
 import glob
-from mtcnn_utils import detect_face_mtcnn
-from arcface_utils import preprocess_face, extract_embedding, save_embeddings, load_embeddings
+from mtcnn_utils import detect_face_aligned
+from arcface_utils import preprocess_faces, extract_embeddings, set_embedding, load_embeddings
 from head_pose import calculate_face_orientation, is_face_frontal
 
 # Parsing argumen
@@ -36,9 +36,9 @@ def main():
     
     print(f"Ditemukan {len(photo_paths)} foto untuk diproses")
     
-    # Untuk menyimpan embedding dari semua foto yang valid
-    embeddings = []
-    valid_photos = 0
+    # Untuk menyimpan crop wajah dari semua foto yang valid (embedding diekstrak per batch)
+    face_crops = []
+    crop_paths = []
     
     # Proses setiap foto
     for i, photo_path in enumerate(photo_paths, 1):
@@ -52,7 +52,7 @@ def main():
             continue
         
         # Deteksi wajah
-        face_img, bbox = detect_face_mtcnn(image)
+        face_img, bbox, landmarks = detect_face_aligned(image)
         
         if face_img is None or bbox is None:
             print(f"  Tidak ditemukan wajah dalam foto: {photo_path}")
@@ -60,7 +60,7 @@ def main():
         
         # Jika opsi check_frontal aktif, cek apakah wajah frontal
         if args.check_frontal:
-            pitch, yaw, roll = calculate_face_orientation(bbox, image.shape)
+            pitch, yaw, roll = calculate_face_orientation(bbox, image.shape, landmarks)
             is_frontal = is_face_frontal(pitch, yaw, roll)
             
             if not is_frontal:
@@ -86,19 +86,11 @@ def main():
             else:
                 print(f"  Wajah frontal (pitch={pitch:.1f}, yaw={yaw:.1f}, roll={roll:.1f})")
         
-        # Praproses wajah untuk ArcFace
-        face_tensor = preprocess_face(face_img)
+        # Simpan crop wajah untuk diekstrak bersama foto lain
+        face_crops.append(face_img)
+        crop_paths.append(photo_path)
         
-        if face_tensor is None:
-            print(f"  Gagal memproses wajah dari foto: {photo_path}")
-            continue
-        
-        # Ekstrak embedding
-        embedding = extract_embedding(face_tensor)
-        embeddings.append(embedding)
-        valid_photos += 1
-        
-        print(f"  Embedding berhasil diekstrak dari foto {photo_path}")
+        print(f"  Wajah berhasil dideteksi pada foto {photo_path}")
         
         # Tampilkan hasil jika diminta
         if args.show_results:
@@ -121,6 +113,14 @@ def main():
     # Tutup semua jendela
     cv2.destroyAllWindows()
     
+    # Praproses dan ekstrak embedding semua wajah dalam batch
+    face_batch, valid_indices = preprocess_faces(face_crops)
+    for i in sorted(set(range(len(face_crops))) - set(valid_indices)):
+        print(f"  Gagal memproses wajah dari foto: {crop_paths[i]}")
+    
+    embeddings = extract_embeddings(face_batch)
+    valid_photos = len(embeddings)
+    
     # Jika tidak ada foto valid
     if valid_photos == 0:
         print("ERROR: Tidak ada foto valid untuk diproses.")
@@ -128,11 +128,10 @@ def main():
         return
     
     # Hitung rata-rata embedding
-    avg_embedding = np.mean(np.array(embeddings), axis=0)
+    avg_embedding = np.mean(embeddings, axis=0)
     
-    # Simpan ke database
-    embeddings_dict[args.name] = avg_embedding
-    save_embeddings(embeddings_dict, args.embeddings)
+    # Simpan ke database (satu record journal, tanpa menulis ulang galeri)
+    set_embedding(args.embeddings, args.name, avg_embedding)
     
     print(f"Berhasil menyimpan rata-rata embedding untuk '{args.name}' dari {valid_photos} foto")
     print(f"Gunakan 'python recognize_face.py' atau 'python recognize_from_photo.py' untuk pengenalan wajah")
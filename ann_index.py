@@ -0,0 +1,461 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Indeks ANN (approximate nearest neighbour) IVF untuk identifikasi wajah pada galeri besar.
+
+Embedding dikelompokkan dengan k-means (spherical, cosine) menjadi beberapa inverted list.
+Saat pencarian hanya `n_probe` list dengan centroid terdekat yang dipindai, lalu kandidat
+terbaik di-rerank secara exact oleh Gallery (lihat arcface_utils.py).
+
+Indeks disimpan di samping store embedding (`embeddings.ivf.npz` untuk path logis
+`embeddings.pkl`) beserta nomor urut journal terakhir yang sudah diterapkan, sehingga
+pendaftaran/penghapusan baru cukup diterapkan secara inkremental tanpa melatih ulang.
+"""
+
+import os
+import argparse
+import numpy as np
+
+import embedding_store
+
+# Galeri dengan jumlah template di bawah ini memakai pencarian exact saja
+ANN_MIN_GALLERY_SIZE = 5000
+
+# Jumlah inverted list yang dipindai per query
+DEFAULT_N_PROBE = 8
+
+# Jumlah kandidat orang yang di-rerank secara exact
+RERANK_CANDIDATES = 10
+
+# Pelatihan k-means
+KMEANS_ITERATIONS = 10
+KMEANS_MAX_TRAIN = 50000
+
+# Latih ulang centroid jika galeri tumbuh melebihi kelipatan ukuran saat dilatih
+RETRAIN_GROWTH = 4
+
+_ASSIGN_CHUNK = 4096
+
+def ivf_path(path):
+    """Path file indeks IVF untuk path embedding logis"""
+    return f"{os.path.splitext(path)[0]}.ivf.npz"
+
+def default_n_lists(size):
+    """Jumlah inverted list default (~akar jumlah template)"""
+    return int(min(max(round(np.sqrt(size)), 1), 4096))
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def _nearest_centroid(vectors, centroids):
+    """Indeks centroid terdekat (cosine) untuk setiap baris, diproses per potongan"""
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        chunk = vectors[start:start + _ASSIGN_CHUNK]
+        assignment[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+def kmeans(vectors, n_clusters, iterations=KMEANS_ITERATIONS, seed=0):
+    """
+    Spherical k-means untuk vektor yang sudah dinormalisasi
+
+    Args:
+        vectors (numpy.ndarray): Matriks (N, D) ternormalisasi
+        n_clusters (int): Jumlah cluster
+        iterations (int): Jumlah iterasi
+        seed (int): Seed random
+
+    Returns:
+        numpy.ndarray: Centroid ternormalisasi (n_clusters, D)
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = _nearest_centroid(vectors, centroids)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=n_clusters)
+
+        # Cluster kosong diisi ulang dengan titik acak
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+
+        centroids = _normalize(sums)
+
+    return centroids
+
+class IVFIndex:
+    """
+    Indeks IVF dengan inverted list berisi label orang dan vektor float16
+
+    Vektor disimpan dalam float16 untuk menghemat memori; skor dari indeks hanya
+    dipakai untuk memilih kandidat, skor akhir dihitung exact oleh Gallery.
+    """
+
+    def __init__(self, centroids):
+        """
+        Args:
+            centroids (numpy.ndarray): Centroid ternormalisasi (L, D)
+        """
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        dim = self.centroids.shape[1]
+        self.list_labels = [np.empty(0, dtype=np.int32) for _ in range(self.n_lists)]
+        self.list_vectors = [np.empty((0, dim), dtype=np.float16) for _ in range(self.n_lists)]
+        self.names = []            # label -> nama (None jika sudah dihapus)
+        self._labels = {}          # nama -> label
+        self._person_lists = {}    # nama -> set list yang berisi template orang tersebut
+        self.applied_seq = 0       # nomor urut journal terakhir yang sudah diterapkan
+        self.trained_size = 0      # jumlah template saat centroid dilatih
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @property
+    def dim(self):
+        return self.centroids.shape[1]
+
+    @property
+    def size(self):
+        """Jumlah total template dalam indeks"""
+        return sum(len(labels) for labels in self.list_labels)
+
+    def __len__(self):
+        """Jumlah orang dalam indeks"""
+        return len(self._labels)
+
+    def __contains__(self, name):
+        return name in self._labels
+
+    @classmethod
+    def train(cls, vectors, n_lists=None, iterations=KMEANS_ITERATIONS, seed=0):
+        """
+        Melatih centroid dari sampel vektor (tanpa menambahkan vektor ke indeks)
+
+        Args:
+            vectors (numpy.ndarray): Matriks embedding (N, D)
+            n_lists (int): Jumlah inverted list (default: ~akar N)
+
+        Returns:
+            IVFIndex: Indeks kosong dengan centroid terlatih
+        """
+        vectors = _normalize(vectors)
+        n_lists = n_lists or default_n_lists(len(vectors))
+
+        rng = np.random.default_rng(seed)
+        if len(vectors) > KMEANS_MAX_TRAIN:
+            sample = vectors[rng.choice(len(vectors), KMEANS_MAX_TRAIN, replace=False)]
+        else:
+            sample = vectors
+
+        index = cls(kmeans(sample, n_lists, iterations, seed))
+        index.trained_size = len(vectors)
+        return index
+
+    def _label_for(self, name):
+        label = self._labels.get(name)
+        if label is None:
+            label = len(self.names)
+            self.names.append(name)
+            self._labels[name] = label
+            self._person_lists[name] = set()
+        return label
+
+    def add_many(self, names, templates_list):
+        """
+        Menambahkan template banyak orang sekaligus
+
+        Args:
+            names (list): Nama orang
+            templates_list (list): Matriks template (k, D) per orang
+        """
+        labels = []
+        blocks = []
+        for name, templates in zip(names, templates_list):
+            templates = np.asarray(templates, dtype=np.float32)
+            if templates.size == 0:
+                continue
+            templates = templates.reshape(-1, self.dim)
+            labels.append(np.full(len(templates), self._label_for(name), dtype=np.int32))
+            blocks.append(templates)
+
+        if not blocks:
+            return
+
+        labels = np.concatenate(labels)
+        vectors = _normalize(np.concatenate(blocks, axis=0))
+        assignment = _nearest_centroid(vectors, self.centroids)
+
+        order = np.argsort(assignment, kind='stable')
+        lists, starts = np.unique(assignment[order], return_index=True)
+        stops = np.append(starts[1:], len(order))
+
+        for list_id, start, stop in zip(lists, starts, stops):
+            rows = order[start:stop]
+            self.list_labels[list_id] = np.concatenate([self.list_labels[list_id], labels[rows]])
+            self.list_vectors[list_id] = np.concatenate(
+                [self.list_vectors[list_id], vectors[rows].astype(np.float16)], axis=0)
+            for label in np.unique(labels[rows]):
+                self._person_lists[self.names[label]].add(int(list_id))
+
+    def add(self, name, templates):
+        """Menambahkan template untuk satu orang (template lama tetap ada)"""
+        self.add_many([name], [templates])
+
+    def remove(self, name):
+        """Menghapus semua template milik satu orang"""
+        label = self._labels.pop(name, None)
+        if label is None:
+            return
+        for list_id in self._person_lists.pop(name):
+            keep = self.list_labels[list_id] != label
+            self.list_labels[list_id] = self.list_labels[list_id][keep]
+            self.list_vectors[list_id] = self.list_vectors[list_id][keep]
+        self.names[label] = None
+
+    def replace(self, name, templates):
+        """Mengganti semua template milik satu orang"""
+        self.remove(name)
+        self.add(name, templates)
+
+    def clear(self):
+        """Mengosongkan indeks (centroid tetap)"""
+        trained_size = self.trained_size
+        self.__init__(self.centroids)
+        self.trained_size = trained_size
+
+    def search(self, embedding, k=RERANK_CANDIDATES, n_probe=DEFAULT_N_PROBE):
+        """
+        Mencari kandidat orang terdekat
+
+        Args:
+            embedding (numpy.ndarray): Embedding query
+            k (int): Jumlah kandidat orang
+            n_probe (int): Jumlah inverted list yang dipindai
+
+        Returns:
+            list: List (nama, similarity perkiraan) terurut menurun
+        """
+        if self.size == 0 or k <= 0:
+            return []
+
+        query = _normalize(embedding)[0]
+        if query.shape[0] != self.dim:
+            return []
+
+        n_probe = min(n_probe, self.n_lists)
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+
+        labels = np.concatenate([self.list_labels[i] for i in probe])
+        if len(labels) == 0:
+            return []
+        vectors = np.concatenate([self.list_vectors[i] for i in probe], axis=0)
+        scores = vectors.astype(np.float32) @ query
+
+        # Similarity per orang = similarity template terbaiknya
+        people, inverse = np.unique(labels, return_inverse=True)
+        per_person = np.full(len(people), -np.inf, dtype=np.float32)
+        np.maximum.at(per_person, inverse, scores)
+
+        k = min(k, len(people))
+        best = np.argpartition(-per_person, k - 1)[:k]
+        best = best[np.argsort(-per_person[best])]
+        return [(self.names[people[i]], float(per_person[i])) for i in best]
+
+    def apply_records(self, records):
+        """Menerapkan record journal (add/replace/delete) dari embedding_store"""
+        for op, name, templates, _ in records:
+            if op == embedding_store.OP_DELETE:
+                self.remove(name)
+            elif op == embedding_store.OP_ADD:
+                self.add(name, templates)
+            else:
+                self.replace(name, templates)
+
+    def rebuild(self, store):
+        """Mengisi ulang indeks dari seluruh isi store (centroid tetap)"""
+        self.clear()
+        names = store.names
+        self.add_many(names, [store.get_templates(name) for name in names])
+        self.applied_seq = store.last_seq
+
+    def sync(self, path, store=None):
+        """
+        Menyinkronkan indeks dengan store embedding
+
+        Record journal setelah applied_seq diterapkan secara inkremental. Jika
+        record tersebut sudah terlipat ke snapshot (compaction atau tulis ulang
+        penuh), semua template dimasukkan ulang ke centroid yang sama.
+
+        Args:
+            path (str): Path embedding logis
+            store (EmbeddingStore): Store yang sudah dibuka (opsional)
+
+        Returns:
+            bool: True jika indeks berubah
+        """
+        store = store or embedding_store.open_store(path)
+        if store is None:
+            return False
+
+        if self.applied_seq < store.journal_seq:
+            self.rebuild(store)
+            return True
+
+        records, last_seq = embedding_store.read_journal(path, self.applied_seq)
+        if not records:
+            return False
+        self.apply_records(records)
+        self.applied_seq = last_seq
+        return True
+
+    def save(self, file_path):
+        """Menyimpan indeks lewat file sementara + rename"""
+        # Padatkan label agar nama yang sudah dihapus tidak ikut tersimpan
+        names = list(self._labels)
+        remap = np.full(len(self.names) + 1, -1, dtype=np.int32)
+        for new_label, name in enumerate(names):
+            remap[self._labels[name]] = new_label
+
+        list_sizes = np.array([len(labels) for labels in self.list_labels], dtype=np.int64)
+        labels = np.concatenate(self.list_labels) if self.n_lists else np.empty(0, dtype=np.int32)
+        vectors = np.concatenate(self.list_vectors, axis=0)
+
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f,
+                     centroids=self.centroids,
+                     names=np.array(names, dtype=str),
+                     list_sizes=list_sizes,
+                     labels=remap[labels],
+                     vectors=vectors,
+                     applied_seq=np.int64(self.applied_seq),
+                     trained_size=np.int64(self.trained_size))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path):
+        """Memuat indeks dari file"""
+        with np.load(file_path, allow_pickle=False) as data:
+            index = cls(data['centroids'])
+            index.names = [str(name) for name in data['names']]
+            index._labels = {name: label for label, name in enumerate(index.names)}
+            index._person_lists = {name: set() for name in index.names}
+
+            bounds = np.concatenate([[0], np.cumsum(data['list_sizes'])])
+            labels = data['labels'].astype(np.int32)
+            vectors = data['vectors']
+            for list_id in range(index.n_lists):
+                start, stop = bounds[list_id], bounds[list_id + 1]
+                index.list_labels[list_id] = labels[start:stop]
+                index.list_vectors[list_id] = vectors[start:stop]
+                for label in np.unique(labels[start:stop]):
+                    index._person_lists[index.names[label]].add(list_id)
+
+            index.applied_seq = int(data['applied_seq'])
+            index.trained_size = int(data['trained_size'])
+        return index
+
+def build_index(store, n_lists=None):
+    """
+    Melatih dan mengisi indeks IVF dari seluruh isi store
+
+    Args:
+        store (EmbeddingStore): Store embedding yang sudah dibuka
+        n_lists (int): Jumlah inverted list (default: ~akar jumlah template)
+
+    Returns:
+        IVFIndex: Indeks baru, None jika store kosong
+    """
+    names = store.names
+    blocks = [store.get_templates(name) for name in names]
+    blocks = [block for block in blocks if len(block)]
+    if not blocks:
+        return None
+
+    index = IVFIndex.train(np.concatenate(blocks, axis=0), n_lists)
+    index.rebuild(store)
+    return index
+
+def load_index(path):
+    """
+    Memuat indeks IVF untuk store embedding dan menyinkronkannya
+
+    Indeks dibangun (dan dilatih) jika belum ada, rusak, atau galeri sudah tumbuh
+    jauh melebihi ukuran saat centroid dilatih. Indeks yang berubah langsung disimpan.
+
+    Args:
+        path (str): Path embedding logis
+
+    Returns:
+        IVFIndex: Indeks yang sudah sinkron, None jika store kosong/tidak ada
+    """
+    store = embedding_store.open_store(path)
+    if store is None:
+        return None
+
+    file_path = ivf_path(path)
+    index = None
+    if os.path.exists(file_path):
+        try:
+            index = IVFIndex.load(file_path)
+        except Exception as e:
+            print(f"[!] Indeks IVF {file_path} tidak dapat dibaca, membangun ulang: {e}")
+
+    total = sum(store.counts)
+    if index is None or total > RETRAIN_GROWTH * max(index.trained_size, 1):
+        index = build_index(store)
+        if index is None:
+            return None
+        changed = True
+    else:
+        changed = index.sync(path, store)
+
+    if changed:
+        try:
+            index.save(file_path)
+        except OSError as e:
+            print(f"[!] Gagal menyimpan indeks IVF {file_path}: {e}")
+
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description='Bangun dan inspeksi indeks ANN (IVF) untuk store embedding')
+    parser.add_argument('--embeddings', type=str, default='embeddings.pkl', help='Path embedding logis')
+    parser.add_argument('--rebuild', action='store_true', help='Latih ulang centroid dan bangun ulang indeks')
+    parser.add_argument('--n-lists', type=int, default=None, help='Jumlah inverted list (default: ~akar jumlah template)')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        store = embedding_store.open_store(args.embeddings)
+        index = build_index(store, args.n_lists) if store is not None else None
+        if index is not None:
+            index.save(ivf_path(args.embeddings))
+    else:
+        index = load_index(args.embeddings)
+
+    if index is None:
+        print(f"[!] Store embedding {args.embeddings} kosong atau tidak ditemukan")
+        return
+
+    sizes = [len(labels) for labels in index.list_labels]
+    print(f"Indeks: {ivf_path(args.embeddings)}")
+    print(f"Jumlah orang: {len(index)}, template: {index.size}, list: {index.n_lists}")
+    print(f"Ukuran list min/rata-rata/maks: {min(sizes)}/{np.mean(sizes):.1f}/{max(sizes)}")
+    print(f"Nomor urut journal diterapkan: {index.applied_seq}")
+
+if __name__ == "__main__":
+    main()
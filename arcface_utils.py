@@ -1,83 +1,582 @@
 import cv2
 import numpy as np
-import torch
-from facenet_pytorch import InceptionResnetV1
-import pickle
 import os
+import time
+import threading
+from collections import OrderedDict
+import importlib.util
+import embedding_store
+import ann_index
 
-# Inisialisasi model ArcFace (InceptionResnetV1 dengan pretrained weights 'vggface2')
-device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
-arcface_model = InceptionResnetV1(pretrained='vggface2').eval().to(device)
+# Cek dependensi tanpa mengimpornya; torch/onnxruntime baru diimpor saat model pertama kali dipakai
+TORCH_AVAILABLE = importlib.util.find_spec('torch') is not None and importlib.util.find_spec('facenet_pytorch') is not None
+ONNX_AVAILABLE = importlib.util.find_spec('onnxruntime') is not None
+if not TORCH_AVAILABLE and not ONNX_AVAILABLE:
+    raise ImportError("arcface_utils membutuhkan torch + facenet_pytorch atau onnxruntime")
 
-def preprocess_face(face_img, target_size=(160, 160)):
+# Backend inferensi ArcFace: 'torch' (PyTorch eager) atau 'onnx' (onnxruntime CPU,
+# model dibuat sekali dengan export_arcface_onnx.py)
+ARCFACE_BACKEND = 'torch'
+ONNX_MODEL_PATH = 'models/arcface_vggface2.onnx'
+ONNX_NUM_THREADS = 0  # 0 = jumlah thread default onnxruntime
+
+# Varian int8 untuk backend torch (dibuat dengan quantize_arcface.py). Aktifkan per
+# deployment setelah dicek dengan evaluate_quantized_arcface.py
+ARCFACE_QUANTIZED = False
+QUANTIZED_MODEL_PATH = 'models/arcface_vggface2_int8.pt'
+
+# Model ArcFace dan backend dibuat saat pertama kali dibutuhkan (lihat get_backend)
+_arcface_model = None
+_device = None
+_model_lock = threading.Lock()
+_backend = None
+_backend_lock = threading.Lock()
+
+# Dimensi embedding dan ukuran batch maksimal per forward pass ArcFace
+EMBEDDING_DIM = 512
+MAX_BATCH_SIZE = 16
+
+# Cache embedding untuk frame yang hampir sama (orang diam di depan kamera). Entri berlaku
+# EMBEDDING_CACHE_TTL detik sejak embedding dihitung, jadi wajah yang berganti paling
+# lambat terdeteksi setelah TTL. 0 = cache nonaktif
+EMBEDDING_CACHE_SIZE = 32
+EMBEDDING_CACHE_TTL = 1.0
+
+# Sidik jari crop: difference hash (dHash) HASH_SIZE x HASH_SIZE bit dari crop grayscale
+# yang diperkecil. Crop dianggap sama jika proporsi bit yang berbeda <= MAX_DISTANCE dan
+# box bergeser/berubah ukuran <= MAX_SHIFT (relatif terhadap ukuran box)
+EMBEDDING_CACHE_HASH_SIZE = 16
+EMBEDDING_CACHE_MAX_DISTANCE = 0.1
+EMBEDDING_CACHE_MAX_SHIFT = 0.1
+
+# Interval pengecekan perubahan file embedding oleh GalleryCache (detik)
+GALLERY_RELOAD_INTERVAL = 2.0
+
+def get_arcface_model():
     """
-    Pra-pemrosesan wajah untuk model ArcFace
+    Mengambil model ArcFace bersama (dibuat sekali, aman dipanggil dari banyak thread)
     
-    Args:
-        face_img (numpy.ndarray): Gambar wajah
-        target_size (tuple): Ukuran target untuk model
-        
     Returns:
-        torch.Tensor: Tensor wajah yang telah diproses
+        InceptionResnetV1: Model dalam mode eval di device yang tersedia
     """
-    try:
-        if face_img is None or not isinstance(face_img, np.ndarray):
-            print("[!] Input face_img tidak valid (None atau bukan numpy array)")
-            return None
+    global _arcface_model, _device
+    if _arcface_model is None:
+        with _model_lock:
+            if _arcface_model is None:
+                import torch
+                from facenet_pytorch import InceptionResnetV1
+                
+                # Inisialisasi model ArcFace (InceptionResnetV1 dengan pretrained weights 'vggface2')
+                device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
+                model = InceptionResnetV1(pretrained='vggface2').eval().to(device)
+                _device = device
+                _arcface_model = model
+    return _arcface_model
+
+def get_device():
+    """Device tempat model ArcFace berjalan (memuat model jika belum)"""
+    get_arcface_model()
+    return _device
+
+class TorchBackend:
+    """Inferensi ArcFace dengan PyTorch (InceptionResnetV1 dari facenet_pytorch)"""
+    
+    name = 'torch'
+    
+    def __init__(self):
+        self.model = get_arcface_model()
+        self.device = get_device()
+    
+    def run(self, batch):
+        """
+        Args:
+            batch (numpy.ndarray): Batch wajah float32 (N, 3, 160, 160)
             
-        # Cek dimensi gambar
-        if len(face_img.shape) != 3:
-            print(f"[!] Dimensi gambar tidak valid: {face_img.shape}")
-            return None
+        Returns:
+            numpy.ndarray: Embedding (N, 512)
+        """
+        import torch
+        with torch.no_grad():
+            return self.model(torch.from_numpy(batch).to(self.device)).cpu().numpy()
+
+class OnnxBackend:
+    """Inferensi ArcFace dengan onnxruntime (CPUExecutionProvider)"""
+    
+    name = 'onnx'
+    
+    def __init__(self, model_path=ONNX_MODEL_PATH, num_threads=ONNX_NUM_THREADS):
+        import onnxruntime as ort
+        
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model ONNX {model_path} tidak ditemukan, jalankan export_arcface_onnx.py")
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+    
+    def run(self, batch):
+        """
+        Args:
+            batch (numpy.ndarray): Batch wajah float32 (N, 3, 160, 160)
             
-        # Cek ukuran gambar
-        if face_img.shape[0] <= 0 or face_img.shape[1] <= 0:
-            print(f"[!] Ukuran gambar tidak valid: {face_img.shape}")
-            return None
+        Returns:
+            numpy.ndarray: Embedding (N, 512)
+        """
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+def quantized_engine():
+    """Engine kuantisasi torch sesuai arsitektur CPU (qnnpack untuk ARM, fbgemm untuk x86)"""
+    import platform
+    machine = platform.machine().lower()
+    return 'qnnpack' if machine.startswith(('arm', 'aarch')) else 'fbgemm'
+
+class QuantizedTorchBackend:
+    """Inferensi ArcFace int8 dengan model TorchScript hasil quantize_arcface.py (CPU)"""
+    
+    name = 'torch_int8'
+    
+    def __init__(self, model_path=QUANTIZED_MODEL_PATH):
+        import torch
+        
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model int8 {model_path} tidak ditemukan, jalankan quantize_arcface.py")
+        
+        torch.backends.quantized.engine = quantized_engine()
+        self.model_path = model_path
+        self.model = torch.jit.load(model_path, map_location='cpu').eval()
+    
+    def run(self, batch):
+        """
+        Args:
+            batch (numpy.ndarray): Batch wajah float32 (N, 3, 160, 160)
             
-        # Resize gambar dengan error handling
+        Returns:
+            numpy.ndarray: Embedding (N, 512)
+        """
+        import torch
+        with torch.no_grad():
+            return self.model(torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32))).numpy()
+
+BACKENDS = {
+    'torch': TorchBackend,
+    'torch_int8': QuantizedTorchBackend,
+    'onnx': OnnxBackend,
+}
+
+def selected_backend_name():
+    """Nama backend sesuai konfigurasi ARCFACE_BACKEND dan ARCFACE_QUANTIZED"""
+    if ARCFACE_QUANTIZED and ARCFACE_BACKEND == 'torch':
+        return 'torch_int8'
+    return ARCFACE_BACKEND
+
+def create_backend(name):
+    """
+    Membuat backend inferensi baru (tanpa cache, dipakai juga oleh skrip benchmark)
+    
+    Args:
+        name (str): Nama backend (lihat BACKENDS)
+        
+    Returns:
+        object: Backend dengan method run(batch)
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend ArcFace tidak dikenal: {name} (pilihan: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+def get_backend():
+    """
+    Mengambil backend inferensi bersama sesuai ARCFACE_BACKEND (dan ARCFACE_QUANTIZED)
+    
+    Jika backend yang dipilih tidak tersedia (modul atau file model tidak ada),
+    backend torch dipakai sebagai cadangan.
+    
+    Returns:
+        object: Backend dengan method run(batch)
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = selected_backend_name()
+                try:
+                    backend = create_backend(name)
+                except (ImportError, FileNotFoundError) as e:
+                    if name == 'torch' or not TORCH_AVAILABLE:
+                        raise
+                    print(f"[!] Backend ArcFace '{name}' tidak tersedia ({e}), memakai torch")
+                    backend = TorchBackend()
+                _backend = backend
+    return _backend
+
+def warmup():
+    """Memuat backend ArcFace dan menjalankan satu forward pass dummy"""
+    get_backend().run(np.zeros((1, 3, 160, 160), dtype=np.float32))
+
+def warmup_in_background():
+    """
+    Menjalankan warmup() di thread background
+    
+    Returns:
+        threading.Thread: Thread warmup
+    """
+    def run():
         try:
-            face_img = cv2.resize(face_img, target_size)
-        except cv2.error as e:
-            print(f"[!] Error resize gambar: {e}")
-            return None
+            warmup()
+        except Exception as e:
+            print(f"[!] Gagal memuat model ArcFace: {e}")
+    
+    thread = threading.Thread(target=run, name="arcface-warmup")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+def __getattr__(name):
+    # Kompatibilitas untuk kode lama yang memakai arcface_utils.arcface_model / arcface_utils.device
+    if name == 'arcface_model':
+        return get_arcface_model()
+    if name == 'device':
+        return get_device()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _valid_face(face_img):
+    """Validasi input gambar wajah (mencetak alasan jika tidak valid)"""
+    if face_img is None or not isinstance(face_img, np.ndarray):
+        print("[!] Input face_img tidak valid (None atau bukan numpy array)")
+        return False
         
-        # Konversi BGR ke RGB
-        face_img = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
+    # Cek dimensi gambar
+    if len(face_img.shape) != 3 or face_img.shape[2] != 3:
+        print(f"[!] Dimensi gambar tidak valid: {face_img.shape}")
+        return False
         
-        # Normalisasi (0-255 -> 0-1)
-        face_img = face_img / 255.0
+    # Cek ukuran gambar
+    if face_img.shape[0] <= 0 or face_img.shape[1] <= 0:
+        print(f"[!] Ukuran gambar tidak valid: {face_img.shape}")
+        return False
+    
+    return True
+
+class FacePreprocessor:
+    """
+    Pra-pemrosesan wajah ke buffer float32 yang dialokasikan sekali
+    
+    Resize dan normalisasi (0-255 -> 0-1) ditulis ke buffer kerja yang dipakai ulang,
+    lalu konversi BGR->RGB dan perubahan layout HWC->CHW dilakukan dalam satu salinan
+    langsung ke buffer input model (N, 3, H, W). Hasil process() adalah view
+    ke buffer tersebut, sehingga torch.from_numpy / onnxruntime memakainya tanpa
+    salinan. View hanya valid sampai process() berikutnya; satu instance untuk satu thread.
+    """
+    
+    def __init__(self, target_size=(160, 160), max_batch_size=MAX_BATCH_SIZE):
+        """
+        Args:
+            target_size (tuple): Ukuran target (lebar, tinggi)
+            max_batch_size (int): Kapasitas awal buffer (diperbesar otomatis jika perlu)
+        """
+        self.target_size = tuple(target_size)
+        width, height = self.target_size
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self._scaled = np.empty((height, width, 3), dtype=np.float32)
+        self._batch = np.empty((max_batch_size, 3, height, width), dtype=np.float32)
+        self._scale = np.float32(1.0 / 255.0)
+    
+    def _ensure_capacity(self, batch_size):
+        if batch_size > len(self._batch):
+            self._batch = np.empty((batch_size,) + self._batch.shape[1:], dtype=np.float32)
+    
+    def _write(self, face_img, out):
+        """Resize + BGR->RGB + normalisasi satu wajah langsung ke out (3, H, W)"""
+        width, height = self.target_size
+        if face_img.shape[0] != height or face_img.shape[1] != width:
+            face_img = cv2.resize(face_img, self.target_size, dst=self._resized)
+        
+        # Normalisasi pada layout HWC yang kontigu (jauh lebih cepat daripada pada view
+        # ter-transpose), lalu BGR->RGB + HWC->CHW dalam satu salinan ke buffer model
+        np.multiply(face_img, self._scale, out=self._scaled, dtype=np.float32)
+        np.copyto(out, self._scaled[:, :, ::-1].transpose((2, 0, 1)))
+    
+    def process(self, face_imgs):
+        """
+        Memproses list wajah ke buffer batch
+        
+        Args:
+            face_imgs (list): List gambar wajah BGR (numpy.ndarray)
+            
+        Returns:
+            tuple: (batch, valid_indices) dengan batch view float32 (N, 3, H, W) berisi
+                   wajah yang valid saja (None jika tidak ada)
+        """
+        self._ensure_capacity(len(face_imgs))
+        valid_indices = []
         
-        # Konversi ke tensor
-        face_tensor = torch.from_numpy(face_img.transpose((2, 0, 1))).float()
+        for i, face_img in enumerate(face_imgs):
+            if not _valid_face(face_img):
+                continue
+            try:
+                self._write(face_img, self._batch[len(valid_indices)])
+            except cv2.error as e:
+                print(f"[!] Error resize gambar: {e}")
+                continue
+            valid_indices.append(i)
         
-        # Tambahkan dimensi batch
-        face_tensor = face_tensor.unsqueeze(0)
+        if not valid_indices:
+            return None, valid_indices
         
-        return face_tensor
+        return self._batch[:len(valid_indices)], valid_indices
+
+_local = threading.local()
+
+def get_preprocessor(target_size=(160, 160)):
+    """FacePreprocessor milik thread saat ini (dibuat sekali per thread)"""
+    preprocessor = getattr(_local, 'preprocessor', None)
+    if preprocessor is None or preprocessor.target_size != tuple(target_size):
+        preprocessor = FacePreprocessor(target_size)
+        _local.preprocessor = preprocessor
+    return preprocessor
+
+def preprocess_faces(face_imgs, target_size=(160, 160)):
+    """
+    Pra-pemrosesan banyak wajah sekaligus menjadi satu batch
+    
+    Hasil adalah view ke buffer FacePreprocessor milik thread ini dan ditimpa oleh
+    panggilan preprocess berikutnya; salin (.copy()) jika perlu disimpan lebih lama.
+    
+    Args:
+        face_imgs (list): List gambar wajah (numpy.ndarray)
+        target_size (tuple): Ukuran target untuk model
         
+    Returns:
+        tuple: (batch, valid_indices) dengan batch float32 (N, 3, H, W) berisi
+               wajah yang valid saja (None jika tidak ada) dan valid_indices posisinya
+               di list input
+    """
+    try:
+        return get_preprocessor(target_size).process(face_imgs)
     except Exception as e:
-        print(f"[!] Error dalam preprocess_face: {e}")
-        return None
+        print(f"[!] Error dalam preprocess_faces: {e}")
+        return None, []
+
+def preprocess_face(face_img, target_size=(160, 160)):
+    """
+    Pra-pemrosesan wajah untuk model ArcFace
+    
+    Args:
+        face_img (numpy.ndarray): Gambar wajah
+        target_size (tuple): Ukuran target untuk model
+        
+    Returns:
+        numpy.ndarray: Batch wajah float32 yang telah diproses (1, 3, H, W),
+                       view ke buffer yang dipakai ulang (lihat preprocess_faces)
+    """
+    face_tensor, _ = preprocess_faces([face_img], target_size)
+    return face_tensor
+
+def extract_embeddings(face_batch, max_batch_size=MAX_BATCH_SIZE, backend=None):
+    """
+    Ekstrak embedding banyak wajah dengan forward pass ber-batch
+    
+    Args:
+        face_batch (numpy.ndarray): Batch wajah (N, 3, H, W) dari preprocess_faces
+                                    (torch.Tensor juga diterima)
+        max_batch_size (int): Jumlah wajah maksimal per forward pass
+        backend (object): Backend inferensi (default: get_backend())
+        
+    Returns:
+        numpy.ndarray: Matriks embedding float32 (N, 512)
+    """
+    if face_batch is None or len(face_batch) == 0:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    
+    if not isinstance(face_batch, np.ndarray):
+        face_batch = face_batch.detach().cpu().numpy()
+    face_batch = np.asarray(face_batch, dtype=np.float32)
+    backend = backend or get_backend()
+    
+    embeddings = []
+    for start in range(0, len(face_batch), max_batch_size):
+        embeddings.append(backend.run(face_batch[start:start + max_batch_size]))
+    
+    return np.concatenate(embeddings, axis=0).astype(np.float32, copy=False)
 
 def extract_embedding(face_tensor):
     """
     Ekstrak embedding dari wajah menggunakan ArcFace
     
     Args:
-        face_tensor (torch.Tensor): Tensor wajah yang telah diproses
+        face_tensor (numpy.ndarray): Wajah yang telah diproses (1, 3, H, W)
         
     Returns:
         numpy.ndarray: Vektor embedding
     """
     if face_tensor is None:
         return None
-        
-    with torch.no_grad():
-        face_tensor = face_tensor.to(device)
-        embedding = arcface_model(face_tensor).cpu().numpy()
-        
-    return embedding[0]  # Hilangkan dimensi batch
+    
+    return extract_embeddings(face_tensor)[0]  # Hilangkan dimensi batch
+
+def face_fingerprint(face_img, hash_size=EMBEDDING_CACHE_HASH_SIZE):
+    """
+    Perceptual hash (dHash) crop wajah
+
+    Args:
+        face_img (numpy.ndarray): Crop wajah BGR (sebaiknya crop yang disejajarkan)
+        hash_size (int): Sisi hash (hash_size * hash_size bit)
+
+    Returns:
+        numpy.ndarray: Bit hash terkemas (uint8), None jika crop tidak valid
+    """
+    if not _valid_face(face_img):
+        return None
+    gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY) if face_img.ndim == 3 else face_img
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+class EmbeddingCache:
+    """
+    Cache LRU embedding untuk crop wajah yang hampir sama
+
+    Kunci entri adalah sidik jari crop (face_fingerprint) ditambah geometri bounding box.
+    Crop baru memakai embedding entri yang hash-nya dekat (jarak Hamming) dan box-nya
+    hampir di posisi yang sama, selama entri belum lebih tua dari ttl detik. Umur
+    dihitung sejak embedding dihitung (hit tidak memperpanjangnya), sehingga embedding
+    tetap dihitung ulang minimal sekali per ttl. Aman dipakai dari banyak thread.
+    """
+
+    def __init__(self, max_size=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL,
+                 max_distance=EMBEDDING_CACHE_MAX_DISTANCE, max_shift=EMBEDDING_CACHE_MAX_SHIFT):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.max_shift = max_shift
+
+        self._entries = OrderedDict()  # kunci -> (hash, box, waktu, embedding)
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def clear(self):
+        """Menghapus semua entri (counter tetap)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Statistik cache
+
+        Returns:
+            dict: hits, misses, hit_rate, entries
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+            }
+
+    def summary(self):
+        """Ringkasan statistik dalam satu baris"""
+        stats = self.stats()
+        return (f"{stats['hits']}/{stats['hits'] + stats['misses']} embedding dari cache "
+                f"({stats['hit_rate'] * 100:.1f}%)")
+
+    def _same_box(self, box, other):
+        """Box hampir di posisi dan ukuran yang sama"""
+        if box is None or other is None:
+            return box is None and other is None
+        size = max(box[2] - box[0], box[3] - box[1], 1.0)
+        return bool(np.all(np.abs(box - other) <= self.max_shift * size))
+
+    def lookup(self, face_img, bbox=None):
+        """
+        Mencari embedding untuk crop yang hampir sama
+
+        Args:
+            face_img (numpy.ndarray): Crop wajah
+            bbox (list, optional): Bounding box [x1, y1, x2, y2] pada frame
+
+        Returns:
+            tuple: (embedding atau None, sidik jari untuk store())
+        """
+        fingerprint = face_fingerprint(face_img)
+        if fingerprint is None or not self.enabled:
+            return None, None
+
+        box = None if bbox is None else np.asarray(bbox, dtype=np.float32)
+        max_bits = self.max_distance * fingerprint.size * 8
+        now = time.monotonic()
+
+        with self._lock:
+            # Entri kedaluwarsa dibuang
+            expired = [key for key, entry in self._entries.items() if now - entry[2] > self.ttl]
+            for key in expired:
+                del self._entries[key]
+
+            for key, (other_hash, other_box, _, embedding) in self._entries.items():
+                if not self._same_box(box, other_box):
+                    continue
+                distance = np.count_nonzero(np.unpackbits(fingerprint ^ other_hash))
+                if distance <= max_bits:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding, (fingerprint, box)
+
+            self.misses += 1
+        return None, (fingerprint, box)
+
+    def store(self, fingerprint, embedding):
+        """
+        Menyimpan embedding hasil inferensi
+
+        Args:
+            fingerprint (tuple): Sidik jari dari lookup()
+            embedding (numpy.ndarray): Embedding crop tersebut
+        """
+        if fingerprint is None or embedding is None or not self.enabled:
+            return
+        face_hash, box = fingerprint
+        with self._lock:
+            self._entries[self._next_key] = (face_hash, box, time.monotonic(), embedding)
+            self._next_key += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+def embed_face(face_img, bbox=None, cache=None):
+    """
+    Embedding satu crop wajah, memakai cache untuk crop yang hampir sama
+
+    Args:
+        face_img (numpy.ndarray): Crop wajah
+        bbox (list, optional): Bounding box [x1, y1, x2, y2] pada frame
+        cache (EmbeddingCache, optional): Cache embedding (None = selalu inferensi)
+
+    Returns:
+        numpy.ndarray: Vektor embedding, None jika crop tidak valid
+    """
+    fingerprint = None
+    if cache is not None:
+        embedding, fingerprint = cache.lookup(face_img, bbox)
+        if embedding is not None:
+            return embedding
+
+    embedding = extract_embedding(preprocess_face(face_img))
+    if cache is not None:
+        cache.store(fingerprint, embedding)
+    return embedding
 
 def compute_similarity(embedding1, embedding2):
     """
@@ -108,23 +607,415 @@ def compute_similarity(embedding1, embedding2):
         
     return dot_product / (norm1 * norm2)
 
+def normalize_rows(vectors):
+    """
+    Normalisasi L2 setiap baris matriks embedding
+
+    Args:
+        vectors (numpy.ndarray): Matriks (N, D)
+
+    Returns:
+        numpy.ndarray: Matriks float32 (N, D) dengan norma baris 1 (baris nol tetap nol)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class Gallery:
+    """
+    Matcher galeri wajah berbasis matriks
+
+    Semua embedding terdaftar dipadatkan menjadi satu matriks float32 yang sudah
+    dinormalisasi (satu baris per template) dengan array label paralel, sehingga
+    pencocokan satu wajah terhadap seluruh galeri cukup satu perkalian matriks-vektor.
+    Template milik orang yang sama disimpan berurutan agar verifikasi 1:1 cukup
+    membaca satu potongan matriks.
+    """
+
+    def __init__(self, embeddings_dict=None):
+        """
+        Args:
+            embeddings_dict (dict): Dictionary nama -> embedding (array tunggal atau list embedding)
+        """
+        self.names = []
+        self.labels = np.empty(0, dtype=np.int32)
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self._slices = {}
+        self._starts = np.empty(0, dtype=np.intp)
+        self.ann = None  # indeks IVF opsional untuk galeri besar (lihat attach_ann_index)
+
+        if embeddings_dict:
+            self._build(embeddings_dict)
+
+    def _build(self, embeddings_dict):
+        """Memadatkan dictionary embedding menjadi matriks dan label"""
+        blocks = []
+        labels = []
+        offset = 0
+
+        for name, embeddings in embeddings_dict.items():
+            templates = np.asarray(embeddings, dtype=np.float32)
+            if templates.size == 0:
+                continue
+            templates = templates.reshape(-1, templates.shape[-1])
+
+            label = len(self.names)
+            self.names.append(name)
+            self._slices[name] = (offset, offset + len(templates))
+            offset += len(templates)
+
+            blocks.append(templates)
+            labels.append(np.full(len(templates), label, dtype=np.int32))
+
+        if blocks:
+            self.matrix = normalize_rows(np.concatenate(blocks, axis=0))
+            self.labels = np.concatenate(labels)
+            self._starts = np.array([self._slices[name][0] for name in self.names], dtype=np.intp)
+
+    def __len__(self):
+        """Jumlah orang dalam galeri"""
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._slices
+
+    @property
+    def size(self):
+        """Jumlah total template dalam galeri"""
+        return len(self.labels)
+
+    def _normalize_query(self, embedding):
+        """Normalisasi embedding query, None jika tidak valid"""
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm == 0 or self.size == 0 or query.shape[0] != self.matrix.shape[1]:
+            return None
+        return query / norm
+
+    def scores(self, embedding):
+        """
+        Menghitung cosine similarity embedding terhadap setiap template
+
+        Args:
+            embedding (numpy.ndarray): Embedding query
+
+        Returns:
+            numpy.ndarray: Similarity per template (urutan sama dengan self.labels)
+        """
+        query = self._normalize_query(embedding)
+        if query is None:
+            return np.zeros(self.size, dtype=np.float32)
+        return self.matrix @ query
+
+    def best_match(self, embedding):
+        """
+        Mencari orang dengan similarity tertinggi
+
+        Args:
+            embedding (numpy.ndarray): Embedding query
+
+        Returns:
+            tuple: (nama, similarity), (None, 0.0) jika tidak ada kecocokan positif
+        """
+        if self.size == 0:
+            return None, 0.0
+
+        if self.ann is not None:
+            candidates = self.top_k(embedding, k=1)
+            if candidates and candidates[0][1] > 0:
+                return candidates[0]
+            return None, 0.0
+
+        scores = self.scores(embedding)
+        row = int(np.argmax(scores))
+        best_score = float(scores[row])
+
+        if best_score <= 0:
+            return None, 0.0
+
+        return self.names[self.labels[row]], best_score
+
+    def top_k(self, embedding, k=5):
+        """
+        Mencari k orang dengan similarity tertinggi
+
+        Args:
+            embedding (numpy.ndarray): Embedding query
+            k (int): Jumlah kandidat
+
+        Returns:
+            list: List (nama, similarity) terurut menurun, satu entri per orang
+        """
+        if self.size == 0 or k <= 0:
+            return []
+
+        if self.ann is not None:
+            # Kandidat dari indeks IVF, lalu rerank exact terhadap template float32
+            candidates = self.ann.search(embedding, k=max(k, ann_index.RERANK_CANDIDATES))
+            if candidates:
+                reranked = [(name, self.verify(embedding, name)) for name, _ in candidates if name in self]
+                if reranked:
+                    reranked.sort(key=lambda item: item[1], reverse=True)
+                    return reranked[:k]
+
+        # Similarity per orang = similarity template terbaiknya
+        per_person = np.full(len(self.names), -np.inf, dtype=np.float32)
+        np.maximum.at(per_person, self.labels, self.scores(embedding))
+
+        k = min(k, len(self.names))
+        candidates = np.argpartition(-per_person, k - 1)[:k]
+        candidates = candidates[np.argsort(-per_person[candidates])]
+
+        return [(self.names[i], float(per_person[i])) for i in candidates]
+
+    def best_matches(self, embeddings):
+        """
+        Mencari orang dengan similarity tertinggi untuk banyak embedding sekaligus
+
+        Satu perkalian matriks-matriks (N, D) x (D, T), lalu maksimum per orang dengan
+        np.maximum.reduceat karena template milik satu orang tersimpan berurutan.
+
+        Args:
+            embeddings (numpy.ndarray): Matriks embedding query (N, D)
+
+        Returns:
+            list: List (nama, similarity) per query, (None, 0.0) jika tidak ada kecocokan positif
+        """
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if len(queries) == 0:
+            return []
+
+        if self.size == 0 or queries.shape[1] != self.matrix.shape[1]:
+            return [(None, 0.0)] * len(queries)
+
+        if self.ann is not None:
+            return [self.best_match(query) for query in queries]
+
+        scores = normalize_rows(queries) @ self.matrix.T  # (N, T)
+        per_person = np.maximum.reduceat(scores, self._starts, axis=1)  # (N, orang)
+
+        best = np.argmax(per_person, axis=1)
+        best_scores = per_person[np.arange(len(queries)), best]
+
+        return [(self.names[label], float(score)) if score > 0 else (None, 0.0)
+                for label, score in zip(best, best_scores)]
+
+    def verify(self, embedding, name):
+        """
+        Verifikasi 1:1 embedding terhadap template milik satu orang
+
+        Args:
+            embedding (numpy.ndarray): Embedding query
+            name (str): Nama orang yang diklaim
+
+        Returns:
+            float: Similarity tertinggi terhadap template orang tersebut (0.0 jika tidak ada)
+        """
+        if name not in self._slices:
+            return 0.0
+
+        query = self._normalize_query(embedding)
+        if query is None:
+            return 0.0
+
+        start, stop = self._slices[name]
+        return max(float(np.max(self.matrix[start:stop] @ query)), 0.0)
+
+def attach_ann_index(gallery, file_path):
+    """
+    Memasang indeks IVF ke galeri besar (>= ann_index.ANN_MIN_GALLERY_SIZE template)
+
+    Indeks dimuat dari samping store embedding dan disinkronkan secara inkremental;
+    galeri kecil tetap memakai pencarian exact.
+
+    Args:
+        gallery (Gallery): Galeri yang sudah dibangun
+        file_path (str): Path embedding logis
+
+    Returns:
+        Gallery: Galeri yang sama
+    """
+    if gallery.size < ann_index.ANN_MIN_GALLERY_SIZE:
+        gallery.ann = None
+        return gallery
+
+    try:
+        gallery.ann = ann_index.load_index(file_path)
+    except Exception as e:
+        print(f"[!] Gagal memuat indeks IVF, memakai pencarian exact: {e}")
+        gallery.ann = None
+    return gallery
+
+def _file_signature(file_path):
+    """Tanda (inode, mtime, ukuran) sebuah file, None jika tidak ada"""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def gallery_signature(file_path):
+    """
+    Tanda perubahan store embedding (indeks, journal, dan pickle lama)
+
+    Berubah setiap kali ada snapshot baru (compaction/migrasi) atau record
+    journal baru ditambahkan, termasuk oleh proses lain.
+    """
+    return (
+        _file_signature(embedding_store.store_paths(file_path)[1]),
+        _file_signature(embedding_store.journal_path(file_path)),
+        _file_signature(file_path),
+    )
+
+class GalleryCache:
+    """
+    Cache Gallery satu proses yang dimuat ulang otomatis saat file embedding berubah
+
+    Pembacaan (get) hanya mengambil referensi Gallery yang sedang aktif, sedangkan
+    pemuatan ulang dilakukan di thread background dan referensinya diganti
+    sekaligus setelah Gallery baru selesai dibangun. Verifikasi yang sedang
+    berjalan tetap memakai Gallery lama sampai selesai.
+    """
+
+    def __init__(self, file_path, interval=GALLERY_RELOAD_INTERVAL):
+        """
+        Args:
+            file_path (str): Path embedding logis
+            interval (float): Interval pengecekan perubahan (detik)
+        """
+        self.file_path = file_path
+        self.interval = interval
+        self.version = 0
+        self._gallery = Gallery()
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh(self, force=False):
+        """
+        Memuat ulang Gallery jika file embedding berubah
+
+        Args:
+            force (bool): Muat ulang walaupun tidak ada perubahan
+
+        Returns:
+            bool: True jika Gallery diganti
+        """
+        with self._reload_lock:
+            # Tanda diambil sebelum memuat, sehingga perubahan selama pemuatan
+            # tetap terdeteksi pada pengecekan berikutnya
+            signature = gallery_signature(self.file_path)
+            if not force and self.version > 0 and signature == self._signature:
+                return False
+
+            gallery = attach_ann_index(Gallery(load_embeddings(self.file_path)), self.file_path)
+
+            self._gallery = gallery
+            self._signature = signature
+            self.version += 1
+            return True
+
+    def get(self):
+        """
+        Mengambil Gallery yang sedang aktif
+
+        Jika thread background tidak berjalan, perubahan dicek langsung di sini.
+
+        Returns:
+            Gallery: Gallery terbaru
+        """
+        if not self.running:
+            self.refresh()
+        return self._gallery
+
+    def start(self):
+        """Memuat Gallery (sekali, sinkron) lalu menjalankan thread pemantau perubahan"""
+        if self.running:
+            return
+        self.refresh()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, name="gallery-cache")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Menghentikan thread pemantau perubahan"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                if self.refresh():
+                    print(f"[INFO] Galeri wajah dimuat ulang ({len(self._gallery)} orang)")
+            except Exception as e:
+                print(f"[!] Gagal memuat ulang galeri wajah: {e}")
+
+_gallery_caches = {}
+_gallery_caches_lock = threading.Lock()
+
+def get_gallery_cache(file_path):
+    """
+    Mengambil GalleryCache bersama untuk satu file embedding (satu per proses)
+
+    Args:
+        file_path (str): Path embedding logis
+
+    Returns:
+        GalleryCache: Cache untuk file tersebut
+    """
+    key = os.path.abspath(file_path)
+    with _gallery_caches_lock:
+        cache = _gallery_caches.get(key)
+        if cache is None:
+            cache = GalleryCache(file_path)
+            _gallery_caches[key] = cache
+        return cache
+
 def save_embeddings(embeddings_dict, file_path):
     """
-    Menyimpan embeddings ke file
+    Menyimpan embeddings ke store biner (lihat embedding_store.py)
     
     Args:
         embeddings_dict (dict): Dictionary nama -> embedding
         file_path (str): Path file tujuan
     """
-    # Buat direktori jika belum ada
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    embedding_store.save_embeddings(embeddings_dict, file_path)
+        
+def set_embedding(file_path, name, embedding):
+    """
+    Menyimpan embedding satu orang sebagai satu record journal
     
-    with open(file_path, 'wb') as f:
-        pickle.dump(embeddings_dict, f)
+    Args:
+        file_path (str): Path file embedding
+        name (str): Nama orang
+        embedding (numpy.ndarray/list): Embedding tunggal atau list embedding
+    """
+    embedding_store.replace_embeddings(file_path, name, embedding)
+
+def delete_embedding(file_path, name):
+    """
+    Menghapus embedding satu orang sebagai satu record journal
+    
+    Args:
+        file_path (str): Path file embedding
+        name (str): Nama orang
+    """
+    embedding_store.delete_embeddings(file_path, name)
         
 def load_embeddings(file_path):
     """
-    Memuat embeddings dari file
+    Memuat embeddings dari store biner, migrasi otomatis dari pickle lama
     
     Args:
         file_path (str): Path file sumber
@@ -133,8 +1024,10 @@ def load_embeddings(file_path):
         dict: Dictionary nama -> embedding
     """
     try:
-        with open(file_path, 'rb') as f:
-            return pickle.load(f)
-    except (FileNotFoundError, EOFError):
-        print(f"File embedding tidak ditemukan di {file_path}")
-        return {} 
\ No newline at end of file
+        embeddings_dict = embedding_store.load_embeddings(file_path)
+        if not embeddings_dict and not embedding_store.store_exists(file_path):
+            print(f"File embedding tidak ditemukan di {file_path}")
+        return embeddings_dict
+    except (FileNotFoundError, EOFError, ValueError) as e:
+        print(f"File embedding tidak dapat dibaca di {file_path}: {e}")
+        return {}
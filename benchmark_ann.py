@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark indeks ANN (IVF) dibandingkan pencarian exact pada identitas sintetis.
+
+Identitas dibuat sebagai campuran beberapa cluster (meniru struktur embedding wajah
+yang tidak seragam), satu template per identitas, dan query berupa template yang
+diberi noise. Yang diukur:
+- recall@1: proporsi query dengan hasil IVF + rerank sama dengan hasil exact
+- latensi query rata-rata dan p95 (ms)
+- waktu membangun indeks
+"""
+
+import time
+import argparse
+import numpy as np
+
+import ann_index
+
+def make_identities(n_identities, dim, n_clusters=64, spread=0.8, seed=0):
+    """Membuat embedding identitas sintetis yang sudah dinormalisasi"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    cluster = rng.integers(0, n_clusters, n_identities)
+    identities = centers[cluster] + spread * rng.standard_normal((n_identities, dim)).astype(np.float32)
+    return ann_index._normalize(identities)
+
+def make_queries(identities, n_queries, noise=1.0, seed=1):
+    """Membuat query dari identitas acak ditambah noise"""
+    rng = np.random.default_rng(seed)
+    targets = rng.integers(0, len(identities), n_queries)
+    dim = identities.shape[1]
+    queries = identities[targets] + noise / np.sqrt(dim) * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    return ann_index._normalize(queries)
+
+def run(n_identities, n_queries, dim, n_probe, rerank):
+    identities = make_identities(n_identities, dim)
+    queries = make_queries(identities, n_queries)
+    names = [f"id{i}" for i in range(n_identities)]
+
+    start = time.perf_counter()
+    index = ann_index.IVFIndex.train(identities)
+    index.add_many(names, identities[:, None, :])
+    build_time = time.perf_counter() - start
+
+    exact_latency = []
+    ann_latency = []
+    hits = 0
+    for query in queries:
+        start = time.perf_counter()
+        exact = int(np.argmax(identities @ query))
+        exact_latency.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        candidates = index.search(query, k=rerank, n_probe=n_probe)
+        # Rerank exact terhadap template float32 kandidat (sama seperti Gallery.top_k)
+        rows = np.array([int(name[2:]) for name, _ in candidates], dtype=np.int64)
+        found = int(rows[np.argmax(identities[rows] @ query)]) if len(rows) else -1
+        ann_latency.append(time.perf_counter() - start)
+
+        hits += found == exact
+
+    exact_latency = np.array(exact_latency) * 1000
+    ann_latency = np.array(ann_latency) * 1000
+    return {
+        'n': n_identities,
+        'lists': index.n_lists,
+        'build_s': build_time,
+        'recall': hits / len(queries),
+        'exact_ms': exact_latency.mean(),
+        'exact_p95': np.percentile(exact_latency, 95),
+        'ann_ms': ann_latency.mean(),
+        'ann_p95': np.percentile(ann_latency, 95),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark IVF vs pencarian exact untuk galeri wajah')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Jumlah identitas sintetis')
+    parser.add_argument('--queries', type=int, default=200, help='Jumlah query per ukuran')
+    parser.add_argument('--dim', type=int, default=512, help='Dimensi embedding')
+    parser.add_argument('--n-probe', type=int, default=ann_index.DEFAULT_N_PROBE,
+                        help='Jumlah inverted list yang dipindai')
+    parser.add_argument('--rerank', type=int, default=ann_index.RERANK_CANDIDATES,
+                        help='Jumlah kandidat yang di-rerank exact')
+    args = parser.parse_args()
+
+    print(f"n_probe={args.n_probe}, rerank={args.rerank}, query={args.queries}, dim={args.dim}")
+    print(f"{'identitas':>10} {'list':>5} {'build(s)':>9} {'recall@1':>9} "
+          f"{'exact ms':>9} {'p95':>7} {'ivf ms':>8} {'p95':>7}")
+    for size in args.sizes:
+        r = run(size, args.queries, args.dim, args.n_probe, args.rerank)
+        print(f"{r['n']:>10} {r['lists']:>5} {r['build_s']:>9.2f} {r['recall']:>9.3f} "
+              f"{r['exact_ms']:>9.3f} {r['exact_p95']:>7.3f} {r['ann_ms']:>8.3f} {r['ann_p95']:>7.3f}")
+
+if __name__ == "__main__":
+    main()
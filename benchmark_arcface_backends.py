@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark backend inferensi ArcFace (torch vs ONNX vs int8) pada crop wajah yang sama.
+
+Setiap backend dijalankan di proses terpisah agar peak RSS (resident set size) yang
+dilaporkan hanya milik backend tersebut. Yang diukur:
+- waktu muat backend
+- ms/wajah untuk batch 1 (kasus pintu: satu wajah per frame) dan batch penuh
+- peak RSS proses
+
+Contoh:
+    python benchmark_arcface_backends.py
+    python benchmark_arcface_backends.py --backends torch torch_int8 onnx --photos "photos/*.jpg" --repeat 50
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+import numpy as np
+
+def peak_rss_mb():
+    """Peak RSS proses ini dalam MB (ru_maxrss dalam KB di Linux, byte di macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_worker(backend_name, batch_file, repeat, batch_size):
+    """Menjalankan benchmark satu backend dan mencetak hasil dalam JSON"""
+    import arcface_utils
+
+    batch = np.load(batch_file)
+
+    start = time.perf_counter()
+    backend = arcface_utils.create_backend(backend_name)
+    backend.run(batch[:1])  # warmup
+    load_time = time.perf_counter() - start
+
+    # Batch 1: satu wajah per forward pass
+    start = time.perf_counter()
+    for i in range(repeat):
+        arcface_utils.extract_embeddings(batch[i % len(batch):i % len(batch) + 1], backend=backend)
+    single_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    # Batch penuh
+    rounds = max(1, repeat // len(batch))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        arcface_utils.extract_embeddings(batch, max_batch_size=batch_size, backend=backend)
+    batched_ms = (time.perf_counter() - start) * 1000 / (rounds * len(batch))
+
+    embeddings = arcface_utils.extract_embeddings(batch, max_batch_size=batch_size, backend=backend)
+
+    print(json.dumps({
+        'backend': backend.name,
+        'load_s': load_time,
+        'single_ms': single_ms,
+        'batched_ms': batched_ms,
+        'peak_rss_mb': peak_rss_mb(),
+        'embeddings': embeddings.tolist(),
+    }))
+
+def run_backends(backend_names, batch, repeat=50, batch_size=16):
+    """
+    Menjalankan benchmark setiap backend di proses terpisah pada batch yang sama
+
+    Args:
+        backend_names (list): Nama backend (lihat arcface_utils.BACKENDS)
+        batch (numpy.ndarray): Batch wajah (N, 3, 160, 160)
+        repeat (int): Jumlah forward pass batch 1
+        batch_size (int): Ukuran batch untuk mode batch penuh
+
+    Returns:
+        list: Hasil per backend (dict berisi waktu, peak RSS, dan embedding)
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        batch_file = os.path.join(tmp_dir, 'faces.npy')
+        np.save(batch_file, batch)
+
+        for backend_name in backend_names:
+            command = [sys.executable, os.path.abspath(__file__), '--worker', backend_name,
+                       '--batch-file', batch_file, '--repeat', str(repeat),
+                       '--batch-size', str(batch_size)]
+            process = subprocess.run(command, capture_output=True, text=True)
+            lines = [line for line in process.stdout.splitlines() if line.startswith('{')]
+            if process.returncode != 0 or not lines:
+                print(f"[!] Backend {backend_name} gagal dijalankan:\n{process.stderr.strip()}")
+                continue
+            results.append(json.loads(lines[-1]))
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark backend ArcFace (torch vs ONNX vs int8)')
+    parser.add_argument('--backends', type=str, nargs='+', default=['torch', 'onnx'], help='Backend yang dibandingkan')
+    parser.add_argument('--photos', type=str, default='photos/*.jpg', help='Pola glob foto wajah')
+    parser.add_argument('--faces', type=int, default=16, help='Jumlah crop wajah')
+    parser.add_argument('--repeat', type=int, default=50, help='Jumlah forward pass batch 1')
+    parser.add_argument('--batch-size', type=int, default=16, help='Ukuran batch untuk mode batch penuh')
+    parser.add_argument('--worker', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--batch-file', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.batch_file, args.repeat, args.batch_size)
+        return
+
+    # Crop yang sama untuk semua backend
+    from export_arcface_onnx import load_crops
+    batch = load_crops(args.photos, limit=args.faces)
+
+    results = run_backends(args.backends, batch, args.repeat, args.batch_size)
+    if not results:
+        return
+
+    reference = np.array(results[0]['embeddings'], dtype=np.float32)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+
+    print(f"\n{len(batch)} crop wajah, {args.repeat} forward pass batch 1, batch penuh {args.batch_size}")
+    print(f"{'backend':>10} {'muat(s)':>8} {'ms/wajah b1':>12} {'ms/wajah bN':>12} {'peak RSS MB':>12} "
+          f"{'cos vs ' + results[0]['backend']:>14}")
+    for result in results:
+        embeddings = np.array(result['embeddings'], dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        min_cos = float(np.min(np.sum(reference * embeddings, axis=1)))
+        print(f"{result['backend']:>10} {result['load_s']:>8.2f} {result['single_ms']:>12.2f} "
+              f"{result['batched_ms']:>12.2f} {result['peak_rss_mb']:>12.1f} {min_cos:>14.6f}")
+
+if __name__ == "__main__":
+    main()
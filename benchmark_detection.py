@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark deteksi MTCNN pada frame yang diperkecil, diukur pada rekaman kamera pintu.
+
+Untuk setiap skala, deteksi dijalankan pada frame yang sama dari semua klip. Hasil
+deteksi resolusi penuh (skala 1.0, min_face_size 20 seperti semula) dipakai sebagai
+acuan. Frame dihitung "miss" jika acuan menemukan wajah tetapi mode skala tidak
+menemukan wajah dengan IoU >= --iou terhadap wajah acuan. Yang dilaporkan:
+- ms/frame deteksi (termasuk resize), rata-rata dan p95, serta rata-rata ms pada frame
+  kosong (acuan tidak menemukan wajah, beban CPU saat tidak ada orang)
+- miss rate terhadap acuan
+- deteksi tambahan (mode skala menemukan wajah, acuan tidak)
+- baris "kaskade": prefilter Haar + MTCNN pada ROI (CASCADE_PREFILTER) pada skala pertama
+- baris "track": FaceTracker (MTCNN setiap --redetect-interval frame, optical flow di
+  antaranya) pada skala pertama, beserta porsi frame yang menjalankan MTCNN
+
+Contoh:
+    python benchmark_detection.py --clips "clips/*.mp4"
+    python benchmark_detection.py --clips "clips/*.avi" --scales 1.0 0.5 0.35 --min-face-size 80 --stride 2
+"""
+
+import time
+import glob
+import argparse
+import numpy as np
+import cv2
+
+import mtcnn_utils
+from face_tracker import FaceTracker
+
+def read_frames(pattern, stride=1, max_frames=None):
+    """
+    Membaca frame dari semua klip
+
+    Args:
+        pattern (str): Pola glob file video
+        stride (int): Ambil setiap frame ke-stride
+        max_frames (int, optional): Jumlah frame maksimal per klip
+
+    Returns:
+        list: Frame BGR
+    """
+    frames = []
+    for path in sorted(glob.glob(pattern)):
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            print(f"[!] Tidak dapat membuka klip: {path}")
+            continue
+
+        index = 0
+        taken = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % stride == 0:
+                frames.append(frame)
+                taken += 1
+                if max_frames and taken >= max_frames:
+                    break
+            index += 1
+        cap.release()
+        print(f"[INFO] {path}: {taken} frame")
+    return frames
+
+def iou(a, b):
+    """Intersection over union dua box [x1, y1, x2, y2]"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def run(frames, scale, min_face_size, cascade=False):
+    """
+    Menjalankan deteksi pada semua frame
+
+    Returns:
+        tuple: (box wajah utama per frame atau None, latensi ms per frame)
+    """
+    mtcnn_utils.detect_boxes(frames[0], scale, min_face_size, cascade)  # warmup
+
+    boxes = []
+    latency = []
+    for frame in frames:
+        start = time.perf_counter()
+        found, _ = mtcnn_utils.detect_boxes(frame, scale, min_face_size, cascade)
+        latency.append((time.perf_counter() - start) * 1000)
+        boxes.append(found[0] if found is not None else None)
+    return boxes, np.array(latency)
+
+def run_tracker(frames, scale, min_face_size, redetect_interval):
+    """
+    Menjalankan FaceTracker pada semua frame
+
+    Returns:
+        tuple: (box per frame atau None, latensi ms per frame, porsi frame dengan MTCNN)
+    """
+    tracker = FaceTracker(redetect_interval,
+                          detector=lambda frame: mtcnn_utils.detect_face_aligned(frame, scale, min_face_size))
+
+    boxes = []
+    latency = []
+    for frame in frames:
+        start = time.perf_counter()
+        _, box = tracker.update(frame)
+        latency.append((time.perf_counter() - start) * 1000)
+        boxes.append(box)
+    return boxes, np.array(latency), tracker.detector_share()
+
+def count_misses(reference, boxes, min_iou):
+    """Menghitung (miss, deteksi tambahan) terhadap acuan"""
+    misses = 0
+    extra = 0
+    for ref_box, box in zip(reference, boxes):
+        if ref_box is not None and (box is None or iou(ref_box, box) < min_iou):
+            misses += 1
+        elif ref_box is None and box is not None:
+            extra += 1
+    return misses, extra
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark deteksi MTCNN pada frame yang diperkecil')
+    parser.add_argument('--clips', type=str, default='clips/*.mp4', help='Pola glob rekaman kamera pintu')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.35, 0.25],
+                        help='Faktor perkecil frame yang dibandingkan')
+    parser.add_argument('--min-face-size', type=int, default=mtcnn_utils.DETECTION_MIN_FACE_SIZE,
+                        help='Wajah terkecil yang diharapkan (piksel pada resolusi penuh)')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU minimal agar dianggap wajah yang sama')
+    parser.add_argument('--stride', type=int, default=1, help='Ambil setiap frame ke-N')
+    parser.add_argument('--max-frames', type=int, default=None, help='Jumlah frame maksimal per klip')
+    parser.add_argument('--no-cascade', action='store_true', help='Lewati baris kaskade Haar')
+    parser.add_argument('--redetect-interval', type=int, default=10,
+                        help='Interval deteksi MTCNN untuk baris track (0 = lewati)')
+    args = parser.parse_args()
+
+    frames = read_frames(args.clips, args.stride, args.max_frames)
+    if not frames:
+        print(f"[!] Tidak ada frame di '{args.clips}'")
+        return
+
+    height, width = frames[0].shape[:2]
+    print(f"[INFO] {len(frames)} frame {width}x{height}")
+
+    # Acuan: resolusi penuh dengan piramida semula
+    reference, reference_latency = run(frames, 1.0, 20)
+    with_face = sum(box is not None for box in reference)
+    empty = np.array([box is None for box in reference])
+    print(f"[INFO] Acuan (skala 1.0, min_face_size 20): wajah di {with_face} frame, "
+          f"{reference_latency.mean():.1f} ms/frame")
+
+    def report(label, min_face, boxes, latency):
+        misses, extra = count_misses(reference, boxes, args.iou)
+        miss_rate = misses / with_face * 100 if with_face else 0.0
+        idle_ms = latency[empty].mean() if np.any(empty) else float('nan')
+        print(f"{label:>7} {min_face:>8} {latency.mean():>9.1f} {np.percentile(latency, 95):>7.1f} "
+              f"{idle_ms:>9.1f} {misses:>6} {miss_rate:>6.1f}% {extra:>9}")
+
+    print(f"\n{'mode':>7} {'min_face':>8} {'ms/frame':>9} {'p95':>7} {'ms kosong':>9} "
+          f"{'miss':>6} {'miss %':>7} {'tambahan':>9}")
+    for scale in args.scales:
+        _, detector_min_face = mtcnn_utils.detection_params(scale, args.min_face_size)
+        boxes, latency = run(frames, scale, args.min_face_size)
+        report(f"{scale:.2f}", detector_min_face, boxes, latency)
+
+    scale = args.scales[0]
+    if not args.no_cascade:
+        boxes, latency = run(frames, scale, args.min_face_size, cascade=True)
+        report('kaskade', '', boxes, latency)
+
+    if args.redetect_interval > 0:
+        boxes, latency, share = run_tracker(frames, scale, args.min_face_size, args.redetect_interval)
+        report('track', '', boxes, latency)
+        print(f"[INFO] Track (skala {scale}, interval {args.redetect_interval}): MTCNN berjalan pada "
+              f"{share * 100:.1f}% frame")
+
+if __name__ == "__main__":
+    main()
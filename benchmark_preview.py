@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark CPU per frame untuk anotasi dan tampilan di loop verifikasi wajah.
+
+Yang dibandingkan (deteksi dan embedding sama di semua mode, jadi tidak ikut diukur):
+- lama: setiap frame disalin, diberi kotak wajah dan 6 teks seperti verify_identity,
+  lalu imshow + waitKey(1) di thread pemrosesan
+- preview: anotasi dicatat di Overlay dan digambar oleh thread FramePreview paling
+  banyak PREVIEW_MAX_FPS kali per detik
+- headless: tanpa anotasi, jendela, maupun salinan frame
+
+Frame diumpankan dengan laju kamera (--fps) dan CPU diukur dengan time.process_time
+(semua thread proses, tanpa waktu tidur). Tanpa display (atau tanpa --show) imshow dan
+waitKey tidak dipanggil, sehingga angka mode lama dan preview adalah batas bawah.
+
+Contoh:
+    python benchmark_preview.py
+    python benchmark_preview.py --fps 30 --frames 300 --show
+"""
+
+import time
+import argparse
+import numpy as np
+import cv2
+
+from mtcnn_utils import draw_face_box
+from preview import FramePreview, PREVIEW_MAX_FPS, display_available
+
+WINDOW = "Benchmark Preview"
+
+class OffscreenPreview(FramePreview):
+    """FramePreview yang menggambar anotasi tetapi tidak membuka jendela"""
+
+    def show(self, window, frame):
+        pass
+
+    def hide(self, window):
+        pass
+
+    def poll_key(self):
+        return -1
+
+def make_frame(width, height, seed=0):
+    """Frame BGR acak dengan bounding box wajah di tengah"""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    frame.setflags(write=False)  # seperti frame dari ring buffer kamera
+    bbox = [width // 3, height // 4, 2 * width // 3, 3 * height // 4]
+    return frame, bbox
+
+def annotate(target, frame, bbox, remaining):
+    """Anotasi seperti verify_identity (target: Overlay atau None untuk gambar langsung)"""
+    texts = (
+        ("Verifikasi: pengguna", (10, 30), 0.7, (255, 255, 0), 2),
+        ("Kecocokan: 0.53", (10, 60), 0.6, (255, 255, 255), 2),
+        ("Kualitas rendah: blur", (10, 90), 0.6, (0, 165, 255), 2),
+        ("Verifikasi Gagal (0.53)", (10, frame.shape[0] - 30), 0.7, (0, 0, 255), 2),
+        (f"Waktu: {remaining}s", (10, frame.shape[0] - 10), 0.6, (0, 0, 255), 2),
+        ("Threshold: 0.4", (frame.shape[1] - 150, frame.shape[0] - 10), 0.5, (255, 255, 255), 1),
+    )
+    if target is None:
+        frame = draw_face_box(frame, bbox)
+        for text, org, scale, color, thickness in texts:
+            cv2.putText(frame, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        return frame
+
+    target.draw(draw_face_box, bbox)
+    for text, org, scale, color, thickness in texts:
+        target.text(text, org, scale, color, thickness)
+    return frame
+
+def run(mode, frame, bbox, frames, fps, show):
+    """
+    Menjalankan satu mode dengan laju kamera
+
+    Returns:
+        tuple: (µs CPU/frame, frame yang ditampilkan)
+    """
+    preview = None
+    if mode == 'preview':
+        preview = FramePreview() if show else OffscreenPreview(headless=False)
+
+    interval = 1.0 / fps
+    next_frame = time.monotonic()
+    shown = 0
+
+    cpu_start = time.process_time()
+    for index in range(frames):
+        remaining = frames - index
+        if mode == 'lama':
+            annotated = annotate(None, frame.copy(), bbox, remaining)
+            if show:
+                cv2.imshow(WINDOW, annotated)
+                cv2.waitKey(1)
+            shown += 1
+        elif mode == 'preview':
+            overlay = preview.overlay()
+            annotate(overlay, frame, bbox, remaining)
+            preview.submit(WINDOW, frame, overlay)
+            preview.key()
+
+        next_frame += interval
+        delay = next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    if preview is not None:
+        # Beri thread preview waktu menyelesaikan frame terakhir sebelum CPU dibaca
+        time.sleep(2 * preview._interval)
+        shown = preview.shown
+        preview.close()
+    elif show:
+        cv2.destroyAllWindows()
+    cpu_us = (time.process_time() - cpu_start) * 1e6 / frames
+    return cpu_us, shown
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CPU anotasi/preview per frame')
+    parser.add_argument('--frames', type=int, default=150, help='Jumlah frame per mode')
+    parser.add_argument('--fps', type=float, default=15, help='Laju frame kamera yang disimulasikan')
+    parser.add_argument('--width', type=int, default=640, help='Lebar frame')
+    parser.add_argument('--height', type=int, default=480, help='Tinggi frame')
+    parser.add_argument('--show', action='store_true', help='Tampilkan jendela (butuh display)')
+    args = parser.parse_args()
+
+    show = args.show and display_available()
+    if args.show and not show:
+        print("[!] Tidak ada display, imshow/waitKey tidak diukur")
+
+    frame, bbox = make_frame(args.width, args.height)
+    print(f"[INFO] {args.frames} frame {args.width}x{args.height} @ {args.fps:g} fps, "
+          f"preview maks {PREVIEW_MAX_FPS} fps, jendela: {'ya' if show else 'tidak'}")
+    print(f"{'mode':>9} {'µs CPU/frame':>13} {'ditampilkan':>12}")
+    for mode in ('lama', 'preview', 'headless'):
+        cpu_us, shown = run(mode, frame, bbox, args.frames, args.fps, show)
+        print(f"{mode:>9} {cpu_us:>13.1f} {shown:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import cv2
+import json
+import time
+import threading
+
+# Urutan format yang dicoba. MJPG dikompresi di kamera sehingga 720p tetap 15-30 fps di
+# USB 2.0; YUYV (mentah) pada 720p biasanya turun ke 5-10 fps dan memakan bandwidth USB
+CAMERA_FOURCC_PREFERENCE = ('MJPG', 'YUYV')
+
+# Buffer driver V4L2; 1 agar frame yang dibaca selalu yang terbaru
+CAMERA_BUFFER_SIZE = 1
+
+# Exposure manual (nilai CAP_PROP_EXPOSURE driver), None = auto. Auto exposure di ruangan
+# gelap memperpanjang waktu exposure sehingga fps nyata turun
+CAMERA_EXPOSURE = None
+CAMERA_AUTO_EXPOSURE_MANUAL = 1  # nilai menu V4L2 exposure_auto untuk mode manual
+
+# Pengukuran fps nyata: jumlah frame yang dibuang dulu, lalu jumlah frame yang diukur saat
+# negosiasi dan saat memverifikasi profil dari cache
+CAMERA_FPS_WARMUP_FRAMES = 3
+CAMERA_FPS_MEASURE_FRAMES = 20
+CAMERA_FPS_VERIFY_FRAMES = 6
+
+# Profil diterima jika fps nyata >= rasio ini x fps yang diminta
+CAMERA_MIN_FPS_RATIO = 0.8
+
+# Profil yang berhasil disimpan per perangkat sehingga negosiasi hanya dilakukan sekali
+CAMERA_PROFILE_CACHE = 'data/camera_profiles.json'
+
+_cache_lock = threading.Lock()
+
+def fourcc_to_str(value):
+    """Kode FOURCC dari CAP_PROP_FOURCC menjadi string (misalnya 'MJPG')"""
+    value = int(value)
+    if value <= 0:
+        return ''
+    return ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+
+def device_name(device):
+    """Nama perangkat V4L2 dari sysfs (kosong jika tidak tersedia)"""
+    if not isinstance(device, str) or not device.startswith('/dev/video'):
+        return ''
+    try:
+        with open(f"/sys/class/video4linux/{os.path.basename(device)}/name") as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+def profile_key(device, width, height, fps):
+    """Kunci cache profil: perangkat, nama kamera, resolusi, dan fps yang diminta"""
+    return f"{device}|{device_name(device)}|{width}x{height}@{fps}"
+
+def load_profiles(path=CAMERA_PROFILE_CACHE):
+    """Memuat cache profil (dict kosong jika belum ada atau rusak)"""
+    try:
+        with open(path) as f:
+            profiles = json.load(f)
+        return profiles if isinstance(profiles, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_profile(key, profile, path=CAMERA_PROFILE_CACHE):
+    """Menyimpan satu profil ke cache (tulis ke file sementara lalu rename)"""
+    with _cache_lock:
+        profiles = load_profiles(path)
+        profiles[key] = profile
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(profiles, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[!] Gagal menyimpan profil kamera: {e}")
+
+def measure_fps(cap, frames=CAMERA_FPS_MEASURE_FRAMES, warmup=CAMERA_FPS_WARMUP_FRAMES):
+    """
+    Mengukur fps yang benar-benar dikirim kamera
+
+    Returns:
+        float: Frame per detik, 0.0 jika frame tidak dapat dibaca
+    """
+    for _ in range(warmup):
+        if not cap.grab():
+            return 0.0
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        if not cap.grab():
+            return 0.0
+    elapsed = time.perf_counter() - start
+    return frames / elapsed if elapsed > 0 else 0.0
+
+def apply_settings(cap, fourcc, width, height, fps, buffer_size=CAMERA_BUFFER_SIZE, exposure=CAMERA_EXPOSURE):
+    """
+    Menerapkan pengaturan lalu membaca ulang nilai yang benar-benar dipakai driver
+
+    FOURCC diatur sebelum resolusi karena pada V4L2 resolusi dan fps yang tersedia
+    bergantung pada format.
+
+    Returns:
+        dict: fourcc, width, height, fps, buffer_size, exposure hasil baca ulang
+    """
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    if exposure is not None:
+        cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, CAMERA_AUTO_EXPOSURE_MANUAL)
+        cap.set(cv2.CAP_PROP_EXPOSURE, exposure)
+
+    return {
+        'fourcc': fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': float(cap.get(cv2.CAP_PROP_FPS)),
+        'buffer_size': int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        'exposure': float(cap.get(cv2.CAP_PROP_EXPOSURE)) if exposure is not None else None,
+    }
+
+def _acceptable(readback, measured_fps, width, height, fps):
+    return (readback['width'] == width and readback['height'] == height
+            and measured_fps >= CAMERA_MIN_FPS_RATIO * fps)
+
+def _describe(profile):
+    return (f"{profile.get('fourcc') or '?'} {profile['width']}x{profile['height']} "
+            f"{profile['measured_fps']:.1f} fps nyata (buffer {profile['buffer_size']})")
+
+def configure_capture(cap, device, width, height, fps, cache_path=CAMERA_PROFILE_CACHE):
+    """
+    Menegosiasikan format, resolusi, fps, buffer, dan exposure kamera
+
+    Profil dari cache dicoba lebih dulu dan diverifikasi dengan baca ulang properti serta
+    pengukuran singkat fps nyata. Jika tidak ada atau tidak lagi memenuhi, setiap FOURCC
+    di CAMERA_FOURCC_PREFERENCE dicoba; yang pertama memenuhi resolusi dan
+    CAMERA_MIN_FPS_RATIO dipakai (jika tidak ada, yang fps nyatanya tertinggi), lalu
+    disimpan ke cache.
+
+    Args:
+        cap (cv2.VideoCapture): Kamera yang sudah dibuka
+        device: Perangkat kamera (path atau indeks)
+        width (int): Lebar yang diminta
+        height (int): Tinggi yang diminta
+        fps (int): Frame rate yang diminta
+        cache_path (str): File cache profil
+
+    Returns:
+        dict: Profil yang dipakai (hasil baca ulang + measured_fps)
+    """
+    key = profile_key(device, width, height, fps)
+    cached = load_profiles(cache_path).get(key)
+
+    if cached is not None:
+        readback = apply_settings(cap, cached.get('fourcc'), width, height, fps)
+        measured = measure_fps(cap, CAMERA_FPS_VERIFY_FRAMES)
+        if _acceptable(readback, measured, width, height, fps):
+            profile = dict(readback, measured_fps=measured)
+            print(f"[INFO] Profil kamera {device} dari cache: {_describe(profile)}")
+            return profile
+        print(f"[INFO] Profil kamera {device} dari cache tidak lagi memenuhi, negosiasi ulang")
+
+    best = None
+    for fourcc in CAMERA_FOURCC_PREFERENCE:
+        readback = apply_settings(cap, fourcc, width, height, fps)
+        measured = measure_fps(cap)
+        profile = dict(readback, measured_fps=measured)
+        print(f"[INFO] Kamera {device} {fourcc}: {_describe(profile)}")
+
+        if _acceptable(readback, measured, width, height, fps):
+            best = profile
+            break
+        if best is None or measured > best['measured_fps']:
+            best = profile
+
+    # Terapkan kembali profil terbaik jika percobaan terakhir bukan profil tersebut
+    if best['fourcc'] != readback['fourcc']:
+        apply_settings(cap, best['fourcc'], width, height, fps)
+
+    if not _acceptable(best, best['measured_fps'], width, height, fps):
+        print(f"[!] Kamera {device} tidak mencapai {width}x{height} @ {fps} fps, memakai {_describe(best)}")
+
+    save_profile(key, best, cache_path)
+    return best
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Penemuan perangkat kamera V4L2 dengan hasil yang disimpan.
+
+Semua /dev/video* didaftar sekali dan kemampuannya dibaca dengan ioctl VIDIOC_QUERYCAP
+(tanpa membuka stream, tanpa timeout). Node metadata dan codec (misalnya
+/dev/video10-31 pada Raspberry Pi) dibuang; node capture diurutkan, lalu node pertama
+yang benar-benar menghasilkan frame disimpan di CAMERA_STATE_FILE. Start berikutnya
+langsung membuka perangkat tersebut dan hanya memindai ulang jika gagal.
+
+Tanpa fcntl (bukan Linux) kemampuan tidak dapat dibaca: perangkat tersimpan dipakai apa
+adanya dan pemindaian ulang hanya mencoba CAMERA_DEVICES dengan membukanya langsung.
+
+Contoh:
+    python camera_discovery.py            # tampilkan perangkat dan perangkat tersimpan
+    python camera_discovery.py --rescan   # pindai ulang dan simpan hasilnya
+"""
+
+import os
+import re
+import cv2
+import glob
+import json
+import time
+import struct
+import argparse
+import threading
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# File status hasil penemuan kamera
+CAMERA_STATE_FILE = 'data/camera_device.json'
+
+# ioctl VIDIOC_QUERYCAP = _IOR('V', 0, struct v4l2_capability) (104 byte)
+VIDIOC_QUERYCAP = 0x80685600
+_V4L2_CAPABILITY = struct.Struct('16s32s32sIII3I')
+
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_VIDEO_M2M = 0x00008000
+V4L2_CAP_META_CAPTURE = 0x00800000
+V4L2_CAP_STREAMING = 0x04000000
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+
+_state_lock = threading.Lock()
+
+def list_video_devices():
+    """Semua /dev/video* terurut menurut nomor"""
+    def number(path):
+        match = re.search(r'(\d+)$', path)
+        return int(match.group(1)) if match else 0
+    return sorted(glob.glob('/dev/video*'), key=number)
+
+def query_capabilities(device):
+    """
+    Membaca kemampuan perangkat V4L2 dengan VIDIOC_QUERYCAP
+
+    Returns:
+        dict: driver, card, bus_info, capabilities (device caps), None jika gagal
+              atau fcntl tidak tersedia
+    """
+    if not FCNTL_AVAILABLE:
+        return None
+    try:
+        fd = os.open(device, os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        buffer = bytearray(_V4L2_CAPABILITY.size)
+        fcntl.ioctl(fd, VIDIOC_QUERYCAP, buffer)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+    driver, card, bus_info, _, capabilities, device_caps, _, _, _ = _V4L2_CAPABILITY.unpack(buffer)
+    if capabilities & V4L2_CAP_DEVICE_CAPS:
+        capabilities = device_caps
+    return {
+        'driver': driver.split(b'\0', 1)[0].decode(errors='replace'),
+        'card': card.split(b'\0', 1)[0].decode(errors='replace'),
+        'bus_info': bus_info.split(b'\0', 1)[0].decode(errors='replace'),
+        'capabilities': capabilities,
+    }
+
+def is_capture_node(caps):
+    """Node capture video (bukan metadata, bukan codec memory-to-memory)"""
+    if caps is None:
+        return False
+    flags = caps['capabilities']
+    return (bool(flags & V4L2_CAP_VIDEO_CAPTURE) and bool(flags & V4L2_CAP_STREAMING)
+            and not flags & (V4L2_CAP_VIDEO_M2M | V4L2_CAP_META_CAPTURE))
+
+def discover_devices(preferred=()):
+    """
+    Node capture yang tersedia, terurut dari yang paling mungkin kamera pintu
+
+    Urutan: perangkat di preferred (sesuai urutannya), lalu kamera USB, lalu sisanya.
+
+    Args:
+        preferred (list): Perangkat yang dikonfigurasi (misalnya CAMERA_DEVICES)
+
+    Returns:
+        list: (device, caps) untuk setiap node capture (kosong tanpa fcntl)
+    """
+    preferred = [device for device in preferred if isinstance(device, str)]
+    nodes = []
+    for device in list_video_devices():
+        caps = query_capabilities(device)
+        if is_capture_node(caps):
+            nodes.append((device, caps))
+
+    def rank(node):
+        device, caps = node
+        if device in preferred:
+            return (0, preferred.index(device))
+        return (1 if caps['bus_info'].startswith('usb') else 2, 0)
+
+    return sorted(nodes, key=rank)
+
+def probe_device(device):
+    """Memastikan perangkat benar-benar menghasilkan frame (dipakai hanya saat pemindaian)"""
+    cap = cv2.VideoCapture(device)
+    try:
+        if not cap.isOpened():
+            return False
+        ret, frame = cap.read()
+        return bool(ret) and frame is not None
+    finally:
+        cap.release()
+
+def load_state(path=CAMERA_STATE_FILE):
+    """Status penemuan tersimpan (None jika belum ada atau rusak)"""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) and 'device' in state else None
+    except (OSError, ValueError):
+        return None
+
+def save_state(device, caps=None, path=CAMERA_STATE_FILE):
+    """Menyimpan perangkat yang berhasil dipakai"""
+    caps = caps if caps is not None else (query_capabilities(device) if isinstance(device, str) else None)
+    state = {'device': device, 'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+    if caps is not None:
+        state.update(card=caps['card'], bus_info=caps['bus_info'], driver=caps['driver'])
+
+    with _state_lock:
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[!] Gagal menyimpan status kamera: {e}")
+    return state
+
+def known_device(path=CAMERA_STATE_FILE):
+    """
+    Perangkat tersimpan yang masih valid
+
+    Nomor /dev/video* bisa bergeser setelah reboot atau cabut-pasang, jadi perangkat
+    dicocokkan dengan bus_info; jika nomornya berubah, node capture dengan bus_info yang
+    sama dipakai (hanya ioctl, tanpa membuka stream).
+
+    Returns:
+        Perangkat (path atau indeks), None jika tidak ada atau tidak lagi valid
+    """
+    state = load_state(path)
+    if state is None:
+        return None
+
+    device = state['device']
+    bus_info = state.get('bus_info')
+    if not isinstance(device, str) or not bus_info or not FCNTL_AVAILABLE:
+        return device
+
+    caps = query_capabilities(device)
+    if is_capture_node(caps) and caps['bus_info'] == bus_info:
+        return device
+
+    for other, other_caps in discover_devices():
+        if other_caps['bus_info'] == bus_info:
+            print(f"[INFO] Kamera {bus_info} pindah dari {device} ke {other}")
+            return other
+    return None
+
+def fallback_devices(configured, known=None):
+    """
+    Perangkat yang dicoba jika perangkat tersimpan tidak ada atau gagal dibuka
+
+    Node capture hasil pemindaian (urutan discover_devices) lalu perangkat lain yang
+    dikonfigurasi (misalnya indeks). Path yang tidak ada atau jelas bukan node capture
+    dilewati agar tidak menunggu timeout saat membukanya.
+
+    Args:
+        configured (list): Perangkat yang dikonfigurasi (misalnya CAMERA_DEVICES)
+        known: Perangkat tersimpan yang sudah dicoba (dilewati)
+
+    Returns:
+        list: Perangkat berurutan
+    """
+    devices = [device for device, _ in discover_devices(configured)]
+    for device in configured:
+        if device in devices:
+            continue
+        if isinstance(device, str):
+            if not os.path.exists(device):
+                continue
+            caps = query_capabilities(device)
+            if caps is not None and not is_capture_node(caps):
+                continue
+        devices.append(device)
+    return [device for device in devices if device != known]
+
+def rescan(configured=(), path=CAMERA_STATE_FILE):
+    """
+    Memindai ulang semua node capture dan menyimpan yang pertama menghasilkan frame
+
+    Returns:
+        Perangkat yang ditemukan, None jika tidak ada
+    """
+    for device, caps in discover_devices(configured):
+        print(f"[INFO] Memeriksa {device} ({caps['card']}, {caps['bus_info']})")
+        if probe_device(device):
+            save_state(device, caps, path)
+            return device
+    # Indeks (dan tanpa fcntl juga path) tidak dapat diperiksa dengan ioctl, jadi dibuka langsung
+    for device in configured:
+        if not isinstance(device, str) or not FCNTL_AVAILABLE:
+            print(f"[INFO] Memeriksa {device}")
+            if probe_device(device):
+                save_state(device, None, path)
+                return device
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Penemuan perangkat kamera V4L2')
+    parser.add_argument('--rescan', action='store_true', help='Pindai ulang dan simpan perangkat kamera')
+    parser.add_argument('--state', type=str, default=CAMERA_STATE_FILE, help='File status kamera')
+    args = parser.parse_args()
+
+    if not FCNTL_AVAILABLE:
+        print("[!] fcntl tidak tersedia, kemampuan perangkat tidak dapat dibaca")
+    for device in list_video_devices():
+        caps = query_capabilities(device)
+        if caps is None:
+            print(f"{device}: tidak dapat dibaca")
+            continue
+        kind = 'capture' if is_capture_node(caps) else 'lain'
+        print(f"{device}: {caps['card']} [{caps['driver']}, {caps['bus_info']}] "
+              f"caps=0x{caps['capabilities']:08x} ({kind})")
+
+    if args.rescan:
+        from camera_service import CAMERA_DEVICES
+        device = rescan(CAMERA_DEVICES, args.state)
+        print(f"[+] Kamera tersimpan: {device}" if device is not None else "[!] Tidak ada kamera yang menghasilkan frame")
+    else:
+        state = load_state(args.state)
+        print(f"[INFO] Kamera tersimpan: {state['device'] if state else '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+import cv2
+import time
+import threading
+
+import camera_discovery
+from camera_config import configure_capture
+
+# Perangkat kamera yang dicoba berurutan saat membuka (dan membuka ulang) kamera
+CAMERA_DEVICES = ['/dev/video1', '/dev/video2', 0]
+
+# Resolusi yang didukung
+CAMERA_RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+}
+
+# Jumlah kegagalan baca berturut-turut sebelum kamera dianggap terputus dan dibuka ulang
+CAMERA_MAX_FAILED_READS = 5
+
+# Jeda antar percobaan membuka ulang (detik); digandakan setiap kali gagal sampai batas maksimal
+CAMERA_RECONNECT_DELAY = 1.0
+CAMERA_RECONNECT_MAX_DELAY = 10.0
+
+# Frame lama di buffer driver yang dibuang saat konsumen baru mulai membaca
+CAMERA_FLUSH_FRAMES = 4
+
+# Thread grabber terus menguras kamera ke ring buffer, sehingga konsumen selalu mendapat
+# frame terbaru dan capture tidak pernah menunggu MTCNN/ArcFace
+CAMERA_GRABBER = True
+
+# Jumlah frame (bertimestamp) minimal yang disimpan di ring buffer
+CAMERA_RING_SIZE = 8
+
+# Ring buffer kamera bersama juga menyimpan beberapa detik terakhir sebagai pre-roll bukti
+# wajah tidak dikenal (lihat unknown_evidence.py); 3 detik pada 640x480 15 fps sekitar 40 MB
+CAMERA_PREROLL_SECONDS = 3.0
+
+# Waktu tunggu maksimal frame baru untuk konsumen (detik)
+CAMERA_READ_TIMEOUT = 1.0
+
+class FrameGrabber:
+    """
+    Thread yang terus membaca sumber frame ke ring buffer bertimestamp
+
+    Setiap entri berupa (seq, timestamp, frame) dengan seq bertambah satu per frame dan
+    timestamp dari time.monotonic() saat frame diterima. Frame disimpan apa adanya
+    (tanpa salinan) dan ditandai read-only karena dapat dibaca beberapa konsumen
+    sekaligus; salin dulu sebelum menggambar anotasi. Lock hanya dipegang saat menulis
+    atau membaca indeks ring, sehingga capture tidak pernah menunggu konsumen.
+    """
+
+    def __init__(self, source, size=CAMERA_RING_SIZE):
+        """
+        Args:
+            source: Objek dengan read() -> (ret, frame), misalnya CameraService atau cv2.VideoCapture
+            size (int): Jumlah frame di ring buffer
+        """
+        self.source = source
+        self.size = max(1, size)
+
+        self._ring = [None] * self.size
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    @property
+    def seq(self):
+        """Nomor urut frame terakhir (0 jika belum ada frame)"""
+        return self._seq
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """Memulai thread grabber (tidak melakukan apa-apa jika sudah berjalan)"""
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="frame-grabber")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Menghentikan thread grabber"""
+        self._running = False
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        with self._cond:
+            self._cond.notify_all()
+
+    def _run(self):
+        while self._running:
+            ret, frame = self.source.read()
+            if not ret or frame is None:
+                time.sleep(0.01)
+                continue
+
+            timestamp = time.monotonic()
+            frame.flags.writeable = False
+            with self._cond:
+                self._seq += 1
+                self._ring[self._seq % self.size] = (self._seq, timestamp, frame)
+                self._cond.notify_all()
+
+    def latest(self, after_seq=0, timeout=CAMERA_READ_TIMEOUT):
+        """
+        Frame terbaru yang lebih baru dari after_seq (menunggu jika belum ada)
+
+        Args:
+            after_seq (int): Nomor urut frame terakhir yang sudah diproses konsumen
+            timeout (float): Waktu tunggu maksimal (detik)
+
+        Returns:
+            tuple: (seq, timestamp, frame), None jika tidak ada frame baru dalam timeout
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq or not self._running, timeout):
+                return None
+            if self._seq <= after_seq:
+                return None
+            return self._ring[self._seq % self.size]
+
+    def frames_since(self, timestamp):
+        """
+        Semua frame di ring buffer yang diterima setelah timestamp
+
+        Args:
+            timestamp (float): Batas waktu (time.monotonic())
+
+        Returns:
+            list: (seq, timestamp, frame) terurut dari yang terlama
+        """
+        with self._cond:
+            entries = [entry for entry in self._ring if entry is not None and entry[1] > timestamp]
+        return sorted(entries, key=lambda entry: entry[0])
+
+class CameraService:
+    """
+    Kamera bersama yang dibuka sekali dan tetap streaming
+
+    Membuka V4L2 dan membaca frame pertama bisa memakan waktu satu detik atau lebih,
+    jadi perangkat dibuka sekali saat daemon mulai dan dipakai bersama oleh semua
+    konsumen (verifikasi, pengambilan wajah, foto wajah tidak dikenal). Jika kamera
+    terputus (read gagal CAMERA_MAX_FAILED_READS kali berturut-turut), perangkat dibuka
+    ulang otomatis dengan jeda yang makin panjang.
+
+    Antarmuka read()/isOpened()/set()/get() sama dengan cv2.VideoCapture. Konsumen
+    sebaiknya memakai handle() yang release()-nya tidak menutup perangkat.
+    """
+
+    def __init__(self, devices=CAMERA_DEVICES, resolution="480p", fps=15):
+        """
+        Args:
+            devices (list): Perangkat yang dicoba berurutan
+            resolution (str): Resolusi ("480p" atau "720p")
+            fps (int): Frame rate yang diminta
+        """
+        self.devices = list(devices)
+        self.resolution = resolution
+        self.fps = fps
+        self.device = None
+        self.profile = None
+
+        self._cap = None
+        self._lock = threading.RLock()
+        self._failed_reads = 0
+        self._reconnect_delay = CAMERA_RECONNECT_DELAY
+        self._next_reconnect = 0.0
+        self.grabber = None
+
+        # Statistik
+        self.reconnects = 0
+
+    def _open_device(self, device):
+        """Membuka satu perangkat dan memastikan frame dapat dibaca"""
+        width, height = CAMERA_RESOLUTIONS.get(self.resolution, CAMERA_RESOLUTIONS["480p"])
+        cap = cv2.VideoCapture(device)
+        if not cap.isOpened():
+            print(f"[INFO] Gagal membuka kamera: {device}")
+            return None
+
+        # Format (MJPG/YUYV), resolusi, fps, buffer, dan exposure dinegosiasikan dan
+        # diverifikasi; profil yang berhasil di-cache per perangkat
+        self.profile = configure_capture(cap, device, width, height, self.fps)
+
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            print(f"[INFO] Kamera {device} tidak dapat membaca frame")
+            cap.release()
+            return None
+        return cap
+
+    def _try_open(self, device):
+        try:
+            cap = self._open_device(device)
+        except Exception as e:
+            print(f"[INFO] Error saat membuka kamera {device}: {e}")
+            cap = None
+        if cap is None:
+            return False
+
+        print(f"[INFO] Kamera {device} berhasil dibuka")
+        self._cap = cap
+        self.device = device
+        self._failed_reads = 0
+        self._reconnect_delay = CAMERA_RECONNECT_DELAY
+        return True
+
+    def open(self):
+        """
+        Membuka kamera
+
+        Perangkat yang tersimpan dari start sebelumnya (camera_discovery) dibuka langsung.
+        Hanya jika belum ada atau gagal, node capture /dev/video* dipindai ulang dan
+        perangkat yang dikonfigurasi dicoba; perangkat yang berhasil disimpan.
+
+        Returns:
+            bool: True jika kamera terbuka
+        """
+        with self._lock:
+            if self._cap is not None:
+                return True
+
+            width, height = CAMERA_RESOLUTIONS.get(self.resolution, CAMERA_RESOLUTIONS["480p"])
+            print(f"[INFO] Membuka kamera dengan resolusi {width}x{height}")
+
+            known = camera_discovery.known_device()
+            if known is not None:
+                if self._try_open(known):
+                    return True
+                print(f"[INFO] Kamera tersimpan {known} gagal, memindai ulang perangkat")
+
+            for device in camera_discovery.fallback_devices(self.devices, known):
+                if self._try_open(device):
+                    camera_discovery.save_state(device)
+                    return True
+
+            print("[!] Tidak dapat membuka kamera manapun")
+            return False
+
+    def start_grabber(self, size=None):
+        """
+        Memulai thread grabber yang menguras kamera ke ring buffer
+
+        Setelah ini hanya grabber yang membaca perangkat; konsumen membaca lewat handle().
+
+        Args:
+            size (int, optional): Jumlah frame di ring buffer (default cukup untuk
+                                  CAMERA_PREROLL_SECONDS pada fps kamera)
+
+        Returns:
+            FrameGrabber: Grabber kamera ini
+        """
+        if size is None:
+            size = max(CAMERA_RING_SIZE, int(round(CAMERA_PREROLL_SECONDS * self.fps)))
+        with self._lock:
+            if self.grabber is None:
+                self.grabber = FrameGrabber(self, size)
+            return self.grabber.start()
+
+    def close(self):
+        """Menghentikan grabber dan menutup perangkat kamera"""
+        if self.grabber is not None:
+            self.grabber.stop()
+            self.grabber = None
+        self._release()
+
+    def _release(self):
+        """Menutup perangkat kamera (grabber tetap berjalan dan menunggu reconnect)"""
+        with self._lock:
+            if self._cap is not None:
+                self._cap.release()
+            self._cap = None
+            self.device = None
+
+    def _reconnect(self):
+        """Membuka ulang kamera, paling cepat sekali per jeda reconnect"""
+        now = time.monotonic()
+        if now < self._next_reconnect:
+            return False
+
+        self._release()
+        self.reconnects += 1
+        if self.open():
+            print("[+] Kamera tersambung kembali")
+            return True
+
+        self._next_reconnect = now + self._reconnect_delay
+        self._reconnect_delay = min(self._reconnect_delay * 2, CAMERA_RECONNECT_MAX_DELAY)
+        return False
+
+    def isOpened(self):
+        return self._cap is not None
+
+    def ensure_open(self):
+        """
+        Memastikan kamera terbuka (membuka ulang jika jeda reconnect sudah lewat)
+
+        Returns:
+            bool: True jika kamera terbuka
+        """
+        with self._lock:
+            return self._cap is not None or self._reconnect()
+
+    def read(self):
+        """
+        Membaca frame berikutnya (membuka ulang kamera jika terputus)
+
+        Returns:
+            tuple: (ret, frame) seperti cv2.VideoCapture.read()
+        """
+        with self._lock:
+            if self._cap is None and not self._reconnect():
+                # Tunggu sebentar seperti read() yang memblok, agar loop konsumen tidak berputar kosong
+                time.sleep(0.1)
+                return False, None
+
+            try:
+                ret, frame = self._cap.read()
+            except Exception as e:
+                print(f"[!] Error saat membaca kamera: {e}")
+                ret, frame = False, None
+
+            if ret and frame is not None:
+                self._failed_reads = 0
+                return ret, frame
+
+            self._failed_reads += 1
+            if self._failed_reads >= CAMERA_MAX_FAILED_READS:
+                print(f"[!] Kamera {self.device} terputus, membuka ulang...")
+                self._next_reconnect = 0.0
+                self._reconnect()
+            return False, None
+
+    def flush(self, frames=CAMERA_FLUSH_FRAMES):
+        """Membuang frame lama yang tertahan di buffer driver"""
+        with self._lock:
+            if self._cap is None:
+                return
+            for _ in range(frames):
+                if not self._cap.grab():
+                    break
+
+    def set(self, prop, value):
+        with self._lock:
+            return self._cap.set(prop, value) if self._cap is not None else False
+
+    def get(self, prop):
+        with self._lock:
+            return self._cap.get(prop) if self._cap is not None else 0.0
+
+    def release(self):
+        """Alias close() agar kompatibel dengan cv2.VideoCapture"""
+        self.close()
+
+    def handle(self):
+        """
+        Handle untuk satu konsumen
+
+        Returns:
+            CameraHandle: Objek mirip cv2.VideoCapture; release()-nya tidak menutup kamera
+        """
+        if self.grabber is None:
+            self.flush()
+        return CameraHandle(self)
+
+class CameraHandle:
+    """
+    Akses ke CameraService dengan antarmuka cv2.VideoCapture
+
+    Kode lama yang memanggil cap.release() di akhir sesi tetap bisa dipakai tanpa
+    menutup kamera bersama. Jika grabber berjalan, handle hanya menerima frame yang
+    datang setelah handle dibuat: latest() dan frames_since() mengembalikan view
+    read-only ke ring buffer (tanpa salinan), sedangkan read() mengembalikan salinan
+    yang boleh digambari seperti cv2.VideoCapture.read().
+    """
+
+    def __init__(self, service):
+        self._service = service
+        grabber = service.grabber
+        self._last_seq = grabber.seq if grabber is not None else 0
+
+    def latest(self, timeout=CAMERA_READ_TIMEOUT):
+        """
+        Frame terbaru yang belum pernah dikembalikan ke handle ini
+
+        Frame yang datang saat konsumen sibuk (inferensi) dilewati; konsumen selalu
+        memproses gambar terbaru.
+
+        Returns:
+            tuple: (timestamp, frame read-only), (None, None) jika tidak ada frame baru
+        """
+        grabber = self._service.grabber
+        if grabber is None:
+            ret, frame = self._service.read()
+            return (time.monotonic(), frame) if ret else (None, None)
+
+        entry = grabber.latest(self._last_seq, timeout)
+        if entry is None:
+            return None, None
+        self._last_seq = entry[0]
+        return entry[1], entry[2]
+
+    def frames_since(self, timestamp):
+        """
+        Frame di ring buffer yang diterima setelah timestamp (time.monotonic())
+
+        Returns:
+            list: (timestamp, frame read-only) terurut dari yang terlama; kosong tanpa grabber
+        """
+        grabber = self._service.grabber
+        if grabber is None:
+            return []
+        return [(entry[1], entry[2]) for entry in grabber.frames_since(timestamp)]
+
+    def read(self):
+        """
+        Membaca frame seperti cv2.VideoCapture.read()
+
+        Returns:
+            tuple: (ret, frame) dengan frame yang boleh diubah
+        """
+        if self._service.grabber is None:
+            return self._service.read()
+        timestamp, frame = self.latest()
+        if frame is None:
+            return False, None
+        return True, frame.copy()
+
+    def isOpened(self):
+        return self._service.isOpened()
+
+    def set(self, prop, value):
+        return self._service.set(prop, value)
+
+    def get(self, prop):
+        return self._service.get(prop)
+
+    def release(self):
+        """Tidak menutup perangkat; kamera tetap streaming untuk konsumen berikutnya"""
+        pass
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_camera_service(devices=CAMERA_DEVICES, resolution="480p", fps=15):
+    """
+    Mengambil CameraService bersama untuk proses ini (dibuat dan dibuka sekali)
+
+    Panggilan pertama menentukan perangkat, resolusi, dan fps; panggilan berikutnya
+    memakai kamera yang sama.
+
+    Returns:
+        CameraService: Kamera bersama (periksa isOpened())
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = CameraService(devices, resolution, fps)
+            _service.open()
+            if CAMERA_GRABBER:
+                _service.start_grabber()
+            return _service
+        if resolution != _service.resolution:
+            print(f"[INFO] Kamera bersama sudah berjalan pada {_service.resolution}, "
+                  f"permintaan {resolution} memakai resolusi tersebut")
+    _service.ensure_open()
+    return _service
+
+def close_camera_service():
+    """Menutup kamera bersama (saat daemon berhenti)"""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.close()
+        _service = None
@@ -3,8 +3,8 @@ import numpy as np
 import argparse
 import os
 import time
-from mtcnn_utils import detect_face_mtcnn, draw_face_box
-from arcface_utils import preprocess_face, extract_embedding, save_embeddings, load_embeddings
+from mtcnn_utils import detect_face_aligned, draw_face_box
+from arcface_utils import preprocess_faces, extract_embeddings, set_embedding, load_embeddings
 from head_pose import calculate_face_orientation, draw_face_orientation, is_face_frontal
 
 # Parsing argumen
@@ -93,7 +93,7 @@ def main():
     print("Tekan 'a' untuk mengaktifkan/menonaktifkan penampilan sudut wajah")
     print("Tekan ESC untuk keluar")
     
-    embeddings = []
+    face_crops = []
     photos_captured = 0
     required_photos = 5
     instruction_text = "Wajah frontal"
@@ -106,12 +106,12 @@ def main():
             break
         
         # Deteksi wajah dengan MTCNN
-        face_img, bbox = detect_face_mtcnn(frame)
+        face_img, bbox, landmarks = detect_face_aligned(frame)
         
         # Tampilkan frame dengan kotak wajah dan orientasi wajah jika diaktifkan
         if bbox is not None:
             # Hitung orientasi wajah
-            pitch, yaw, roll = calculate_face_orientation(bbox, frame.shape)
+            pitch, yaw, roll = calculate_face_orientation(bbox, frame.shape, landmarks)
             
             # Tampilkan kotak wajah dan sudut jika diaktifkan
             if show_angles:
@@ -145,17 +145,13 @@ def main():
             status = "aktif" if show_angles else "nonaktif"
             print(f"Penampilan sudut wajah: {status}")
         elif key == 32 and bbox is not None:  # SPASI
-            # Pra-pemrosesan wajah
-            face_tensor = preprocess_face(face_img)
-            
-            if face_tensor is not None:
+            if face_img is not None and face_img.size > 0:
                 # Simpan foto
                 photo_path = os.path.join(photo_dir, f"{args.name}_{photos_captured+1}.jpg")
                 cv2.imwrite(photo_path, face_img)
                 
-                # Ekstrak embedding
-                embedding = extract_embedding(face_tensor)
-                embeddings.append(embedding)
+                # Embedding diekstrak sekaligus (satu batch) setelah semua foto diambil
+                face_crops.append(face_img)
                 
                 photos_captured += 1
                 print(f"Foto {photos_captured}/5 diambil dan disimpan ke {photo_path}")
@@ -176,18 +172,18 @@ def main():
     cap.release()
     cv2.destroyAllWindows()
     
-    if photos_captured > 0:
+    # Ekstrak embedding semua foto dalam satu forward pass
+    face_batch, _ = preprocess_faces(face_crops)
+    embeddings = extract_embeddings(face_batch)
+    
+    if len(embeddings) > 0:
         # Hitung rata-rata embedding
-        avg_embedding = np.mean(np.array(embeddings), axis=0)
-        
-        # Muat embedding yang sudah ada (jika ada)
-        embeddings_dict = load_embeddings(args.embeddings)
+        avg_embedding = np.mean(embeddings, axis=0)
         
-        # Simpan embedding baru
-        embeddings_dict[args.name] = avg_embedding
-        save_embeddings(embeddings_dict, args.embeddings)
+        # Simpan embedding baru (satu record journal, tanpa menulis ulang galeri)
+        set_embedding(args.embeddings, args.name, avg_embedding)
         
-        print(f"Berhasil menyimpan rata-rata embedding untuk {args.name} dari {photos_captured} foto")
+        print(f"Berhasil menyimpan rata-rata embedding untuk {args.name} dari {len(embeddings)} foto")
         print(f"Gunakan 'python recognize_face.py' untuk melakukan pengenalan wajah")
     else:
         print("Tidak ada foto yang diambil.")
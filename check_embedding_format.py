@@ -5,6 +5,7 @@ import pickle
 import os
 import numpy as np
 import argparse
+import embedding_store
 
 def main():
     # Parse argumen
@@ -15,13 +16,21 @@ def main():
     
     file_path = args.embeddings
     
+    # Gunakan store biner jika path sudah dimigrasikan
+    use_store = embedding_store.store_exists(file_path)
+    if use_store:
+        file_path = embedding_store.store_paths(args.embeddings)[1]
+    
     if not os.path.exists(file_path):
         print(f"File {file_path} tidak ditemukan.")
         return
     
     try:
-        with open(file_path, 'rb') as f:
-            data = pickle.load(f)
+        if use_store:
+            data = embedding_store.open_store(args.embeddings).to_dict()
+        else:
+            with open(file_path, 'rb') as f:
+                data = pickle.load(f)
         
         if not data:
             print(f"File {file_path} kosong atau tidak berisi data embeddings.")
@@ -80,6 +89,10 @@ def main():
             print("Saat menggunakan format ini, threshold mungkin perlu disesuaikan.")
             print("Untuk hasil terbaik, pertimbangkan untuk menggunakan multiple embeddings per orang.")
         
+        if not use_store:
+            print("File masih dalam format pickle. Migrasikan ke store biner dengan:")
+            print(f"python embedding_store.py --migrate {args.embeddings}")
+        
     except Exception as e:
         print(f"Error saat membuka file: {e}")
 
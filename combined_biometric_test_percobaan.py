@@ -16,6 +16,8 @@ import sqlite3
 import os
 import pickle
 import datetime
+from camera_service import get_camera_service
+from preview import get_preview
 
 # Import modul selenoid dan LCD
 try:
@@ -34,9 +36,10 @@ except ImportError:
 
 # Import modul face recognition
 try:
-    from mtcnn_utils import detect_face_mtcnn, draw_face_box
-    from arcface_utils import preprocess_face, extract_embedding, compute_similarity, load_embeddings
+    from mtcnn_utils import detect_face_mtcnn, detect_face_aligned, draw_face_box
+    from arcface_utils import preprocess_face, extract_embedding, load_embeddings, Gallery, attach_ann_index
     from head_pose import calculate_face_orientation, is_face_frontal
+    from unknown_evidence import get_evidence_recorder, preroll_frames
     ARCFACE_AVAILABLE = True
 except ImportError as e:
     print(f"[!] Modul pengenalan wajah tidak tersedia: {e}")
@@ -128,40 +131,51 @@ def initialize_sensor():
         return None
 
 def initialize_camera():
-    """Inisialisasi kamera untuk pengenalan wajah"""
+    """
+    Mengambil kamera untuk pengenalan wajah
+    
+    Kamera dibuka sekali dan tetap streaming (camera_service); handle yang dikembalikan
+    dapat di-release() tanpa menutup perangkat.
+    """
     try:
-        # Coba setiap kemungkinan perangkat kamera
-        for device in CAMERA_DEVICES:
-            print(f"[INFO] Mencoba membuka kamera: {device}")
-            try:
-                cap = cv2.VideoCapture(device)
-                if cap.isOpened():
-                    print(f"[INFO] Berhasil membuka kamera: {device}")
-                    return cap
-                else:
-                    print(f"[INFO] Gagal membuka kamera: {device}")
-                    cap.release()
-            except Exception as e:
-                print(f"[INFO] Error saat membuka kamera {device}: {e}")
-        
-        # Jika semua gagal, coba indeks default sebagai fallback
-        print(f"[INFO] Mencoba kamera default (indeks 0)")
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
+        camera = get_camera_service(CAMERA_DEVICES)
+        if not camera.isOpened():
             raise ValueError("Tidak dapat membuka kamera manapun")
-        return cap
+        return camera.handle()
     except Exception as e:
         print(f"[!] Gagal inisialisasi kamera: {e}")
         return None
 
+def save_unknown_face_record(filepath):
+    """Mencatat gambar wajah tidak dikenal ke database"""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('''
+        INSERT INTO unknown_faces (image_path, notes) 
+        VALUES (?, ?)
+        ''', (filepath, "Captured after failed fingerprint verification"))
+        conn.commit()
+        conn.close()
+        print("[+] Data wajah tidak dikenal disimpan ke database")
+    except Exception as e:
+        print(f"[!] Gagal menyimpan ke database: {e}")
+
 def capture_unknown_face():
     """
-    Menangkap gambar wajah tidak dikenal dan menyimpannya
+    Menangkap gambar wajah tidak dikenal dari pre-roll kamera dan menyimpannya
+    
+    Frame wajah terbaik dari beberapa detik terakhir dipilih dan disimpan oleh job
+    background, sehingga fungsi ini langsung kembali.
     
     Returns:
-        str/None: Path ke gambar yang disimpan, None jika gagal
+        str/None: Path gambar yang akan disimpan, None jika gagal
     """
-    # Inisialisasi kamera
+    if not ARCFACE_AVAILABLE:
+        print("[!] Modul pengenalan wajah tidak tersedia")
+        return None
+    
+    # Ambil kamera bersama
     cap = initialize_camera()
     if not cap:
         print("[!] Gagal inisialisasi kamera untuk wajah tidak dikenal")
@@ -170,64 +184,8 @@ def capture_unknown_face():
     print("[INFO] Mencoba menangkap wajah tidak dikenal...")
     display_lcd("Menangkap wajah", "tidak dikenal")
     
-    # Buat timestamps untuk nama file
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Path untuk menyimpan gambar
-    filename = f"unknown_{timestamp}.jpg"
-    filepath = os.path.join(UNKNOWN_FOLDER, filename)
-    
-    # Mencoba mendapatkan gambar selama beberapa detik
-    start_time = time.time()
-    timeout = 5  # Batas waktu 5 detik
-    face_detected = False
-    saved_path = None
-    
-    while time.time() - start_time < timeout and not face_detected:
-        ret, frame = cap.read()
-        if not ret:
-            continue
-        
-        # Deteksi wajah menggunakan MTCNN
-        face_img, bbox = detect_face_mtcnn(frame)
-        
-        if bbox is not None:
-            # Gambar kotak di sekitar wajah
-            frame_with_box = draw_face_box(frame.copy(), bbox)
-            
-            # Tampilkan gambar
-            cv2.imshow("Captured Unknown Face", frame_with_box)
-            cv2.waitKey(1)
-            
-            # Simpan gambar
-            cv2.imwrite(filepath, frame)
-            print(f"[+] Gambar wajah tidak dikenal disimpan: {filepath}")
-            face_detected = True
-            saved_path = filepath
-            
-            # Tunggu sebentar untuk menampilkan hasil
-            time.sleep(1)
-    
-    # Bersihkan sumber daya
-    cap.release()
-    cv2.destroyAllWindows()
-    
-    # Simpan ke database jika wajah terdeteksi
-    if face_detected:
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('''
-            INSERT INTO unknown_faces (image_path, notes) 
-            VALUES (?, ?)
-            ''', (filepath, "Captured after failed fingerprint verification"))
-            conn.commit()
-            conn.close()
-            print("[+] Data wajah tidak dikenal disimpan ke database")
-        except Exception as e:
-            print(f"[!] Gagal menyimpan ke database: {e}")
-    
-    return saved_path
+    return get_evidence_recorder().submit(preroll_frames(cap), UNKNOWN_FOLDER,
+                                          on_saved=save_unknown_face_record)
 
 def scan_fingerprint():
     """
@@ -309,6 +267,7 @@ def verify_face(expected_user_name=None):
             print("[!] File embeddings kosong atau tidak tersedia")
             display_lcd("Data Wajah", "Tidak tersedia")
             return False, None
+        gallery = attach_ann_index(Gallery(embeddings_dict), EMBEDDINGS_PATH)
     except Exception as e:
         print(f"[!] Gagal memuat embeddings: {e}")
         display_lcd("Error Data", "Wajah")
@@ -330,23 +289,30 @@ def verify_face(expected_user_name=None):
     
     print("[INFO] Posisikan wajah Anda di depan kamera untuk verifikasi...")
     
+    # Preview opsional; dalam mode headless tidak ada anotasi, jendela, maupun salinan frame
+    preview = get_preview()
+    
     while time.time() - start_time < timeout and not verified:
-        ret, frame = cap.read()
-        if not ret:
+        # Frame terbaru dari grabber kamera (view read-only tanpa salinan)
+        timestamp, frame = cap.latest()
+        if frame is None:
             continue
             
         # Deteksi wajah
-        face_img, bbox = detect_face_mtcnn(frame)
+        face_img, bbox, landmarks = detect_face_aligned(frame)
+        
+        # Anotasi hanya dicatat jika frame ini akan ditampilkan preview
+        overlay = preview.overlay()
         
         if bbox is not None:
             # Tampilkan kotak di sekitar wajah
-            frame = draw_face_box(frame, bbox)
+            overlay.draw(draw_face_box, bbox)
             
             # Proses wajah dan ekstrak embedding
             face_tensor = preprocess_face(face_img)
             if face_tensor is not None:
                 # Hitung orientasi wajah
-                pitch, yaw, roll = calculate_face_orientation(bbox, frame.shape)
+                pitch, yaw, roll = calculate_face_orientation(bbox, frame.shape, landmarks)
                 frontal = is_face_frontal(pitch, yaw, roll)
                 
                 # Verifikasi hanya dilakukan jika wajah frontal
@@ -355,50 +321,41 @@ def verify_face(expected_user_name=None):
                     embedding = extract_embedding(face_tensor)
                     
                     # Cari kecocokan terbaik
-                    best_match_name = None
-                    best_match_score = 0
-                    
-                    for name, embeddings_list in embeddings_dict.items():
-                        for ref_embedding in embeddings_list:
-                            similarity = compute_similarity(embedding, ref_embedding)
-                            
-                            if similarity > best_match_score:
-                                best_match_score = similarity
-                                best_match_name = name
+                    best_match_name, best_match_score = gallery.best_match(embedding)
                     
                     # Tampilkan hasil kecocokan
                     if best_match_score >= FACE_RECOGNITION_THRESHOLD:
                         # Jika ada expected_user_name, periksa apakah cocok
                         if expected_user_name and best_match_name != expected_user_name:
                             # Wajah teridentifikasi tapi sebagai orang yang berbeda
-                            cv2.putText(frame, f"Tidak Cocok! {best_match_name} != {expected_user_name}", 
-                                      (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                            overlay.text(f"Tidak Cocok! {best_match_name} != {expected_user_name}", 
+                                      (10, 30), 0.7, (0, 0, 255), 2)
                         else:
                             # Tampilkan hasil positif
-                            cv2.putText(frame, f"{best_match_name}: {best_match_score:.2f}", 
-                                      (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                            cv2.putText(frame, "TERVERIFIKASI!", (frame.shape[1] - 200, 30), 
-                                      cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                            overlay.text(f"{best_match_name}: {best_match_score:.2f}", 
+                                      (10, 30), 0.7, (0, 255, 0), 2)
+                            overlay.text("TERVERIFIKASI!", (frame.shape[1] - 200, 30), 
+                                      0.8, (0, 255, 0), 2)
                             verified = True
                             user_name = best_match_name
                     else:
                         # Tampilkan hasil negatif
-                        cv2.putText(frame, f"Unknown: {best_match_score:.2f}", 
-                                  (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                        overlay.text(f"Unknown: {best_match_score:.2f}", 
+                                  (10, 30), 0.7, (0, 0, 255), 2)
         
         # Tampilkan waktu tersisa
         remaining = int(timeout - (time.time() - start_time))
-        cv2.putText(frame, f"Waktu: {remaining}s", (10, frame.shape[0] - 10), 
-                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+        overlay.text(f"Waktu: {remaining}s", (10, frame.shape[0] - 10), 
+                  0.6, (0, 0, 255), 2)
         
-        # Tampilkan frame
-        cv2.imshow("Verifikasi Wajah", frame)
-        if cv2.waitKey(1) == 27:  # ESC untuk keluar
+        # Tampilkan frame (thread preview, dibatasi PREVIEW_MAX_FPS)
+        preview.submit("Verifikasi Wajah", frame, overlay)
+        if preview.key() == 27:  # ESC untuk keluar
             break
     
     # Bersihkan sumber daya
     cap.release()
-    cv2.destroyAllWindows()
+    preview.close_window("Verifikasi Wajah")
     
     # Verifikasi nama pengguna jika diharapkan
     if verified and expected_user_name and user_name != expected_user_name:
@@ -6,6 +6,7 @@ import os
 import numpy as np
 import argparse
 import shutil
+import embedding_store
 
 def main():
     # Parse argumen
@@ -21,20 +22,24 @@ def main():
     input_path = args.input
     output_path = args.output
     
-    if not os.path.exists(input_path):
+    use_store = embedding_store.store_exists(input_path)
+    if not use_store and not os.path.exists(input_path):
         print(f"File {input_path} tidak ditemukan.")
         return
     
     # Buat backup jika diminta
-    if args.backup:
+    if args.backup and not use_store:
         backup_path = f"{input_path}.backup"
         print(f"Membuat backup ke: {backup_path}")
         shutil.copy2(input_path, backup_path)
     
     try:
-        # Baca data embedding
-        with open(input_path, 'rb') as f:
-            data = pickle.load(f)
+        # Baca data embedding (store biner jika sudah dimigrasikan)
+        if use_store:
+            data = embedding_store.open_store(input_path).to_dict()
+        else:
+            with open(input_path, 'rb') as f:
+                data = pickle.load(f)
         
         # Cek format data
         all_list = all(isinstance(emb, list) for emb in data.values())
@@ -1,8 +1,9 @@
 import os
-import pickle
 import sqlite3
 from datetime import datetime
 
+import embedding_store
+
 # Konstanta untuk database
 DEFAULT_DB_PATH = 'data/access_control.db'
 DEFAULT_EMBEDDINGS_PATH = 'data/embeddings.pkl'
@@ -84,11 +85,10 @@ class AccessDatabase:
         return True
     
     def load_embeddings(self):
-        """Memuat embedding wajah dari file pickle"""
+        """Memuat embedding wajah dari store biner (migrasi otomatis dari pickle lama)"""
         try:
-            if os.path.exists(self.embeddings_path):
-                with open(self.embeddings_path, 'rb') as f:
-                    self.embeddings = pickle.load(f)
+            if embedding_store.store_exists(self.embeddings_path) or os.path.exists(self.embeddings_path):
+                self.embeddings = embedding_store.load_embeddings(self.embeddings_path)
                 print(f"Berhasil memuat {len(self.embeddings)} embedding wajah")
             else:
                 print("File embedding tidak ditemukan, membuat baru")
@@ -101,15 +101,34 @@ class AccessDatabase:
             return False
     
     def save_embeddings(self):
-        """Menyimpan embedding wajah ke file pickle"""
+        """Menyimpan embedding wajah ke store biner"""
+        try:
+            embedding_store.save_embeddings(self.embeddings, self.embeddings_path)
+            return True
+        except Exception as e:
+            print(f"Error saat menyimpan embedding: {e}")
+            return False
+    
+    def set_face_embedding(self, name, embedding):
+        """Menyimpan embedding wajah satu pengguna sebagai satu record journal"""
         try:
-            with open(self.embeddings_path, 'wb') as f:
-                pickle.dump(self.embeddings, f)
+            embedding_store.replace_embeddings(self.embeddings_path, name, embedding)
+            self.embeddings[name] = embedding
             return True
         except Exception as e:
             print(f"Error saat menyimpan embedding: {e}")
             return False
     
+    def remove_face_embedding(self, name):
+        """Menghapus embedding wajah satu pengguna sebagai satu record journal"""
+        try:
+            embedding_store.delete_embeddings(self.embeddings_path, name)
+            self.embeddings.pop(name, None)
+            return True
+        except Exception as e:
+            print(f"Error saat menghapus embedding: {e}")
+            return False
+    
     def add_user(self, name, finger_id=None, access_level=1):
         """Menambahkan pengguna baru ke database"""
         if not self.conn:
@@ -253,8 +272,7 @@ class AccessDatabase:
                 return user_result
         
         # Simpan embedding wajah
-        self.embeddings[name] = embedding
-        if self.save_embeddings():
+        if self.set_face_embedding(name, embedding):
             return {"success": True, "message": f"Wajah untuk {name} berhasil ditambahkan"}
         else:
             return {"success": False, "message": "Gagal menyimpan embedding wajah"}
@@ -307,8 +325,7 @@ class AccessDatabase:
             
             # Hapus embedding jika ada
             if name in self.embeddings:
-                del self.embeddings[name]
-                self.save_embeddings()
+                self.remove_face_embedding(name)
             
             return {"success": True, "message": f"Pengguna {name} berhasil dihapus"}
         except Exception as e:
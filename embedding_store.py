@@ -0,0 +1,722 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Penyimpanan embedding wajah dalam format biner berversi.
+
+Format di disk (untuk path logis `embeddings.pkl`):
+- `embeddings.index.json` : indeks kecil berisi nama, jumlah template dan offset tiap orang,
+                            serta generasi snapshot yang aktif
+- `embeddings.<gen>.npy`  : snapshot matriks float32 (T, D) berisi semua template berurutan
+                            (generasi 0 memakai nama `embeddings.npy`)
+- `embeddings.journal`    : journal append-only berisi record add/replace/delete sejak snapshot
+
+Matriks dibuka dengan `np.load(mmap_mode='r')` sehingga pembukaan tidak bergantung pada
+jumlah template dan halaman memorinya dapat dibagi read-only antar proses. Pendaftaran dan
+penghapusan hanya menambah satu record kecil ke journal; compaction menulis snapshot baru
+lewat file sementara + rename lalu mengosongkan journal.
+"""
+
+import os
+import json
+import zlib
+import struct
+import pickle
+import argparse
+import threading
+import numpy as np
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+STORE_VERSION = 2
+DEFAULT_DIM = 512
+
+# Compaction otomatis di background jika journal melebihi ukuran ini
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+# Operasi journal
+OP_ADD = b'A'
+OP_REPLACE = b'R'
+OP_DELETE = b'D'
+
+# Header record: magic, op, format, seq, panjang nama, jumlah template, dimensi, crc32
+_RECORD_MAGIC = b'EJ'
+_RECORD_HEADER = struct.Struct('<2sccQHIHI')
+_FORMAT_LIST = b'L'
+_FORMAT_SINGLE = b'S'
+
+_process_lock = threading.Lock()
+_compaction_threads = {}
+_index_cache = {}
+
+def _base_path(path):
+    return os.path.splitext(path)[0]
+
+def store_paths(path, generation=0):
+    """
+    Mendapatkan path file matriks dan indeks untuk path embedding logis
+
+    Args:
+        path (str): Path embedding logis (contoh: 'embeddings.pkl')
+        generation (int): Generasi snapshot matriks
+
+    Returns:
+        tuple: (path_matriks, path_indeks)
+    """
+    base = _base_path(path)
+    matrix_path = f"{base}.npy" if generation == 0 else f"{base}.{generation}.npy"
+    return matrix_path, f"{base}.index.json"
+
+def journal_path(path):
+    """Path file journal untuk path embedding logis"""
+    return f"{_base_path(path)}.journal"
+
+def store_exists(path):
+    """Cek apakah store biner sudah ada untuk path embedding logis"""
+    return os.path.exists(store_paths(path)[1])
+
+def _as_templates(embeddings):
+    """Konversi satu entri dictionary (array tunggal atau list) ke matriks (k, D)"""
+    templates = np.asarray(embeddings, dtype=np.float32)
+    if templates.size == 0:
+        return np.empty((0, DEFAULT_DIM), dtype=np.float32)
+    return templates.reshape(-1, templates.shape[-1])
+
+class _StoreLock:
+    """Lock antar thread dan antar proses untuk operasi tulis pada satu store"""
+
+    def __init__(self, path):
+        self.lock_path = f"{_base_path(path)}.lock"
+        self.lock_file = None
+
+    def __enter__(self):
+        _process_lock.acquire()
+        if FCNTL_AVAILABLE:
+            directory = os.path.dirname(self.lock_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.lock_file = open(self.lock_path, 'a')
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.lock_file:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+        _process_lock.release()
+
+def _read_journal(path, after_seq=0, name_filter=None):
+    """
+    Membaca record valid dari journal
+
+    Pembacaan berhenti pada record pertama yang terpotong atau rusak (misalnya
+    karena crash saat menulis), sehingga sisa journal yang tidak utuh diabaikan.
+    Jika name_filter diberikan, hanya record milik nama tersebut yang di-decode.
+
+    Returns:
+        tuple: (records, last_seq, valid_end) dengan records berisi
+               (op, name, templates, format) untuk seq > after_seq
+    """
+    records = []
+    last_seq = after_seq
+    valid_end = 0
+    jpath = journal_path(path)
+
+    if not os.path.exists(jpath):
+        return records, last_seq, valid_end
+
+    with open(jpath, 'rb') as f:
+        data = f.read()
+
+    offset = 0
+    while offset + _RECORD_HEADER.size <= len(data):
+        magic, op, fmt, seq, name_len, count, dim, crc = _RECORD_HEADER.unpack_from(data, offset)
+        body_start = offset + _RECORD_HEADER.size
+        body_end = body_start + name_len + count * dim * 4
+        if magic != _RECORD_MAGIC or body_end > len(data):
+            break
+        body = data[body_start:body_end]
+        if zlib.crc32(body) != crc:
+            break
+
+        if seq > after_seq:
+            name = body[:name_len].decode('utf-8')
+            if name_filter is not None and name != name_filter:
+                last_seq = max(last_seq, seq)
+                offset = body_end
+                valid_end = offset
+                continue
+            templates = np.frombuffer(body, dtype=np.float32, offset=name_len).reshape(count, dim)
+            records.append((op, name, templates, fmt))
+        last_seq = max(last_seq, seq)
+        offset = body_end
+        valid_end = offset
+
+    return records, last_seq, valid_end
+
+def read_journal(path, after_seq=0):
+    """
+    Membaca record journal setelah nomor urut tertentu
+
+    Args:
+        path (str): Path embedding logis
+        after_seq (int): Hanya record dengan nomor urut lebih besar yang dikembalikan
+
+    Returns:
+        tuple: (records, last_seq) dengan records berisi (op, name, templates, format)
+    """
+    records, last_seq, _ = _read_journal(path, after_seq)
+    return records, last_seq
+
+def _encode_record(op, seq, name, templates, fmt):
+    name_bytes = name.encode('utf-8')
+    payload = np.ascontiguousarray(templates, dtype=np.float32).tobytes()
+    body = name_bytes + payload
+    count, dim = templates.shape
+    header = _RECORD_HEADER.pack(_RECORD_MAGIC, op, fmt, seq, len(name_bytes), count, dim, zlib.crc32(body))
+    return header + body
+
+class EmbeddingStore:
+    """Tampilan read-only atas snapshot store ditambah record journal yang sudah di-replay"""
+
+    def __init__(self, matrix, index, records=(), matrix_path=None, last_seq=None):
+        self.matrix = matrix
+        self.matrix_path = matrix_path
+        self.version = index.get('version', STORE_VERSION)
+        self.generation = index.get('generation', 0)
+        self.journal_seq = index.get('journal_seq', 0)
+        # Nomor urut record journal terakhir yang sudah termasuk dalam tampilan ini
+        self.last_seq = self.journal_seq if last_seq is None else last_seq
+        self.dim = index.get('dim', DEFAULT_DIM)
+
+        # nama -> (offset, count) di snapshot atau matriks hasil replay journal
+        self._entries = {}
+        self._formats = {}
+        formats = index.get('formats', ['list'] * len(index.get('names', [])))
+        for name, count, offset, fmt in zip(index.get('names', []), index.get('counts', []),
+                                            index.get('offsets', []), formats):
+            self._entries[name] = (offset, count)
+            self._formats[name] = fmt
+        self._overrides = {}
+
+        for op, name, templates, fmt in records:
+            self._apply(op, name, templates, fmt)
+
+    def _apply(self, op, name, templates, fmt):
+        """Menerapkan satu record journal ke tampilan ini"""
+        if op == OP_DELETE:
+            self._entries.pop(name, None)
+            self._formats.pop(name, None)
+            self._overrides.pop(name, None)
+            return
+
+        if op == OP_ADD and name in self._entries:
+            existing = self.get_templates(name)
+            templates = np.concatenate([existing, templates], axis=0) if len(existing) else templates
+            fmt = _FORMAT_LIST
+
+        self._overrides[name] = templates
+        self._entries[name] = (None, len(templates))
+        self._formats[name] = 'single' if fmt == _FORMAT_SINGLE else 'list'
+        if len(templates) > 0:
+            self.dim = templates.shape[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    @property
+    def names(self):
+        return list(self._entries)
+
+    @property
+    def counts(self):
+        return [count for _, count in self._entries.values()]
+
+    def keys(self):
+        return self.names
+
+    def get_templates(self, name):
+        """
+        Mengambil template milik satu orang
+
+        Args:
+            name (str): Nama orang
+
+        Returns:
+            numpy.ndarray: Matriks (k, D) read-only, None jika nama tidak ada
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        if name in self._overrides:
+            return self._overrides[name]
+        offset, count = entry
+        return self.matrix[offset:offset + count]
+
+    def get(self, name):
+        """
+        Mengambil embedding satu orang dalam layout dictionary lama
+
+        Returns:
+            numpy.ndarray/list: Array tunggal atau list embedding, None jika nama tidak ada
+        """
+        templates = self.get_templates(name)
+        if templates is None:
+            return None
+        if self._formats.get(name) == 'single' and len(templates) == 1:
+            return templates[0]
+        return list(templates)
+
+    def to_dict(self):
+        """Konversi store ke dictionary nama -> embedding (layout lama)"""
+        return {name: self.get(name) for name in self._entries}
+
+def _write_snapshot(embeddings_dict, path, generation, journal_seq):
+    """Menulis snapshot matriks + indeks baru lewat file sementara + rename"""
+    matrix_path, index_path = store_paths(path, generation)
+    directory = os.path.dirname(matrix_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    names, counts, offsets, formats, blocks = [], [], [], [], []
+    offset = 0
+    dim = DEFAULT_DIM
+
+    for name, embeddings in embeddings_dict.items():
+        templates = _as_templates(embeddings)
+        if len(templates) > 0:
+            dim = templates.shape[1]
+        names.append(name)
+        counts.append(len(templates))
+        offsets.append(offset)
+        formats.append('list' if isinstance(embeddings, list) else 'single')
+        blocks.append(templates)
+        offset += len(templates)
+
+    blocks = [block for block in blocks if len(block) > 0]
+    matrix = np.concatenate(blocks, axis=0) if blocks else np.empty((0, dim), dtype=np.float32)
+
+    index = {
+        'version': STORE_VERSION,
+        'generation': generation,
+        'journal_seq': journal_seq,
+        'dim': dim,
+        'names': names,
+        'counts': counts,
+        'offsets': offsets,
+        'formats': formats,
+    }
+
+    # Matriks generasi baru ditulis dulu; indeks yang menunjuk ke generasi baru
+    # baru diganti setelah matriks lengkap di disk, jadi crash di tengah jalan
+    # selalu menyisakan pasangan indeks + matriks yang konsisten
+    tmp_matrix_path = f"{matrix_path}.tmp"
+    with open(tmp_matrix_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_matrix_path, matrix_path)
+
+    tmp_index_path = f"{index_path}.tmp"
+    with open(tmp_index_path, 'w') as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_index_path, index_path)
+
+def _read_index(path):
+    index_path = store_paths(path)[1]
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, 'r') as f:
+        return json.load(f)
+
+def _replace_snapshot(embeddings_dict, path, journal_seq):
+    """Mengganti snapshot aktif dan membuang journal yang sudah terlipat ke dalamnya"""
+    old_index = _read_index(path)
+    old_generation = old_index.get('generation', 0) if old_index else None
+    generation = old_generation + 1 if old_generation is not None else 0
+
+    _write_snapshot(embeddings_dict, path, generation, journal_seq)
+
+    # Semua record sampai journal_seq sudah ada di snapshot; jika crash sebelum
+    # journal dikosongkan, replay tetap melewati record tersebut lewat journal_seq
+    jpath = journal_path(path)
+    if os.path.exists(jpath):
+        open(jpath, 'wb').close()
+
+    if old_generation is not None and old_generation != generation:
+        try:
+            # Proses lain yang masih memetakan file lama tetap aman (POSIX)
+            os.remove(store_paths(path, old_generation)[0])
+        except OSError:
+            pass
+
+def write_store(embeddings_dict, path):
+    """
+    Menulis ulang seluruh dictionary embedding sebagai snapshot baru
+
+    Args:
+        embeddings_dict (dict): Dictionary nama -> embedding (array tunggal atau list)
+        path (str): Path embedding logis
+    """
+    with _StoreLock(path):
+        _write_store_locked(embeddings_dict, path)
+
+def _write_store_locked(embeddings_dict, path):
+    """write_store untuk pemanggil yang sudah memegang _StoreLock"""
+    index = _read_index(path)
+    _, last_seq, _ = _read_journal(path, index.get('journal_seq', 0) if index else 0)
+    # Tulis ulang penuh juga memakai satu nomor urut, sehingga journal_seq
+    # selalu naik setiap kali isi store berubah (lihat ann_index.py)
+    _replace_snapshot(embeddings_dict, path, last_seq + 1)
+
+def _cached_slots(path):
+    """
+    Indeks store beserta peta nama -> (offset, count), di-cache per file indeks
+
+    Snapshot baru selalu menggantikan file indeks lewat rename, sehingga
+    (inode, mtime, ukuran) cukup untuk mendeteksi indeks yang berubah.
+
+    Returns:
+        tuple: (index, slots), (None, None) jika store belum ada
+    """
+    index_path = store_paths(path)[1]
+    try:
+        st = os.stat(index_path)
+    except OSError:
+        return None, None
+    signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    cached = _index_cache.get(index_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1], cached[2]
+
+    index = _read_index(path)
+    if index is None:
+        return None, None
+    slots = {name: (offset, count) for name, count, offset in
+             zip(index.get('names', []), index.get('counts', []), index.get('offsets', []))}
+    _index_cache[index_path] = (signature, index, slots)
+    return index, slots
+
+def fetch_user_templates(path, name):
+    """
+    Mengambil template satu orang tanpa memuat seluruh galeri
+
+    Hanya potongan matriks milik orang tersebut yang dibaca dari snapshot
+    (memory-mapped), lalu record journal miliknya di-replay di atasnya.
+
+    Args:
+        path (str): Path embedding logis
+        name (str): Nama orang
+
+    Returns:
+        numpy.ndarray: Matriks template (k, D), None jika orang tidak punya template
+    """
+    for _ in range(3):
+        index, slots = _cached_slots(path)
+        if index is None:
+            if os.path.exists(path) and path.endswith('.pkl'):
+                _migrate_once(path)
+                continue
+            return None
+
+        if index.get('version', 0) > STORE_VERSION:
+            raise ValueError(f"Versi store {index.get('version')} tidak didukung (maksimal {STORE_VERSION})")
+
+        templates = None
+        offset, count = slots.get(name, (None, 0))
+        if offset is not None and count > 0:
+            matrix_path = store_paths(path, index.get('generation', 0))[0]
+            try:
+                matrix = np.load(matrix_path, mmap_mode='r')
+            except FileNotFoundError:
+                # Snapshot diganti compaction di antara pembacaan indeks dan mmap
+                continue
+            templates = np.array(matrix[offset:offset + count])
+
+        records, _, _ = _read_journal(path, index.get('journal_seq', 0), name_filter=name)
+        for op, _, record_templates, _ in records:
+            if op == OP_DELETE:
+                templates = None
+            elif op == OP_ADD and templates is not None and len(templates) > 0:
+                templates = np.concatenate([templates, record_templates], axis=0)
+            else:
+                templates = record_templates
+
+        if templates is None or len(templates) == 0:
+            return None
+        return templates
+
+    raise FileNotFoundError(f"Snapshot embedding untuk {path} tidak ditemukan")
+
+def open_store(path):
+    """
+    Membuka store biner secara memory-mapped dan me-replay journal
+
+    Args:
+        path (str): Path embedding logis
+
+    Returns:
+        EmbeddingStore: Store yang sudah dibuka, None jika belum ada
+    """
+    # Compaction di proses lain dapat mengganti indeks dan menghapus matriks lama
+    # di antara pembacaan indeks dan mmap; baca ulang indeks jika itu terjadi
+    for _ in range(3):
+        index = _read_index(path)
+        if index is None:
+            return None
+
+        if index.get('version', 0) > STORE_VERSION:
+            raise ValueError(f"Versi store {index.get('version')} tidak didukung (maksimal {STORE_VERSION})")
+
+        matrix_path = store_paths(path, index.get('generation', 0))[0]
+        try:
+            if sum(index.get('counts', [])) > 0:
+                matrix = np.load(matrix_path, mmap_mode='r')
+            else:
+                # File tanpa data tidak dapat di-mmap
+                matrix = np.empty((0, index.get('dim', DEFAULT_DIM)), dtype=np.float32)
+        except FileNotFoundError:
+            continue
+
+        records, last_seq, _ = _read_journal(path, index.get('journal_seq', 0))
+        return EmbeddingStore(matrix, index, records, matrix_path, last_seq)
+
+    raise FileNotFoundError(f"Snapshot embedding untuk {path} tidak ditemukan")
+
+def _ensure_store_locked(path):
+    """
+    Memastikan store ada (migrasi dari pickle lama atau buat kosong)
+
+    Dipanggil dengan _StoreLock dipegang: dua proses yang mendaftar pertama kali tidak
+    boleh sama-sama melihat store belum ada, karena snapshot proses kedua akan membuang
+    record yang sudah ditambahkan proses pertama ke journal.
+    """
+    if store_exists(path):
+        return
+    if os.path.exists(path) and path.endswith('.pkl'):
+        _migrate_pickle_locked(path, path)
+    else:
+        _write_store_locked({}, path)
+
+def _append(path, op, name, embeddings=None):
+    """Menambahkan satu record ke journal lalu fsync"""
+    if embeddings is None:
+        templates = np.empty((0, 0), dtype=np.float32)
+        fmt = _FORMAT_LIST
+    else:
+        templates = _as_templates(embeddings)
+        fmt = _FORMAT_LIST if isinstance(embeddings, list) or op == OP_ADD else _FORMAT_SINGLE
+
+    with _StoreLock(path):
+        _ensure_store_locked(path)
+        index = _read_index(path)
+        _, last_seq, valid_end = _read_journal(path, index.get('journal_seq', 0))
+
+        jpath = journal_path(path)
+        with open(jpath, 'ab') as f:
+            # Buang ekor record yang terpotong agar record baru tetap terbaca
+            if f.tell() != valid_end:
+                f.truncate(valid_end)
+            f.write(_encode_record(op, last_seq + 1, name, templates, fmt))
+            f.flush()
+            os.fsync(f.fileno())
+            journal_size = f.tell()
+
+    if journal_size >= JOURNAL_COMPACT_BYTES:
+        compact_in_background(path)
+
+def add_embeddings(path, name, embeddings):
+    """
+    Menambahkan template baru untuk satu orang (dibuat jika belum ada)
+
+    Args:
+        path (str): Path embedding logis
+        name (str): Nama orang
+        embeddings (numpy.ndarray/list): Satu embedding atau list embedding
+    """
+    _append(path, OP_ADD, name, embeddings)
+
+def replace_embeddings(path, name, embeddings):
+    """
+    Mengganti seluruh template satu orang
+
+    Args:
+        path (str): Path embedding logis
+        name (str): Nama orang
+        embeddings (numpy.ndarray/list): Array tunggal atau list embedding
+    """
+    _append(path, OP_REPLACE, name, embeddings)
+
+def delete_embeddings(path, name):
+    """Menghapus semua template satu orang"""
+    _append(path, OP_DELETE, name)
+
+def compact(path):
+    """
+    Melipat journal ke snapshot baru (file sementara + rename)
+
+    Args:
+        path (str): Path embedding logis
+
+    Returns:
+        bool: True jika compaction dilakukan
+    """
+    with _StoreLock(path):
+        store = open_store(path)
+        if store is None:
+            return False
+        _, last_seq, valid_end = _read_journal(path, store.journal_seq)
+        if valid_end == 0:
+            return False
+        _replace_snapshot(store.to_dict(), path, last_seq)
+    return True
+
+def compact_in_background(path):
+    """
+    Menjalankan compaction di thread background (maksimal satu per store)
+
+    Returns:
+        threading.Thread: Thread compaction yang sedang berjalan
+    """
+    key = os.path.abspath(path)
+    with _process_lock:
+        thread = _compaction_threads.get(key)
+        if thread is not None and thread.is_alive():
+            return thread
+
+        def run():
+            try:
+                compact(path)
+            except Exception as e:
+                print(f"[!] Gagal compaction store embedding {path}: {e}")
+
+        thread = threading.Thread(target=run, name=f"compact-{os.path.basename(path)}")
+        thread.daemon = True
+        _compaction_threads[key] = thread
+        thread.start()
+        return thread
+
+def load_pickle_embeddings(pickle_path):
+    """
+    Memuat dictionary embedding dari file pickle lama
+
+    Mendukung layout dict-of-array (satu embedding per orang) dan
+    dict-of-list (beberapa embedding per orang).
+    """
+    with open(pickle_path, 'rb') as f:
+        data = pickle.load(f)
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Format pickle tidak dikenal: {type(data)}")
+
+    return data
+
+def migrate_pickle(pickle_path, store_path=None, backup=True):
+    """
+    Migrasi satu kali dari file pickle lama ke store biner
+
+    Args:
+        pickle_path (str): Path file pickle lama
+        store_path (str): Path embedding logis tujuan (default: sama dengan pickle_path)
+        backup (bool): Ganti nama pickle lama menjadi `.backup` setelah migrasi
+
+    Returns:
+        dict: Dictionary embedding yang dimigrasikan
+    """
+    store_path = store_path or pickle_path
+    with _StoreLock(store_path):
+        return _migrate_pickle_locked(pickle_path, store_path, backup)
+
+def _migrate_pickle_locked(pickle_path, store_path, backup=True):
+    """migrate_pickle untuk pemanggil yang sudah memegang _StoreLock store_path"""
+    embeddings_dict = load_pickle_embeddings(pickle_path)
+    _write_store_locked(embeddings_dict, store_path)
+
+    if backup:
+        os.replace(pickle_path, f"{pickle_path}.backup")
+
+    print(f"[+] Migrasi {len(embeddings_dict)} orang dari {pickle_path} ke {store_paths(store_path)[1]}")
+    return embeddings_dict
+
+def _migrate_once(path):
+    """
+    Migrasi otomatis pickle lama saat store pertama kali dibaca
+
+    Pengecekan dan migrasi dilakukan di bawah _StoreLock, jadi jika proses lain sudah
+    memigrasikannya lebih dulu (pickle sudah menjadi .backup), store miliknya dipakai.
+    """
+    with _StoreLock(path):
+        if not store_exists(path) and os.path.exists(path):
+            _migrate_pickle_locked(path, path)
+
+def load_embeddings(path):
+    """
+    Memuat dictionary embedding, migrasi otomatis dari pickle jika perlu
+
+    Args:
+        path (str): Path embedding logis
+
+    Returns:
+        dict: Dictionary nama -> embedding
+    """
+    store = open_store(path)
+    if store is not None:
+        return store.to_dict()
+
+    if os.path.exists(path) and path.endswith('.pkl'):
+        _migrate_once(path)
+        store = open_store(path)
+        if store is not None:
+            return store.to_dict()
+
+    return {}
+
+def save_embeddings(embeddings_dict, path):
+    """Menyimpan seluruh dictionary embedding sebagai snapshot baru"""
+    write_store(embeddings_dict, path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrasi dan inspeksi store embedding biner')
+    parser.add_argument('--migrate', type=str, help='Path file pickle lama yang akan dimigrasikan')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Path embedding logis tujuan (default: sama dengan --migrate)')
+    parser.add_argument('--keep', action='store_true', help='Jangan ganti nama file pickle lama')
+    parser.add_argument('--compact', type=str, help='Lipat journal ke snapshot baru untuk path embedding')
+    parser.add_argument('--info', type=str, help='Tampilkan informasi store untuk path embedding')
+    args = parser.parse_args()
+
+    if args.migrate:
+        if not os.path.exists(args.migrate):
+            print(f"[!] File {args.migrate} tidak ditemukan")
+            return
+        migrate_pickle(args.migrate, args.output, backup=not args.keep)
+
+    if args.compact:
+        if compact(args.compact):
+            print(f"[+] Journal {journal_path(args.compact)} dilipat ke snapshot baru")
+        else:
+            print("[INFO] Tidak ada record journal untuk dilipat")
+
+    if args.info:
+        store = open_store(args.info)
+        if store is None:
+            print(f"[!] Store untuk {args.info} tidak ditemukan")
+            return
+        print(f"Versi: {store.version}, generasi: {store.generation}, dimensi: {store.dim}")
+        print(f"Jumlah orang: {len(store)}, template di snapshot: {len(store.matrix)}")
+        for name, count in zip(store.names, store.counts):
+            print(f"- {name}: {count} template")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Evaluasi crop wajah yang disejajarkan (landmark + warpAffine) vs crop box mentah.
+
+Mensimulasikan loop verify_identity (verifikasi 1:1 sidik jari + wajah) pada rekaman
+berlabel: setiap frame dideteksi sekali, lalu kedua jenis crop di-embed dan dicocokkan
+dengan galeri milik mode masing-masing. Galeri tiap mode didaftarkan dari foto
+pendaftaran yang sama dengan jenis crop yang sama, sehingga perbandingannya adil.
+
+Label diambil dari nama folder induk: `enroll/<nama>/*.jpg` dan `clips/<nama>/*.mp4`.
+Yang dilaporkan per mode:
+- proporsi klip yang diterima dalam batas waktu
+- jumlah frame sampai diterima (frames-to-accept), rata-rata dan median
+- similarity rata-rata terhadap template sendiri
+
+Contoh:
+    python evaluate_alignment.py --enroll "enroll/*/*.jpg" --clips "clips/*/*.mp4"
+    python evaluate_alignment.py --clips "clips/*/*.avi" --threshold 0.4 --max-frames 225
+"""
+
+import os
+import glob
+import argparse
+import numpy as np
+import cv2
+
+import mtcnn_utils
+import arcface_utils
+
+MODES = ('mentah', 'align')
+
+def label_of(path):
+    return os.path.basename(os.path.dirname(path))
+
+def crops_for(frame, bbox, landmarks):
+    """Crop box mentah dan crop yang disejajarkan dari satu deteksi"""
+    x1, y1, x2, y2 = bbox
+    raw = frame[y1:y2, x1:x2]
+    aligned = mtcnn_utils.align_face(frame, landmarks) if landmarks is not None else None
+    return {'mentah': raw, 'align': aligned if aligned is not None else raw}
+
+def embed_modes(crops):
+    """Embedding per mode untuk satu deteksi"""
+    batch, valid_indices = arcface_utils.preprocess_faces([crops[mode] for mode in MODES])
+    if batch is None or len(valid_indices) != len(MODES):
+        return None
+    embeddings = arcface_utils.extract_embeddings(batch)
+    return dict(zip(MODES, embeddings))
+
+def enroll(pattern):
+    """
+    Mendaftarkan foto berlabel untuk setiap mode
+
+    Returns:
+        dict: mode -> Gallery
+    """
+    templates = {mode: {} for mode in MODES}
+    for path in sorted(glob.glob(pattern)):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        _, bbox, landmarks = mtcnn_utils.detect_face_aligned(image)
+        if bbox is None:
+            print(f"[!] Tidak ada wajah di foto pendaftaran: {path}")
+            continue
+        embeddings = embed_modes(crops_for(image, bbox, landmarks))
+        if embeddings is None:
+            continue
+        for mode in MODES:
+            templates[mode].setdefault(label_of(path), []).append(embeddings[mode])
+
+    return {mode: arcface_utils.Gallery(templates[mode]) for mode in MODES}
+
+def evaluate_clip(path, galleries, threshold, max_frames):
+    """
+    Mensimulasikan verifikasi 1:1 pada satu klip
+
+    Returns:
+        dict: mode -> (frames-to-accept atau None, similarity rata-rata)
+    """
+    name = label_of(path)
+    accepted = {mode: None for mode in MODES}
+    scores = {mode: [] for mode in MODES}
+
+    cap = cv2.VideoCapture(path)
+    index = 0
+    while index < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        index += 1
+
+        _, bbox, landmarks = mtcnn_utils.detect_face_aligned(frame)
+        if bbox is None:
+            continue
+        embeddings = embed_modes(crops_for(frame, bbox, landmarks))
+        if embeddings is None:
+            continue
+
+        for mode in MODES:
+            similarity = galleries[mode].verify(embeddings[mode], name)
+            scores[mode].append(similarity)
+            if accepted[mode] is None and similarity >= threshold:
+                accepted[mode] = index
+
+        # Kedua mode sudah menerima; frame berikutnya tidak mengubah hasil
+        if all(accepted[mode] is not None for mode in MODES):
+            break
+    cap.release()
+
+    return {mode: (accepted[mode], float(np.mean(scores[mode])) if scores[mode] else 0.0) for mode in MODES}
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluasi frames-to-accept crop align vs crop mentah')
+    parser.add_argument('--enroll', type=str, default='enroll/*/*.jpg', help='Pola glob foto pendaftaran berlabel')
+    parser.add_argument('--clips', type=str, default='clips/*/*.mp4', help='Pola glob rekaman verifikasi berlabel')
+    parser.add_argument('--threshold', type=float, default=0.4, help='Threshold verifikasi (default verify_identity)')
+    parser.add_argument('--max-frames', type=int, default=225, help='Batas frame per klip (15 detik pada 15 fps)')
+    args = parser.parse_args()
+
+    galleries = enroll(args.enroll)
+    if len(galleries['align']) == 0:
+        print(f"[!] Tidak ada foto pendaftaran di '{args.enroll}'")
+        return
+
+    clips = sorted(glob.glob(args.clips))
+    if not clips:
+        print(f"[!] Tidak ada klip di '{args.clips}'")
+        return
+
+    results = {mode: [] for mode in MODES}
+    print(f"{'klip':<40} " + " ".join(f"{mode + ' frame':>12} {'sim':>6}" for mode in MODES))
+    for path in clips:
+        if label_of(path) not in galleries['align']:
+            print(f"[!] {label_of(path)} tidak terdaftar, klip dilewati: {path}")
+            continue
+        clip_result = evaluate_clip(path, galleries, args.threshold, args.max_frames)
+        cells = []
+        for mode in MODES:
+            frames, similarity = clip_result[mode]
+            results[mode].append(clip_result[mode])
+            cells.append(f"{frames if frames is not None else '-':>12} {similarity:>6.3f}")
+        print(f"{os.path.relpath(path)[-40:]:<40} " + " ".join(cells))
+
+    print(f"\n=== Threshold {args.threshold}, maks {args.max_frames} frame ===")
+    for mode in MODES:
+        frames = [frames for frames, _ in results[mode] if frames is not None]
+        similarity = np.mean([similarity for _, similarity in results[mode]]) if results[mode] else 0.0
+        accepted = len(frames) / len(results[mode]) * 100 if results[mode] else 0.0
+        mean_frames = np.mean(frames) if frames else float('nan')
+        median_frames = np.median(frames) if frames else float('nan')
+        print(f"{mode:>7}: diterima {accepted:.1f}%, frames-to-accept rata-rata {mean_frames:.1f} "
+              f"(median {median_frames:.1f}), similarity rata-rata {similarity:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Evaluasi varian int8 ArcFace terhadap model float32 pada set foto berlabel.
+
+Label diambil dari nama file `[nama]_[nomor].jpg` (format folder `photos/`) atau dari
+nama folder induk (`--label-from dir`, misalnya `dataset/<nama>/*.jpg`). Kedua model
+meng-embed crop yang sama, lalu dilaporkan:
+- distribusi skor genuine (orang sama) dan impostor (orang berbeda) per model, beserta
+  pergeserannya dan d-prime
+- FAR/FRR pada threshold verifikasi
+- cosine embedding float32 vs int8 per foto
+- ms/wajah dan peak RSS masing-masing model (proses terpisah)
+
+Contoh:
+    python evaluate_quantized_arcface.py
+    python evaluate_quantized_arcface.py --photos "dataset/*/*.jpg" --label-from dir --threshold 0.6
+"""
+
+import os
+import glob
+import argparse
+import numpy as np
+import cv2
+
+import arcface_utils
+from benchmark_arcface_backends import run_backends
+
+def load_labeled_crops(pattern, label_from='filename'):
+    """
+    Memuat crop wajah berlabel
+
+    Returns:
+        tuple: (batch (N, 3, 160, 160), labels)
+    """
+    images = []
+    labels = []
+    for path in sorted(glob.glob(pattern)):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        if label_from == 'dir':
+            label = os.path.basename(os.path.dirname(path))
+        else:
+            label = os.path.splitext(os.path.basename(path))[0].rsplit('_', 1)[0]
+        images.append(image)
+        labels.append(label)
+
+    batch, valid_indices = arcface_utils.preprocess_faces(images)
+    if batch is not None:
+        batch = batch.copy()
+    return batch, [labels[i] for i in valid_indices]
+
+def pair_scores(embeddings, labels):
+    """
+    Skor cosine semua pasangan foto
+
+    Returns:
+        tuple: (skor genuine, skor impostor)
+    """
+    embeddings = arcface_utils.normalize_rows(embeddings)
+    scores = embeddings @ embeddings.T
+    labels = np.array(labels)
+    same = labels[:, None] == labels[None, :]
+    upper = np.triu(np.ones_like(same, dtype=bool), k=1)
+    return scores[same & upper], scores[~same & upper]
+
+def describe(scores):
+    if len(scores) == 0:
+        return "-"
+    return f"{np.mean(scores):.4f} ± {np.std(scores):.4f} (min {np.min(scores):.4f}, maks {np.max(scores):.4f})"
+
+def d_prime(genuine, impostor):
+    """Separasi distribusi genuine vs impostor"""
+    if len(genuine) == 0 or len(impostor) == 0:
+        return float('nan')
+    return abs(np.mean(genuine) - np.mean(impostor)) / np.sqrt((np.var(genuine) + np.var(impostor)) / 2)
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluasi ArcFace int8 vs float32 pada foto berlabel')
+    parser.add_argument('--photos', type=str, default='photos/*.jpg', help='Pola glob crop wajah berlabel')
+    parser.add_argument('--label-from', type=str, choices=['filename', 'dir'], default='filename',
+                        help='Sumber label: nama file [nama]_[nomor].jpg atau nama folder')
+    parser.add_argument('--threshold', type=float, default=0.4, help='Threshold verifikasi untuk FAR/FRR')
+    parser.add_argument('--repeat', type=int, default=30, help='Jumlah forward pass batch 1 untuk latensi')
+    args = parser.parse_args()
+
+    batch, labels = load_labeled_crops(args.photos, args.label_from)
+    if batch is None or len(set(labels)) < 2:
+        print(f"[!] Dibutuhkan foto dari minimal 2 orang di '{args.photos}'")
+        return
+
+    print(f"[INFO] {len(batch)} foto dari {len(set(labels))} orang")
+    results = {result['backend']: result for result in run_backends(['torch', 'torch_int8'], batch, args.repeat)}
+    if 'torch' not in results or 'torch_int8' not in results:
+        print("[!] Evaluasi membutuhkan backend torch dan torch_int8 (jalankan quantize_arcface.py dulu)")
+        return
+
+    fp32 = np.array(results['torch']['embeddings'], dtype=np.float32)
+    int8 = np.array(results['torch_int8']['embeddings'], dtype=np.float32)
+
+    genuine_fp32, impostor_fp32 = pair_scores(fp32, labels)
+    genuine_int8, impostor_int8 = pair_scores(int8, labels)
+
+    print("\n=== Distribusi skor ===")
+    print(f"Genuine  float32: {describe(genuine_fp32)}")
+    print(f"Genuine  int8   : {describe(genuine_int8)}")
+    print(f"Impostor float32: {describe(impostor_fp32)}")
+    print(f"Impostor int8   : {describe(impostor_int8)}")
+    if len(genuine_fp32):
+        print(f"Pergeseran genuine : {np.mean(genuine_int8 - genuine_fp32):+.4f} "
+              f"(maks |Δ| {np.max(np.abs(genuine_int8 - genuine_fp32)):.4f})")
+    print(f"Pergeseran impostor: {np.mean(impostor_int8 - impostor_fp32):+.4f} "
+          f"(maks |Δ| {np.max(np.abs(impostor_int8 - impostor_fp32)):.4f})")
+    print(f"d-prime float32: {d_prime(genuine_fp32, impostor_fp32):.3f}, int8: {d_prime(genuine_int8, impostor_int8):.3f}")
+
+    print(f"\n=== Threshold {args.threshold} ===")
+    for name, genuine, impostor in (('float32', genuine_fp32, impostor_fp32), ('int8', genuine_int8, impostor_int8)):
+        frr = np.mean(genuine < args.threshold) if len(genuine) else float('nan')
+        far = np.mean(impostor >= args.threshold)
+        print(f"{name:>8}: FRR {frr:.4f}, FAR {far:.4f}")
+
+    agreement = np.sum(arcface_utils.normalize_rows(fp32) * arcface_utils.normalize_rows(int8), axis=1)
+    print(f"\nCosine float32 vs int8 per foto: min {agreement.min():.4f}, rata-rata {agreement.mean():.4f}")
+
+    print("\n=== Latensi dan memori ===")
+    for name in ('torch', 'torch_int8'):
+        result = results[name]
+        print(f"{name:>10}: {result['single_ms']:.2f} ms/wajah (batch 1), "
+              f"{result['batched_ms']:.2f} ms/wajah (batch), peak RSS {result['peak_rss_mb']:.1f} MB")
+    speedup = results['torch']['single_ms'] / max(results['torch_int8']['single_ms'], 1e-9)
+    print(f"Percepatan batch 1: {speedup:.2f}x")
+
+if __name__ == "__main__":
+    main()
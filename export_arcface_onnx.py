@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Export model ArcFace (InceptionResnetV1 facenet_pytorch, vggface2) ke ONNX.
+
+Export dilakukan sekali; setelah itu set `ARCFACE_BACKEND = 'onnx'` di arcface_utils.py
+agar inferensi berjalan lewat onnxruntime (CPUExecutionProvider).
+
+Setelah export, embedding ONNX dibandingkan dengan embedding torch pada crop yang sama
+(foto di folder `photos/` jika ada, jika tidak memakai gambar acak). Export dianggap gagal
+jika cosine similarity minimal di bawah toleransi.
+
+Contoh:
+    python export_arcface_onnx.py
+    python export_arcface_onnx.py --output models/arcface_vggface2.onnx --photos "photos/*.jpg"
+"""
+
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+import cv2
+
+import arcface_utils
+
+# Cosine similarity minimal antara embedding torch dan ONNX
+DEFAULT_TOLERANCE = 0.999
+
+def load_crops(pattern, limit=32, seed=0):
+    """
+    Memuat crop wajah untuk pengecekan (batch float32 hasil preprocess_faces)
+
+    Args:
+        pattern (str): Pola glob foto wajah
+        limit (int): Jumlah foto maksimal
+        seed (int): Seed untuk gambar acak jika tidak ada foto
+
+    Returns:
+        numpy.ndarray: Batch wajah (N, 3, 160, 160)
+    """
+    images = []
+    for path in sorted(glob.glob(pattern))[:limit]:
+        image = cv2.imread(path)
+        if image is not None:
+            images.append(image)
+
+    if not images:
+        print(f"[INFO] Tidak ada foto di '{pattern}', memakai {limit} gambar acak")
+        rng = np.random.default_rng(seed)
+        images = [rng.integers(0, 256, (160, 160, 3), dtype=np.uint8) for _ in range(limit)]
+
+    batch, _ = arcface_utils.preprocess_faces(images)
+    return batch.copy() if batch is not None else None
+
+def export_onnx(output_path, opset=13):
+    """
+    Export model torch ke ONNX dengan dimensi batch dinamis
+
+    Args:
+        output_path (str): Path file .onnx tujuan
+        opset (int): Versi opset ONNX
+    """
+    import torch
+
+    model = arcface_utils.get_arcface_model()
+    device = arcface_utils.get_device()
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    dummy = torch.zeros((1, 3, 160, 160), device=device)
+    tmp_path = f"{output_path}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(model, dummy, tmp_path,
+                          input_names=['faces'], output_names=['embeddings'],
+                          dynamic_axes={'faces': {0: 'batch'}, 'embeddings': {0: 'batch'}},
+                          opset_version=opset)
+    os.replace(tmp_path, output_path)
+    print(f"[+] Model ONNX disimpan ke {output_path}")
+
+def check_agreement(batch, reference_backend, candidate_backend, tolerance=DEFAULT_TOLERANCE):
+    """
+    Membandingkan embedding dua backend pada batch yang sama
+
+    Args:
+        batch (numpy.ndarray): Batch wajah (N, 3, 160, 160)
+        reference_backend (object): Backend acuan (torch)
+        candidate_backend (object): Backend yang diuji
+        tolerance (float): Cosine similarity minimal
+
+    Returns:
+        tuple: (lolos, cosine minimal, cosine rata-rata)
+    """
+    reference = arcface_utils.normalize_rows(arcface_utils.extract_embeddings(batch, backend=reference_backend))
+    candidate = arcface_utils.normalize_rows(arcface_utils.extract_embeddings(batch, backend=candidate_backend))
+    cosines = np.sum(reference * candidate, axis=1)
+    return bool(cosines.min() >= tolerance), float(cosines.min()), float(cosines.mean())
+
+def main():
+    parser = argparse.ArgumentParser(description='Export ArcFace ke ONNX dan cek kecocokan dengan torch')
+    parser.add_argument('--output', type=str, default=arcface_utils.ONNX_MODEL_PATH, help='Path file .onnx tujuan')
+    parser.add_argument('--opset', type=int, default=13, help='Versi opset ONNX')
+    parser.add_argument('--photos', type=str, default='photos/*.jpg', help='Pola glob foto wajah untuk pengecekan')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='Cosine similarity minimal torch vs ONNX')
+    parser.add_argument('--check-only', action='store_true', help='Lewati export, hanya cek model yang sudah ada')
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export_onnx(args.output, args.opset)
+
+    batch = load_crops(args.photos)
+    passed, min_cos, mean_cos = check_agreement(batch, arcface_utils.TorchBackend(),
+                                                arcface_utils.OnnxBackend(args.output), args.tolerance)
+
+    print(f"Cosine torch vs ONNX pada {len(batch)} crop: min={min_cos:.6f}, rata-rata={mean_cos:.6f}")
+    if not passed:
+        print(f"[!] GAGAL: cosine minimal {min_cos:.6f} < toleransi {args.tolerance}")
+        sys.exit(1)
+
+    print(f"[+] LULUS: embedding ONNX sesuai dengan torch (toleransi {args.tolerance})")
+    print("[INFO] Set ARCFACE_BACKEND = 'onnx' di arcface_utils.py untuk memakai backend ONNX")
+
+if __name__ == "__main__":
+    main()
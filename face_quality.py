@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Gerbang kualitas crop wajah sebelum inferensi embedding ArcFace.
+
+Crop yang tidak akan menghasilkan embedding yang andal ditolak lebih dulu dengan
+pemeriksaan murah, diurutkan dari yang termurah:
+- ukuran: sisi bounding box terpendek minimal QUALITY_MIN_FACE_SIZE piksel
+- kecerahan: rata-rata grayscale antara QUALITY_MIN_BRIGHTNESS dan QUALITY_MAX_BRIGHTNESS
+- saturasi: proporsi piksel terpotong gelap (<= 5), terang (>= 250) dan keduanya maksimal
+  QUALITY_MAX_SATURATED; yang gelap dihitung sebagai 'gelap', yang terang sebagai 'terang'
+  dan sisanya (kontras terpotong di kedua ujung) sebagai 'jenuh'
+- ketajaman: variansi Laplacian pada crop QUALITY_SIZE minimal QUALITY_MIN_SHARPNESS
+- pose: pitch/yaw/roll dari landmark maksimal QUALITY_MAX_POSE derajat
+
+Setiap penolakan menghemat satu inferensi embedding; counter per alasan dapat dibaca
+lewat FaceQualityGate.stats() dan summary().
+"""
+
+import cv2
+import numpy as np
+import threading
+
+from head_pose import estimate_head_pose
+
+# Ukuran crop grayscale untuk menghitung skor (skor ketajaman bergantung pada resolusi,
+# jadi semua crop diskalakan ke ukuran yang sama)
+QUALITY_SIZE = (96, 96)
+
+# Ketajaman minimal (variansi Laplacian); di bawah ini wajah buram karena gerakan/fokus
+QUALITY_MIN_SHARPNESS = 40.0
+
+# Rentang kecerahan rata-rata (0-255) dan proporsi piksel jenuh maksimal (<= 5, >= 250,
+# atau keduanya digabung)
+QUALITY_MIN_BRIGHTNESS = 45.0
+QUALITY_MAX_BRIGHTNESS = 210.0
+QUALITY_MAX_SATURATED = 0.25
+
+# Sisi bounding box terpendek minimal (piksel pada frame)
+QUALITY_MIN_FACE_SIZE = 60
+
+# Sudut pose maksimal (derajat) untuk pitch/yaw/roll
+QUALITY_MAX_POSE = 25.0
+
+class FaceQualityGate:
+    """
+    Gerbang kualitas sebelum inferensi embedding
+
+    Menilai crop wajah dari ketajaman (variansi Laplacian), eksposur (kecerahan rata-rata
+    dan proporsi piksel jenuh), ukuran wajah dan pose (dari landmark), lalu menolak crop
+    di bawah batas minimal. Setiap penolakan berarti satu inferensi embedding dihemat;
+    jumlahnya dapat dibaca lewat stats(). Aman dipakai dari banyak thread.
+    """
+
+    def __init__(self, min_sharpness=QUALITY_MIN_SHARPNESS, min_brightness=QUALITY_MIN_BRIGHTNESS,
+                 max_brightness=QUALITY_MAX_BRIGHTNESS, max_saturated=QUALITY_MAX_SATURATED,
+                 min_face_size=QUALITY_MIN_FACE_SIZE, max_pose=QUALITY_MAX_POSE):
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.max_saturated = max_saturated
+        self.min_face_size = min_face_size
+        self.max_pose = max_pose
+
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Mengosongkan counter"""
+        with self._lock:
+            self._checked = 0
+            self._passed = 0
+            self._rejected = {'kecil': 0, 'gelap': 0, 'terang': 0, 'jenuh': 0, 'blur': 0, 'pose': 0}
+
+    def stats(self):
+        """
+        Counter gerbang kualitas
+
+        Returns:
+            dict: checked, passed, saved (inferensi yang dihemat), dan rejected per alasan
+        """
+        with self._lock:
+            return {
+                'checked': self._checked,
+                'passed': self._passed,
+                'saved': self._checked - self._passed,
+                'rejected': dict(self._rejected),
+            }
+
+    def summary(self):
+        """Ringkasan counter dalam satu baris"""
+        stats = self.stats()
+        reasons = ", ".join(f"{reason} {count}" for reason, count in stats['rejected'].items() if count)
+        return (f"{stats['saved']}/{stats['checked']} inferensi embedding dihemat"
+                + (f" ({reasons})" if reasons else ""))
+
+    def score(self, face_img, bbox=None, landmarks=None, frame_shape=None):
+        """
+        Menghitung skor kualitas crop wajah
+
+        Args:
+            face_img (numpy.ndarray): Crop wajah BGR
+            bbox (list, optional): Bounding box [x1, y1, x2, y2] pada frame
+            landmarks (numpy.ndarray, optional): 5 landmark MTCNN pada frame
+            frame_shape (tuple, optional): Ukuran frame (untuk pose)
+
+        Returns:
+            dict: sharpness, brightness, dark (proporsi piksel <= 5), bright (proporsi
+                  piksel >= 250), saturated (dark + bright), size, pose (pitch, yaw, roll
+                  atau None)
+        """
+        gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY) if face_img.ndim == 3 else face_img
+        gray = cv2.resize(gray, QUALITY_SIZE, interpolation=cv2.INTER_AREA)
+
+        _, laplacian_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_32F))
+        dark = np.count_nonzero(gray <= 5) / gray.size
+        bright = np.count_nonzero(gray >= 250) / gray.size
+
+        size = None
+        if bbox is not None:
+            size = min(bbox[2] - bbox[0], bbox[3] - bbox[1])
+
+        pose = None
+        if landmarks is not None and frame_shape is not None:
+            pose = estimate_head_pose(landmarks, frame_shape)
+
+        return {
+            'sharpness': float(laplacian_std[0, 0] ** 2),
+            'brightness': float(gray.mean()),
+            'dark': float(dark),
+            'bright': float(bright),
+            'saturated': float(dark + bright),
+            'size': size,
+            'pose': pose,
+        }
+
+    def check(self, face_img, bbox=None, landmarks=None, frame_shape=None):
+        """
+        Memeriksa apakah crop wajah layak di-embed
+
+        Pemeriksaan termurah dijalankan lebih dulu (ukuran, eksposur, ketajaman, pose).
+
+        Returns:
+            tuple: (lolos, alasan penolakan atau None)
+        """
+        reason = None
+        if face_img is None or face_img.size == 0:
+            reason = 'kecil'
+        elif bbox is not None and min(bbox[2] - bbox[0], bbox[3] - bbox[1]) < self.min_face_size:
+            reason = 'kecil'
+        else:
+            scores = self.score(face_img, None, None, None)
+            if scores['brightness'] < self.min_brightness or scores['dark'] > self.max_saturated:
+                reason = 'gelap'
+            elif scores['brightness'] > self.max_brightness or scores['bright'] > self.max_saturated:
+                reason = 'terang'
+            elif scores['saturated'] > self.max_saturated:
+                reason = 'jenuh'
+            elif scores['sharpness'] < self.min_sharpness:
+                reason = 'blur'
+            elif landmarks is not None and frame_shape is not None:
+                pose = estimate_head_pose(landmarks, frame_shape)
+                if pose is not None and max(abs(angle) for angle in pose) > self.max_pose:
+                    reason = 'pose'
+
+        with self._lock:
+            self._checked += 1
+            if reason is None:
+                self._passed += 1
+            else:
+                self._rejected[reason] += 1
+
+        return reason is None, reason
+
+# Gerbang bersama untuk satu proses (counter terakumulasi antar sesi verifikasi)
+quality_gate = FaceQualityGate()
@@ -14,6 +14,7 @@ import sqlite3
 import os
 import pickle
 import argparse  # Tambahkan import argparse
+from preview import set_headless, get_preview
 
 # Import modul selenoid dan LCD
 try:
@@ -32,8 +33,8 @@ except ImportError:
 
 # Import modul face recognition
 try:
-    from mtcnn_utils import detect_face_mtcnn, draw_face_box
-    from arcface_utils import preprocess_face, extract_embedding, compute_similarity, load_embeddings
+    from mtcnn_utils import detect_face_aligned, draw_face_box
+    from arcface_utils import preprocess_face, extract_embedding, load_embeddings, Gallery, attach_ann_index
     from head_pose import calculate_face_orientation, is_face_frontal
     ARCFACE_AVAILABLE = True
 except ImportError as e:
@@ -69,6 +70,8 @@ def parse_arguments():
                         help='Indeks kamera yang digunakan (default: coba 2, 1, 0)')
     parser.add_argument('--embeddings', type=str, default=EMBEDDINGS_PATH,
                         help=f'Path file embedding (default: {EMBEDDINGS_PATH})')
+    parser.add_argument('--headless', action='store_true',
+                        help='Tanpa preview: tidak ada anotasi maupun jendela (default: otomatis jika tidak ada display)')
     return parser.parse_args()
 
 # Inisialisasi LCD
@@ -284,6 +287,7 @@ def verify_face(threshold=FACE_RECOGNITION_THRESHOLD, resolution="480p", fps=15,
             return False, None
         else:
             print(f"[+] Berhasil memuat database dengan {len(embeddings_dict)} orang")
+            gallery = attach_ann_index(Gallery(embeddings_dict), embeddings_path)
     except Exception as e:
         print(f"[!] Gagal memuat embeddings: {e}")
         display_lcd("Error Data", "Wajah")
@@ -307,6 +311,9 @@ def verify_face(threshold=FACE_RECOGNITION_THRESHOLD, resolution="480p", fps=15,
     print("[INFO] Posisikan wajah Anda di depan kamera untuk verifikasi...")
     print(f"[INFO] Menggunakan threshold: {threshold}")
     
+    # Preview opsional; dalam mode headless tidak ada anotasi maupun jendela
+    preview = get_preview()
+    
     while time.time() - start_time < timeout and not verified:
         try:
             ret, frame = cap.read()
@@ -322,28 +329,31 @@ def verify_face(threshold=FACE_RECOGNITION_THRESHOLD, resolution="480p", fps=15,
                     print("[!] Frame tidak valid, melewati...")
                     continue
                     
-                face_img, bbox = detect_face_mtcnn(frame)
+                face_img, bbox, landmarks = detect_face_aligned(frame)
+                
+                # Anotasi hanya dicatat jika frame ini akan ditampilkan preview
+                overlay = preview.overlay()
                 
                 if face_img is not None and bbox is not None:
                     # Tampilkan kotak di sekitar wajah
-                    frame = draw_face_box(frame, bbox)
+                    overlay.draw(draw_face_box, bbox)
                     
                     # Proses wajah dan ekstrak embedding
                     face_tensor = preprocess_face(face_img)
                     if face_tensor is not None:
                         # Hitung orientasi wajah
-                        pitch, yaw, roll = calculate_face_orientation(bbox, frame.shape)
+                        pitch, yaw, roll = calculate_face_orientation(bbox, frame.shape, landmarks)
                         frontal = is_face_frontal(pitch, yaw, roll)
                         
                         # Tampilkan informasi orientasi wajah pada frame
-                        cv2.putText(frame, f"Pitch: {pitch:.1f}", (10, 60), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
-                        cv2.putText(frame, f"Yaw: {yaw:.1f}", (10, 80), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
-                        cv2.putText(frame, f"Roll: {roll:.1f}", (10, 100), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
-                        cv2.putText(frame, f"Frontal: {'Ya' if frontal else 'Tidak'}", (10, 120), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0) if frontal else (0, 0, 255), 1)
+                        overlay.text(f"Pitch: {pitch:.1f}", (10, 60), 
+                                  0.5, (255, 255, 0), 1)
+                        overlay.text(f"Yaw: {yaw:.1f}", (10, 80), 
+                                  0.5, (255, 255, 0), 1)
+                        overlay.text(f"Roll: {roll:.1f}", (10, 100), 
+                                  0.5, (255, 255, 0), 1)
+                        overlay.text(f"Frontal: {'Ya' if frontal else 'Tidak'}", (10, 120), 
+                                  0.5, (0, 255, 0) if frontal else (0, 0, 255), 1)
                                   
                         # Verifikasi hanya dilakukan jika wajah frontal
                         if frontal:
@@ -351,56 +361,40 @@ def verify_face(threshold=FACE_RECOGNITION_THRESHOLD, resolution="480p", fps=15,
                             embedding = extract_embedding(face_tensor)
                             
                             # Cari kecocokan terbaik
-                            best_match_name = None
-                            best_match_score = 0
-                            
-                            for name, embeddings_list in embeddings_dict.items():
-                                if isinstance(embeddings_list, list):
-                                    # Jika ada multiple embeddings untuk satu orang
-                                    for ref_embedding in embeddings_list:
-                                        similarity = compute_similarity(embedding, ref_embedding)
-                                        if similarity > best_match_score:
-                                            best_match_score = similarity
-                                            best_match_name = name
-                                else:
-                                    # Jika hanya ada satu embedding
-                                    similarity = compute_similarity(embedding, embeddings_list)
-                                    if similarity > best_match_score:
-                                        best_match_score = similarity
-                                        best_match_name = name
+                            best_match_name, best_match_score = gallery.best_match(embedding)
                             
                             # Tampilkan hasil kecocokan
-                            cv2.putText(frame, f"Kecocokan: {best_match_score:.2f}", (10, 140), 
-                                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                            overlay.text(f"Kecocokan: {best_match_score:.2f}", (10, 140), 
+                                      0.5, (255, 255, 255), 1)
                                       
                             if best_match_score >= threshold:
                                 # Tampilkan hasil positif
-                                cv2.putText(frame, f"{best_match_name}: {best_match_score:.2f}", 
-                                          (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                                cv2.putText(frame, "TERVERIFIKASI!", (frame.shape[1] - 200, 30), 
-                                          cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                                overlay.text(f"{best_match_name}: {best_match_score:.2f}", 
+                                          (10, 30), 0.7, (0, 255, 0), 2)
+                                overlay.text("TERVERIFIKASI!", (frame.shape[1] - 200, 30), 
+                                          0.8, (0, 255, 0), 2)
                                 verified = True
                                 user_name = best_match_name
                             else:
                                 # Tampilkan hasil negatif
-                                cv2.putText(frame, f"Unknown: {best_match_score:.2f}", 
-                                          (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                                overlay.text(f"Unknown: {best_match_score:.2f}", 
+                                          (10, 30), 0.7, (0, 0, 255), 2)
             except Exception as e:
                 print(f"[!] Error dalam deteksi wajah: {e}")
                 continue
             
             # Tampilkan waktu tersisa
             remaining = int(timeout - (time.time() - start_time))
-            cv2.putText(frame, f"Waktu: {remaining}s", (10, frame.shape[0] - 10), 
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            overlay.text(f"Waktu: {remaining}s", (10, frame.shape[0] - 10), 
+                      0.6, (0, 0, 255), 2)
             
             # Tampilkan threshold
-            cv2.putText(frame, f"Threshold: {threshold}", (frame.shape[1] - 150, frame.shape[0] - 10), 
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            overlay.text(f"Threshold: {threshold}", (frame.shape[1] - 150, frame.shape[0] - 10), 
+                      0.5, (255, 255, 255), 1)
             
-            # Tampilkan frame
-            cv2.imshow("Verifikasi Wajah", frame)
-            if cv2.waitKey(1) == 27:  # ESC untuk keluar
+            # Tampilkan frame (thread preview, dibatasi PREVIEW_MAX_FPS)
+            preview.submit("Verifikasi Wajah", frame, overlay)
+            if preview.key() == 27:  # ESC untuk keluar
                 break
                 
         except Exception as e:
@@ -409,7 +403,7 @@ def verify_face(threshold=FACE_RECOGNITION_THRESHOLD, resolution="480p", fps=15,
     
     # Bersihkan sumber daya
     cap.release()
-    cv2.destroyAllWindows()
+    preview.close_window("Verifikasi Wajah")
     
     if verified:
         print(f"[+] Wajah terverifikasi untuk pengguna: {user_name} (skor: {best_match_score:.2f})")
@@ -431,6 +425,9 @@ def main():
     # Gunakan file embedding dari argumen
     embeddings_path = args.embeddings
     
+    if args.headless:
+        set_headless(True)
+    
     # Tentukan kamera yang akan digunakan
     camera_devices = CAMERA_DEVICES
     if args.camera is not None:
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tracking wajah utama antar frame untuk mengurangi jumlah deteksi MTCNN.
+
+MTCNN penuh (detect_face_aligned) hanya dijalankan setiap TRACK_REDETECT_INTERVAL frame
+atau saat track hilang. Di antaranya box wajah diikuti dengan optical flow pyramidal
+Lucas-Kanade dari titik fitur di dalam wajah: titik yang gagal cek forward-backward
+(TRACK_MAX_FB_ERROR) dibuang, lalu box digeser dan diskalakan dengan median perpindahan
+titik yang tersisa. Track dianggap hilang jika titik tersisa kurang dari TRACK_MIN_POINTS
+atau box keluar dari frame (TRACK_MIN_VISIBLE).
+"""
+
+import cv2
+import numpy as np
+
+import mtcnn_utils
+from mtcnn_utils import detect_face_aligned
+
+# Deteksi MTCNN penuh dijalankan setiap N frame; di antaranya box diikuti dengan optical flow
+TRACK_REDETECT_INTERVAL = 10
+
+# Jumlah titik fitur yang dicari di dalam box wajah saat deteksi
+TRACK_MAX_POINTS = 50
+
+# Minimal titik yang berhasil diikuti; di bawah ini track dianggap hilang dan MTCNN dijalankan lagi
+TRACK_MIN_POINTS = 8
+
+# Error forward-backward maksimal (piksel) agar sebuah titik dianggap berhasil diikuti
+TRACK_MAX_FB_ERROR = 1.0
+
+# Proporsi minimal box yang masih berada di dalam frame
+TRACK_MIN_VISIBLE = 0.6
+
+_LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+class FaceTracker:
+    """
+    Deteksi-lalu-ikuti wajah utama dalam stream kamera
+
+    MTCNN dijalankan pada frame pertama, setiap TRACK_REDETECT_INTERVAL frame, dan
+    segera setelah track hilang. Di antaranya box digeser dan diskalakan dengan median
+    optical flow (Lucas-Kanade, dicek forward-backward) dari titik fitur di dalam wajah,
+    yang jauh lebih murah daripada piramida MTCNN.
+
+    Landmark dari deteksi terakhir ikut digeser dan diskalakan bersama box, sehingga
+    frame hasil tracking juga menghasilkan crop yang disejajarkan jika ALIGN_FACES aktif.
+
+    update() memakai kontrak yang sama dengan detect_face_mtcnn: (cropped_face, bbox).
+    Satu instance untuk satu stream kamera; panggil reset() saat sesi baru dimulai.
+    """
+
+    def __init__(self, redetect_interval=TRACK_REDETECT_INTERVAL, detector=None):
+        """
+        Args:
+            redetect_interval (int): Jumlah frame maksimal antar deteksi MTCNN
+            detector (callable, optional): Fungsi frame -> (face, bbox, landmarks)
+                                           (default detect_face_aligned)
+        """
+        self.redetect_interval = max(1, redetect_interval)
+        self.detector = detector or detect_face_aligned
+
+        # Statistik
+        self.frames = 0
+        self.detections = 0
+        self.lost = 0
+
+        self.reset()
+
+    def reset(self):
+        """Melupakan wajah yang sedang diikuti (frame berikutnya memakai deteksi penuh)"""
+        self.bbox = None
+        self.landmarks = None
+        self._box = None
+        self._prev_gray = None
+        self._points = None
+        self._seed_count = 0
+        self._since_detect = 0
+
+    def detector_share(self):
+        """Proporsi frame yang menjalankan detector penuh"""
+        return self.detections / self.frames if self.frames else 0.0
+
+    def _seed_points(self, gray, bbox):
+        """Mencari titik fitur di bagian tengah box wajah"""
+        x1, y1, x2, y2 = bbox
+        margin_x = (x2 - x1) // 10
+        margin_y = (y2 - y1) // 10
+        mask = np.zeros(gray.shape, dtype=np.uint8)
+        mask[y1 + margin_y:y2 - margin_y, x1 + margin_x:x2 - margin_x] = 255
+
+        points = cv2.goodFeaturesToTrack(gray, TRACK_MAX_POINTS, 0.01, 5, mask=mask)
+        if points is None or len(points) < TRACK_MIN_POINTS:
+            return None
+        self._seed_count = len(points)
+        return points.astype(np.float32)
+
+    def _track(self, gray):
+        """
+        Memperbarui box dengan optical flow dari frame sebelumnya
+
+        Returns:
+            list: Box baru [x1, y1, x2, y2] atau None jika track hilang
+        """
+        if self._points is None or self._prev_gray is None:
+            return None
+
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, self._points, None, **_LK_PARAMS)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, points, None, **_LK_PARAMS)
+
+        fb_error = np.linalg.norm((self._points - back).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < TRACK_MAX_FB_ERROR)
+        if np.count_nonzero(good) < TRACK_MIN_POINTS:
+            return None
+
+        old = self._points.reshape(-1, 2)[good]
+        new = points.reshape(-1, 2)[good]
+
+        # Pergeseran dan skala dari median (tahan terhadap titik yang salah)
+        dx, dy = np.median(new - old, axis=0)
+        i, j = np.triu_indices(len(old), k=1)
+        old_dist = np.linalg.norm(old[i] - old[j], axis=1)
+        new_dist = np.linalg.norm(new[i] - new[j], axis=1)
+        valid = old_dist > 1e-3
+        scale = float(np.median(new_dist[valid] / old_dist[valid])) if np.any(valid) else 1.0
+
+        # Box float disimpan terpisah agar pembulatan tidak menumpuk dari frame ke frame
+        x1, y1, x2, y2 = self._box
+        cx = (x1 + x2) / 2 + dx
+        cy = (y1 + y2) / 2 + dy
+        half_w = (x2 - x1) * scale / 2
+        half_h = (y2 - y1) * scale / 2
+        box = [cx - half_w, cy - half_h, cx + half_w, cy + half_h]
+
+        # Box yang sebagian besar keluar frame dianggap hilang
+        height, width = gray.shape[:2]
+        clipped = [max(0, int(round(box[0]))), max(0, int(round(box[1]))),
+                   min(width, int(round(box[2]))), min(height, int(round(box[3])))]
+        visible = max(0, clipped[2] - clipped[0]) * max(0, clipped[3] - clipped[1])
+        if visible < TRACK_MIN_VISIBLE * (2 * half_w) * (2 * half_h):
+            return None
+
+        if self.landmarks is not None:
+            center = np.array([(x1 + x2) / 2, (y1 + y2) / 2], dtype=np.float32)
+            self.landmarks = (self.landmarks - center) * scale + np.array([cx, cy], dtype=np.float32)
+
+        self._points = new.reshape(-1, 1, 2)
+        self._box = box
+        return clipped
+
+    def update(self, frame):
+        """
+        Mencari wajah utama pada frame berikutnya dari stream
+
+        Args:
+            frame (numpy.ndarray): Frame BGR
+
+        Returns:
+            tuple: (cropped_face, bounding_box) seperti detect_face_mtcnn
+        """
+        if frame is None or not isinstance(frame, np.ndarray) or len(frame.shape) < 3:
+            print("[!] Frame tidak valid (None atau bukan numpy array)")
+            return None, None
+
+        self.frames += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if self.bbox is not None and self._since_detect < self.redetect_interval:
+            bbox = self._track(gray)
+            if bbox is not None:
+                self.bbox = bbox
+                self._prev_gray = gray
+                self._since_detect += 1
+
+                # Tambah titik baru jika banyak yang hilang
+                if len(self._points) < self._seed_count // 2:
+                    self._points = self._seed_points(gray, bbox)
+
+                face = None
+                if mtcnn_utils.ALIGN_FACES and self.landmarks is not None:
+                    face = mtcnn_utils.align_face(frame, self.landmarks)
+                if face is None:
+                    x1, y1, x2, y2 = bbox
+                    face = frame[y1:y2, x1:x2]
+                return face, bbox
+            self.lost += 1
+
+        # Deteksi penuh (frame pertama, interval habis, atau track hilang)
+        self.detections += 1
+        face_img, bbox, landmarks = self.detector(frame)
+        if bbox is None:
+            self.reset()
+            return None, None
+
+        self.bbox = [int(coord) for coord in bbox]
+        self.landmarks = None if landmarks is None else np.asarray(landmarks, dtype=np.float32)
+        self._box = [float(coord) for coord in bbox]
+        self._prev_gray = gray
+        self._points = self._seed_points(gray, self.bbox)
+        self._since_detect = 0
+        return face_img, bbox
@@ -10,11 +10,19 @@ import json
 import pickle
 import glob
 import datetime
+import embedding_store
+from camera_service import get_camera_service, close_camera_service
+from preview import get_preview
 
 # Import modul ArcFace dan lainnya
 try:
-    from mtcnn_utils import detect_face_mtcnn, draw_face_box
-    from arcface_utils import preprocess_face, extract_embedding, save_embeddings, load_embeddings, compute_similarity
+    import mtcnn_utils
+    import arcface_utils
+    from mtcnn_utils import detect_face_mtcnn, detect_face_aligned, draw_face_box
+    from face_tracker import FaceTracker
+    from face_quality import quality_gate
+    from unknown_evidence import get_evidence_recorder, preroll_frames
+    from arcface_utils import preprocess_face, extract_embedding, embed_face, EmbeddingCache, face_fingerprint, preprocess_faces, extract_embeddings, set_embedding, load_embeddings, Gallery, get_gallery_cache
     from head_pose import calculate_face_orientation, draw_face_orientation, is_face_frontal
     ARCFACE_AVAILABLE = True
 except ImportError:
@@ -45,6 +53,28 @@ BAUDRATE = 57600
 CAMERA_DEVICES = ['/dev/video1', '/dev/video2', 0]  # Coba /dev/video1, /dev/video2, kemudian indeks 0
 CAMERA_ID = 0  # Default kamera untuk kompatibilitas
 
+# Pendaftaran wajah tanpa display (headless): instruksi dicetak (dan ditampilkan di LCD), lalu
+# foto diambil otomatis saat pose sesuai instruksi dan crop lolos gerbang kualitas; dibatalkan
+# jika 5 foto belum terkumpul dalam batas waktu ini (detik)
+ENROLL_HEADLESS_TIMEOUT = 60
+
+# Foto miring (headless): yaw atau roll minimal sudut ini (derajat); foto miring kedua harus
+# ke arah sebaliknya dari foto miring pertama
+ENROLL_MIN_TILT = 12.0
+
+# Foto ekspresi (headless): crop frontal harus berbeda minimal sebesar ini (proporsi bit
+# face_fingerprint yang berbeda) dari semua foto sebelumnya, bukan frame yang hampir sama
+ENROLL_MIN_CHANGE = 0.15
+
+# Instruksi pose per foto pendaftaran: (teks, teks LCD 16 karakter)
+ENROLL_INSTRUCTIONS = [
+    ("Wajah frontal", "Wajah frontal"),
+    ("Wajah miring ke kiri", "Miring ke kiri"),
+    ("Wajah miring ke kanan", "Miring ke kanan"),
+    ("Ekspresi tersenyum", "Tersenyum"),
+    ("Ekspresi lain (bebas)", "Ekspresi bebas"),
+]
+
 # Konfigurasi database
 DB_PATH = 'biometrics.db'
 EMBEDDINGS_PATH = 'embeddings.pkl'  # Path ke file embeddings ArcFace di folder utama
@@ -178,75 +208,24 @@ def initialize_sensor():
 
 def initialize_camera(resolution="480p", fps=15):
     """
-    Inisialisasi kamera untuk pengenalan wajah
+    Mengambil kamera untuk pengenalan wajah
+    
+    Kamera dibuka sekali per proses (CameraService) dan tetap streaming; setiap
+    pemanggil mendapat handle yang release()-nya tidak menutup perangkat, sehingga
+    percobaan berikutnya tidak membayar waktu buka V4L2 dan frame pertama lagi.
     
     Args:
         resolution (str): Resolusi yang diinginkan ("480p" atau "720p")
         fps (int): Frame rate yang diinginkan
     
     Returns:
-        cv2.VideoCapture: Objek kamera yang sudah diinisialisasi
+        CameraHandle: Objek mirip cv2.VideoCapture, None jika kamera tidak dapat dibuka
     """
     try:
-        # Tentukan pengaturan resolusi
-        if resolution == "720p":
-            width, height = 1280, 720
-        else:  # 480p default
-            width, height = 640, 480
-        
-        print(f"[INFO] Mencoba inisialisasi kamera dengan resolusi {width}x{height}")
-        
-        # Pendekatan sederhana: coba setiap device kamera
-        for device in CAMERA_DEVICES:
-            print(f"[INFO] Mencoba membuka kamera: {device}")
-            try:
-                cap = cv2.VideoCapture(device)
-                if not cap.isOpened():
-                    print(f"[INFO] Gagal membuka kamera: {device}")
-                    continue
-                
-                print(f"[INFO] Kamera {device} terbuka")
-                
-                # Atur properti kamera dasar saja
-                cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-                
-                # Verifikasi dengan membaca frame
-                ret, frame = cap.read()
-                if not ret or frame is None:
-                    print(f"[INFO] Kamera {device} tidak dapat membaca frame")
-                    cap.release()
-                    continue
-                
-                # Jika berhasil, kembalikan objek kamera
-                print(f"[INFO] Kamera {device} berhasil diinisialisasi")
-                return cap
-                
-            except Exception as e:
-                print(f"[INFO] Error saat inisialisasi kamera {device}: {e}")
-                if 'cap' in locals() and cap is not None:
-                    cap.release()
-        
-        # Jika semua device gagal, coba fallback ke default (0)
-        print("[INFO] Mencoba kamera default (indeks 0)")
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            print("[INFO] Gagal membuka kamera default")
+        camera = get_camera_service(CAMERA_DEVICES, resolution, fps)
+        if not camera.isOpened():
             return None
-        
-        # Atur properti dasar
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-        
-        # Verifikasi baca frame
-        ret, frame = cap.read()
-        if not ret or frame is None:
-            print("[INFO] Kamera default tidak dapat membaca frame")
-            cap.release()
-            return None
-        
-        print("[INFO] Kamera default berhasil diinisialisasi")
-        return cap
+        return camera.handle()
     
     except Exception as e:
         print(f"[!] Error saat inisialisasi kamera: {e}")
@@ -278,6 +257,12 @@ def capture_face(resolution="480p", fps=15):
     start_time = time.time()
     timeout = 15  # Batas waktu 15 detik
     
+    # MTCNN hanya dijalankan berkala; di antaranya wajah diikuti dengan optical flow
+    tracker = FaceTracker()
+    
+    # Tanpa display (headless) wajah pertama yang terdeteksi langsung diambil
+    preview = get_preview()
+    
     while time.time() - start_time < timeout:
         # Baca frame dari kamera
         ret, frame = cap.read()
@@ -291,34 +276,41 @@ def capture_face(resolution="480p", fps=15):
                 print("[!] Frame tidak valid, melewati...")
                 continue
                 
-            # Deteksi wajah dengan MTCNN
-            face_img, bbox = detect_face_mtcnn(frame)
+            # Deteksi wajah (MTCNN + tracking)
+            face_img, bbox = tracker.update(frame)
+            
+            # Anotasi hanya dicatat jika frame ini akan ditampilkan preview
+            overlay = preview.overlay()
             
             # Jika wajah terdeteksi
             if bbox is not None:
+                if preview.headless:
+                    print("[+] Gambar wajah diambil otomatis (headless).")
+                    break
+                
                 # Gambar kotak di sekitar wajah
-                frame_with_box = draw_face_box(frame, bbox)
+                overlay.draw(draw_face_box, bbox)
                 
                 # Tampilkan frame
-                cv2.putText(frame_with_box, "Wajah terdeteksi!", (10, 30), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                cv2.putText(frame_with_box, "Tekan 'SPASI' untuk mengambil gambar", 
-                          (10, frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                cv2.imshow("Pengambilan Wajah", frame_with_box)
+                overlay.text("Wajah terdeteksi!", (10, 30), 
+                          0.7, (0, 255, 0), 2)
+                overlay.text("Tekan 'SPASI' untuk mengambil gambar", 
+                          (10, frame.shape[0] - 10), 0.6, (255, 255, 255), 2)
+                preview.submit("Pengambilan Wajah", frame, overlay)
                 
-                key = cv2.waitKey(1)
+                key = preview.key()
                 if key == 32:  # Spasi
                     print("[+] Gambar wajah diambil.")
                     break
             else:
                 # Jika tidak ada wajah, tampilkan frame biasa
-                cv2.putText(frame, "Tidak ada wajah terdeteksi", (10, 30), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                cv2.putText(frame, "Posisikan wajah Anda di depan kamera", 
-                          (10, frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                cv2.imshow("Pengambilan Wajah", frame)
+                overlay.text("Tidak ada wajah terdeteksi", (10, 30), 
+                          0.7, (0, 0, 255), 2)
+                overlay.text("Posisikan wajah Anda di depan kamera", 
+                          (10, frame.shape[0] - 10), 0.6, (255, 255, 255), 2)
+                preview.submit("Pengambilan Wajah", frame, overlay)
                 
-                key = cv2.waitKey(1)
+                key = preview.key()
                 if key == 27:  # ESC
                     print("[!] Pengguna membatalkan pengambilan wajah.")
                     break
@@ -328,7 +320,7 @@ def capture_face(resolution="480p", fps=15):
     
     # Bersihkan resources
     cap.release()
-    cv2.destroyAllWindows()
+    preview.close_window("Pengambilan Wajah")
     
     # Cek apakah wajah berhasil diambil
     if face_img is None or bbox is None:
@@ -339,6 +331,43 @@ def capture_face(resolution="480p", fps=15):
     print("[+] Gambar wajah berhasil diambil.")
     return face_img, bbox
 
+def headless_enroll_ready(shot, pose, fingerprint, captured, tilt=None):
+    """
+    Memeriksa apakah frame cocok untuk foto pendaftaran ke-shot tanpa display
+    
+    Tanpa preview tidak ada yang menekan SPASI, jadi pose dibaca dari landmark: foto 1
+    frontal, foto 2 dan 3 miring (yaw atau roll >= ENROLL_MIN_TILT) ke arah yang berlawanan,
+    foto 4 dan 5 frontal tetapi tampak berbeda (face_fingerprint) dari semua foto sebelumnya.
+    
+    Args:
+        shot (int): Indeks foto (0-4)
+        pose (tuple): (pitch, yaw, roll) dalam derajat
+        fingerprint (numpy.ndarray): face_fingerprint crop saat ini
+        captured (list): face_fingerprint foto yang sudah diambil
+        tilt (tuple, optional): (sumbu, tanda) foto miring pertama
+    
+    Returns:
+        tuple: (siap, (sumbu, tanda) kemiringan untuk foto miring atau None)
+    """
+    pitch, yaw, roll = pose
+    if shot == 0:
+        return is_face_frontal(pitch, yaw, roll), None
+    
+    if shot in (1, 2):
+        axis = 1 if abs(yaw) >= abs(roll) else 2
+        if shot == 2 and tilt is not None:
+            # Miring ke arah sebaliknya pada sumbu yang sama dengan foto miring pertama
+            axis, sign = tilt
+            return pose[axis] * sign <= -ENROLL_MIN_TILT, tilt
+        return abs(pose[axis]) >= ENROLL_MIN_TILT, (axis, 1 if pose[axis] > 0 else -1)
+    
+    if not is_face_frontal(pitch, yaw, roll) or fingerprint is None:
+        return False, None
+    for other in captured:
+        if other is not None and np.unpackbits(fingerprint ^ other).mean() < ENROLL_MIN_CHANGE:
+            return False, None
+    return True, None
+
 def capture_face_arcface(username):
     """
     Mengambil 5 foto wajah untuk ArcFace dan mengekstrak embedding
@@ -353,11 +382,11 @@ def capture_face_arcface(username):
         print("[!] Fitur ArcFace tidak tersedia. Menggunakan metode capture_face standar...")
         return capture_face()
     
-    # Buka kamera
-    cap = cv2.VideoCapture(CAMERA_ID)
+    # Ambil kamera bersama
+    cap = initialize_camera()
     
-    if not cap.isOpened():
-        print(f"[!] Gagal membuka kamera {CAMERA_ID}")
+    if not cap:
+        print("[!] Gagal membuka kamera")
         return None
     
     # Buat direktori untuk menyimpan foto
@@ -377,60 +406,92 @@ def capture_face_arcface(username):
     
     print(f"\n=== PENGAMBILAN FOTO WAJAH UNTUK: {username} ===")
     print("Ambil 5 foto dengan pose berbeda:")
-    print("1. Wajah frontal")
-    print("2. Wajah miring ke kiri")
-    print("3. Wajah miring ke kanan")
-    print("4. Ekspresi tersenyum")
-    print("5. Ekspresi lain (bebas)")
-    print("\nTekan SPASI untuk mengambil foto (5 foto diperlukan)")
-    print("Tekan 'a' untuk mengaktifkan/menonaktifkan penampilan sudut wajah")
-    print("Tekan ESC untuk keluar")
-    
-    embeddings = []
+    for number, (text, _) in enumerate(ENROLL_INSTRUCTIONS, 1):
+        print(f"{number}. {text}")
+    
+    # Preview opsional; tanpa display (headless) SPASI tidak pernah datang, jadi foto diambil
+    # otomatis saat pose sesuai instruksi (headless_enroll_ready)
+    preview = get_preview()
+    if preview.headless:
+        print(f"\n[INFO] Mode headless: foto diambil otomatis saat pose sesuai instruksi dan wajah jelas "
+              f"(batas waktu {ENROLL_HEADLESS_TIMEOUT} detik)")
+    else:
+        print("\nTekan SPASI untuk mengambil foto (5 foto diperlukan)")
+        print("Tekan 'a' untuk mengaktifkan/menonaktifkan penampilan sudut wajah")
+        print("Tekan ESC untuk keluar")
+    
+    face_crops = []
+    captured_fingerprints = []
+    tilt = None
     photos_captured = 0
-    required_photos = 5
-    instruction_text = "Wajah frontal"
+    required_photos = len(ENROLL_INSTRUCTIONS)
+    instruction_text = ENROLL_INSTRUCTIONS[0][0]
     show_angles = True  # Tampilkan sudut orientasi wajah secara default
+    start_time = time.time()
+    announce = True
     
     while photos_captured < required_photos:
+        if announce and preview.headless:
+            # Tanpa preview instruksi hanya terlihat di konsol dan LCD
+            print(f"[INFO] Foto {photos_captured+1}/{required_photos}: {instruction_text}")
+            display_lcd(f"Foto {photos_captured+1}/{required_photos}", ENROLL_INSTRUCTIONS[photos_captured][1])
+        announce = False
+        
+        if preview.headless and time.time() - start_time > ENROLL_HEADLESS_TIMEOUT:
+            print(f"[!] Batas waktu habis, baru {photos_captured}/{required_photos} foto diambil.")
+            break
+        
         ret, frame = cap.read()
         if not ret:
             print("[!] Gagal membaca frame dari kamera!")
             break
         
         # Deteksi wajah dengan MTCNN
-        face_img, bbox = detect_face_mtcnn(frame)
+        face_img, bbox, landmarks = detect_face_aligned(frame)
+        
+        # Anotasi hanya dicatat jika frame ini akan ditampilkan preview
+        overlay = preview.overlay()
         
         # Tampilkan frame dengan kotak wajah dan orientasi wajah jika diaktifkan
+        pose = None
         if bbox is not None:
             # Hitung orientasi wajah
-            pitch, yaw, roll = calculate_face_orientation(bbox, frame.shape)
+            pitch, yaw, roll = pose = calculate_face_orientation(bbox, frame.shape, landmarks)
             
             # Tampilkan kotak wajah dan sudut jika diaktifkan
             if show_angles:
-                frame = draw_face_orientation(frame, bbox, pitch, yaw, roll)
+                overlay.draw(draw_face_orientation, bbox, pitch, yaw, roll)
             else:
-                frame = draw_face_box(frame, bbox)
+                overlay.draw(draw_face_box, bbox)
             
             # Tambahkan indikator posisi wajah frontal
             is_frontal = is_face_frontal(pitch, yaw, roll)
             frontal_status = "FRONTAL" if is_frontal else "TIDAK FRONTAL"
             frontal_color = (0, 255, 0) if is_frontal else (0, 0, 255)
-            cv2.putText(frame, frontal_status, (frame.shape[1] - 150, 30), 
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, frontal_color, 2)
+            overlay.text(frontal_status, (frame.shape[1] - 150, 30), 
+                      0.7, frontal_color, 2)
         
         # Tampilkan instruksi dan jumlah foto
-        cv2.putText(frame, f"Foto {photos_captured+1}/5: {instruction_text}", 
-                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        cv2.putText(frame, f"Pengguna: {username}", 
-                    (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        cv2.putText(frame, "Tekan SPASI untuk mengambil foto", 
-                    (10, frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        overlay.text(f"Foto {photos_captured+1}/{required_photos}: {instruction_text}", 
+                    (10, 30), 0.7, (0, 255, 0), 2)
+        overlay.text(f"Pengguna: {username}", 
+                    (10, 60), 0.7, (0, 255, 0), 2)
+        overlay.text("Tekan SPASI untuk mengambil foto", 
+                    (10, frame.shape[0] - 10), 0.5, (255, 255, 255), 1)
         
-        # Tampilkan frame
-        cv2.imshow("Pengambilan Foto", frame)
+        # Tampilkan frame (thread preview, dibatasi PREVIEW_MAX_FPS)
+        preview.submit("Pengambilan Foto", frame, overlay)
+        
+        key = preview.key()
+        fingerprint = None
+        if preview.headless and pose is not None and face_img is not None and face_img.size > 0:
+            # Headless: ambil otomatis jika pose sesuai instruksi foto ini
+            fingerprint = face_fingerprint(face_img)
+            ready, shot_tilt = headless_enroll_ready(photos_captured, pose, fingerprint,
+                                                     captured_fingerprints, tilt)
+            if ready:
+                key = 32
         
-        key = cv2.waitKey(1)
         if key == 27:  # ESC
             break
         elif key == 97:  # 'a' untuk toggle sudut
@@ -438,49 +499,55 @@ def capture_face_arcface(username):
             status = "aktif" if show_angles else "nonaktif"
             print(f"[INFO] Penampilan sudut wajah: {status}")
         elif key == 32 and bbox is not None:  # SPASI
-            # Pra-pemrosesan wajah
-            face_tensor = preprocess_face(face_img)
-            
-            if face_tensor is not None:
+            if face_img is not None and face_img.size > 0:
+                # Gerbang kualitas yang sama untuk SPASI dan pengambilan otomatis (blur,
+                # eksposur, ukuran; pose sengaja tidak diperiksa karena ada foto miring)
+                quality_ok, quality_reason = quality_gate.check(face_img, bbox)
+                if not quality_ok:
+                    if not preview.headless:
+                        print(f"[!] Kualitas foto rendah ({quality_reason}), silakan ulangi")
+                    continue
+                
                 # Simpan foto
                 photo_path = os.path.join(photo_dir, f"{username}_{photos_captured+1}.jpg")
                 cv2.imwrite(photo_path, face_img)
                 
-                # Ekstrak embedding
-                embedding = extract_embedding(face_tensor)
-                embeddings.append(embedding)
+                # Embedding diekstrak sekaligus (satu batch) setelah semua foto diambil
+                face_crops.append(face_img)
+                captured_fingerprints.append(fingerprint if fingerprint is not None else face_fingerprint(face_img))
+                if preview.headless and photos_captured == 1:
+                    tilt = shot_tilt
                 
                 photos_captured += 1
-                print(f"[+] Foto {photos_captured}/5 diambil dan disimpan ke {photo_path}")
+                print(f"[+] Foto {photos_captured}/{required_photos} diambil dan disimpan ke {photo_path}")
                 
                 # Update instruksi untuk foto berikutnya
-                if photos_captured == 1:
-                    instruction_text = "Wajah miring ke kiri"
-                elif photos_captured == 2:
-                    instruction_text = "Wajah miring ke kanan"
-                elif photos_captured == 3:
-                    instruction_text = "Ekspresi tersenyum"
-                elif photos_captured == 4:
-                    instruction_text = "Ekspresi lain (bebas)"
+                if photos_captured < required_photos:
+                    instruction_text = ENROLL_INSTRUCTIONS[photos_captured][0]
+                    announce = True
                 
                 # Berikan jeda untuk perubahan pose
                 time.sleep(1)
     
     cap.release()
-    cv2.destroyAllWindows()
+    preview.close_window("Pengambilan Foto")
+    
+    if not face_crops:
+        print("[!] Tidak ada foto yang diambil.")
+        return None
+    
+    # Ekstrak embedding semua foto dalam satu forward pass
+    face_batch, _ = preprocess_faces(face_crops)
+    embeddings = extract_embeddings(face_batch)
     
-    if photos_captured > 0:
+    if len(embeddings) > 0:
         # Hitung rata-rata embedding
-        avg_embedding = np.mean(np.array(embeddings), axis=0)
-        
-        # Muat embedding yang sudah ada (jika ada)
-        embeddings_dict = load_embeddings(EMBEDDINGS_PATH)
+        avg_embedding = np.mean(embeddings, axis=0)
         
-        # Simpan embedding baru
-        embeddings_dict[username] = avg_embedding
-        save_embeddings(embeddings_dict, EMBEDDINGS_PATH)
+        # Simpan embedding baru (satu record journal, tanpa menulis ulang galeri)
+        set_embedding(EMBEDDINGS_PATH, username, avg_embedding)
         
-        print(f"[+] Berhasil menyimpan rata-rata embedding untuk {username} dari {photos_captured} foto")
+        print(f"[+] Berhasil menyimpan rata-rata embedding untuk {username} dari {len(embeddings)} foto")
         print(f"[+] Embedding disimpan di {EMBEDDINGS_PATH}")
         
         return EMBEDDINGS_PATH
@@ -634,98 +701,79 @@ def import_face_embedding(embedding_path, username=None):
         print(f"[!] Gagal mengimpor embedding wajah: {e}")
         return None
 
-def capture_unknown_face(resolution="480p", fps=15):
-    """
-    Mengambil gambar wajah tidak dikenal dan menyimpannya
-    
-    Args:
-        resolution (str): Resolusi kamera yang digunakan
-        fps (int): Frame rate yang digunakan
-        
-    Returns:
-        str: Path ke gambar yang disimpan jika berhasil, None jika gagal
-    """
-    # Inisialisasi kamera
-    cap = initialize_camera(resolution=resolution, fps=fps)
-    if not cap:
-        print("[!] Gagal inisialisasi kamera.")
-        return None
-    
-    print("[+] Mengambil gambar wajah yang tidak dikenal...")
-    display_lcd("Memotret", "Wajah asing")
-    
-    # Buat folder untuk menyimpan gambar jika belum ada
-    os.makedirs("unknown_faces", exist_ok=True)
-    
-    # Ambil satu frame
+def _record_unknown_face(image_path, notes="Wajah tidak dikenal terdeteksi"):
+    """Mencatat gambar wajah tidak dikenal ke database"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO unknown_faces (image_path, notes) VALUES (?, ?)", 
+                (image_path, notes))
+    conn.commit()
+    conn.close()
+
+def _capture_unknown_face_haar(cap):
+    """Mengambil satu frame dan menyimpannya jika Haar Cascade menemukan wajah (tanpa MTCNN)"""
     ret, frame = cap.read()
     if not ret:
         print("[!] Gagal membaca frame dari kamera.")
-        cap.release()
         return None
     
-    # Cek apakah ada wajah menggunakan MTCNN jika tersedia
-    if ARCFACE_AVAILABLE:
-        try:
-            face_img, bbox = detect_face_mtcnn(frame)
-            if bbox is None:
-                print("[!] Tidak ada wajah terdeteksi")
-                return None
-            
-            # Tambahkan kotak di sekitar wajah
-            frame = draw_face_box(frame, bbox)
-        except Exception as e:
-            print(f"[!] Error dalam deteksi wajah: {e}")
-            # Jika gagal menggunakan MTCNN, gunakan Haar Cascade
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-            
-            if len(faces) == 0:
-                print("[!] Tidak ada wajah terdeteksi")
-                return None
-            
-            # Tambahkan kotak di sekitar wajah
-            for (x, y, w, h) in faces:
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
-    else:
-        # Gunakan Haar Cascade jika MTCNN tidak tersedia
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-        
-        if len(faces) == 0:
-            print("[!] Tidak ada wajah terdeteksi")
-            return None
-        
-        # Tambahkan kotak di sekitar wajah
-        for (x, y, w, h) in faces:
-            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    faces = face_cascade.detectMultiScale(gray, 1.3, 5)
     
-    # Tambahkan teks "UNKNOWN" pada gambar
-    cv2.putText(frame, "UNKNOWN", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+    if len(faces) == 0:
+        print("[!] Tidak ada wajah terdeteksi")
+        return None
+    
+    # Tambahkan kotak di sekitar wajah
+    for (x, y, w, h) in faces:
+        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
     
-    # Tambahkan timestamp
+    # Tambahkan teks "UNKNOWN" dan timestamp pada gambar
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    cv2.putText(frame, "UNKNOWN", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
     cv2.putText(frame, timestamp, (10, frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
     
     # Simpan gambar
+    os.makedirs("unknown_faces", exist_ok=True)
     image_path = os.path.join("unknown_faces", f"unknown_{timestamp}.jpg")
     cv2.imwrite(image_path, frame)
-    
-    # Tambahkan gambar ke database
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO unknown_faces (image_path, notes) VALUES (?, ?)", 
-                (image_path, "Wajah tidak dikenal terdeteksi"))
-    conn.commit()
-    conn.close()
+    _record_unknown_face(image_path)
     
     print(f"[+] Gambar wajah tidak dikenal disimpan di: {image_path}")
+    return image_path
+
+def capture_unknown_face(resolution="480p", fps=15):
+    """
+    Menyimpan gambar wajah tidak dikenal dari pre-roll kamera
     
-    # Bersihkan resources
-    cap.release()
+    Frame beberapa detik terakhir diambil dari ring buffer kamera bersama (tanpa
+    membuka kamera atau menunggu frame baru), lalu job background memilih frame
+    wajah terbaik (probabilitas deteksi dan ketajaman), menyimpannya, dan mencatatnya
+    ke database. Fungsi ini langsung kembali sehingga loop pintu bisa memindai lagi.
+    
+    Args:
+        resolution (str): Resolusi kamera yang digunakan
+        fps (int): Frame rate yang digunakan
+        
+    Returns:
+        str: Path gambar yang akan disimpan, None jika gagal
+    """
+    cap = initialize_camera(resolution=resolution, fps=fps)
+    if not cap:
+        print("[!] Gagal inisialisasi kamera.")
+        return None
+    
+    display_lcd("Memotret", "Wajah asing")
+    
+    # Tanpa MTCNN: satu frame diperiksa dengan Haar Cascade seperti semula
+    if not ARCFACE_AVAILABLE:
+        return _capture_unknown_face_haar(cap)
     
+    image_path = get_evidence_recorder().submit(preroll_frames(cap), "unknown_faces",
+                                                on_saved=_record_unknown_face)
+    if image_path:
+        print("[+] Bukti wajah tidak dikenal diproses di background")
     return image_path
 
 def enroll_user(existing_embedding_path=None):
@@ -903,7 +951,7 @@ def scan_fingerprint():
             # Tangkap wajah tidak dikenal jika sidik jari tidak dikenali
             # Pastikan initialization parameter lengkap
             image_path = capture_unknown_face(resolution="480p", fps=15)
-            print(f"[+] Gambar wajah tidak dikenal disimpan: {image_path}")
+            print(f"[+] Gambar wajah tidak dikenal akan disimpan: {image_path}")
             
             return None
         else:
@@ -1013,10 +1061,29 @@ def verify_identity(fingerprint_id=None, face_check=True, threshold=0.4, resolut
         
         return False, None
     
+    # Jika verifikasi dengan sidik jari, cari nama pengguna pemilik sidik jari
+    target_name = None
+    if fingerprint_id is not None:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM users WHERE fingerprint_id = ?", (fingerprint_id,))
+        result = cursor.fetchone()
+        conn.close()
+        
+        if result:
+            target_name = result[0]
+    
     # Muat embeddings wajah
     try:
-        embeddings_dict = load_embeddings(EMBEDDINGS_PATH)
-        if not embeddings_dict:
+        if target_name:
+            # Pengguna sudah diketahui dari sidik jari: ambil template miliknya saja (1:1)
+            templates = embedding_store.fetch_user_templates(EMBEDDINGS_PATH, target_name)
+            gallery = Gallery({target_name: templates}) if templates is not None else Gallery()
+        else:
+            # Ambil galeri wajah dari cache (dimuat ulang di background jika file berubah)
+            gallery = get_gallery_cache(EMBEDDINGS_PATH).get()
+        
+        if len(gallery) == 0 and not target_name:
             print("[!] Database wajah kosong")
             display_lcd("Database", "Wajah kosong")
             cap.release()
@@ -1062,33 +1129,23 @@ def verify_identity(fingerprint_id=None, face_check=True, threshold=0.4, resolut
         
         return False, None
     
-    # Jika verifikasi dengan sidik jari, cek apakah nama pengguna ada dalam embeddings
-    target_name = None
-    if fingerprint_id is not None:
+    # Jika verifikasi dengan sidik jari, cek apakah pengguna punya data wajah
+    if target_name and target_name not in gallery:
+        print(f"[!] Data wajah untuk {target_name} tidak ditemukan")
+        display_lcd("Data Wajah", f"Tidak ada: {target_name}")
+        cap.release()
+        
+        # Verifikasi dengan sidik jari saja
+        print(f"[+] Sidik jari dikenali sebagai {target_name} (tanpa verifikasi wajah)")
+        display_lcd("Sidik jari OK", target_name)
+        
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
-        cursor.execute("SELECT name FROM users WHERE fingerprint_id = ?", (fingerprint_id,))
-        result = cursor.fetchone()
+        cursor.execute("SELECT id, name, fingerprint_id FROM users WHERE fingerprint_id = ?", (fingerprint_id,))
+        user_data = cursor.fetchone()
         conn.close()
         
-        if result:
-            target_name = result[0]
-            if target_name not in embeddings_dict:
-                print(f"[!] Data wajah untuk {target_name} tidak ditemukan")
-                display_lcd("Data Wajah", f"Tidak ada: {target_name}")
-                cap.release()
-                
-                # Verifikasi dengan sidik jari saja
-                print(f"[+] Sidik jari dikenali sebagai {target_name} (tanpa verifikasi wajah)")
-                display_lcd("Sidik jari OK", target_name)
-                
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute("SELECT id, name, fingerprint_id FROM users WHERE fingerprint_id = ?", (fingerprint_id,))
-                user_data = cursor.fetchone()
-                conn.close()
-                
-                return True, user_data
+        return True, user_data
     
     # Setup untuk pengambilan wajah
     face_verified = False
@@ -1101,107 +1158,107 @@ def verify_identity(fingerprint_id=None, face_check=True, threshold=0.4, resolut
     print("[+] Silakan lihat ke kamera...")
     display_lcd("Verifikasi", "Lihat ke kamera")
     
+    # MTCNN hanya dijalankan berkala; di antaranya wajah diikuti dengan optical flow
+    tracker = FaceTracker()
+    
+    # Orang yang diam di depan kamera menghasilkan crop yang hampir sama dari frame ke frame
+    embedding_cache = EmbeddingCache()
+    
+    # Preview opsional; dalam mode headless tidak ada anotasi, jendela, maupun salinan frame
+    preview = get_preview()
+    
     while time.time() - start_time < timeout and not face_verified:
         try:
-            # Ambil frame dari kamera
-            ret, frame = cap.read()
-            if not ret or frame is None:
+            # Frame terbaru dari grabber kamera (view read-only tanpa salinan); frame yang
+            # datang selama inferensi dilewati sehingga keputusan selalu memakai gambar terbaru
+            timestamp, frame = cap.latest()
+            if frame is None:
                 print("[!] Gagal membaca frame dari kamera")
                 continue
             
-            # Deteksi wajah
-            face_img, bbox = detect_face_mtcnn(frame)
+            # Deteksi wajah (MTCNN + tracking)
+            face_img, bbox = tracker.update(frame)
+            
+            # Gerbang kualitas: crop buram, gelap/terlalu terang, terlalu kecil atau pose
+            # ekstrem tidak di-embed
+            quality_ok, quality_reason = False, None
+            if face_img is not None and bbox is not None:
+                quality_ok, quality_reason = quality_gate.check(face_img, bbox, tracker.landmarks, frame.shape)
+            
+            # Anotasi hanya dicatat jika frame ini akan ditampilkan preview (tidak pernah
+            # dalam mode headless); frame di ring buffer tidak disalin maupun diubah
+            overlay = preview.overlay()
             
             if face_img is not None and bbox is not None:
                 # Tampilkan kotak di sekitar wajah
-                frame = draw_face_box(frame, bbox)
+                overlay.draw(draw_face_box, bbox)
                 
                 # Tampilkan nama target jika verifikasi sidik jari
                 if target_name:
-                    cv2.putText(frame, f"Verifikasi: {target_name}", (10, 30), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+                    overlay.text(f"Verifikasi: {target_name}", (10, 30), 
+                              0.7, (255, 255, 0), 2)
+                
+                if not quality_ok:
+                    overlay.text(f"Kualitas rendah: {quality_reason}", (10, 90), 
+                              0.6, (0, 165, 255), 2)
                 
-                # Proses wajah untuk pengenalan
-                face_tensor = preprocess_face(face_img)
-                if face_tensor is not None:
-                    # Ekstrak embedding
-                    face_embedding = extract_embedding(face_tensor)
+                # Ekstrak embedding (crop yang hampir sama dengan frame sebelumnya memakai cache)
+                face_embedding = embed_face(face_img, bbox, embedding_cache) if quality_ok else None
+                if face_embedding is not None:
                     
                     # Mode verifikasi sidik jari + wajah
                     if target_name:
-                        # Ambil embedding yang tersimpan untuk pengguna ini
-                        saved_embeddings = embeddings_dict[target_name]
-                        
-                        # Bandingkan embedding
-                        if isinstance(saved_embeddings, list):
-                            # Format list (multiple embeddings)
-                            best_similarity = 0
-                            for emb in saved_embeddings:
-                                similarity = compute_similarity(face_embedding, emb)
-                                best_similarity = max(best_similarity, similarity)
-                        else:
-                            # Format array tunggal (satu embedding)
-                            best_similarity = compute_similarity(face_embedding, saved_embeddings)
+                        # Bandingkan dengan template milik pengguna ini saja (1:1)
+                        best_similarity = gallery.verify(face_embedding, target_name)
                         
                         # Tampilkan skor kecocokan
-                        cv2.putText(frame, f"Kecocokan: {best_similarity:.2f}", (10, 60), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                        overlay.text(f"Kecocokan: {best_similarity:.2f}", (10, 60), 
+                                  0.6, (255, 255, 255), 2)
                         
                         # Cek apakah wajah cocok
                         if best_similarity >= threshold:
-                            cv2.putText(frame, f"Verifikasi Berhasil: {target_name} ({best_similarity:.2f})", 
-                                      (10, frame.shape[0] - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                            overlay.text(f"Verifikasi Berhasil: {target_name} ({best_similarity:.2f})", 
+                                      (10, frame.shape[0] - 30), 0.7, (0, 255, 0), 2)
                             face_verified = True
                             best_match_name = target_name
                             best_match_score = best_similarity
                         else:
-                            cv2.putText(frame, f"Verifikasi Gagal ({best_similarity:.2f})", 
-                                      (10, frame.shape[0] - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                            overlay.text(f"Verifikasi Gagal ({best_similarity:.2f})", 
+                                      (10, frame.shape[0] - 30), 0.7, (0, 0, 255), 2)
                     
                     # Mode pengenalan wajah saja (tanpa sidik jari)
                     else:
-                        # Bandingkan dengan semua embedding
-                        for name, saved_embeddings in embeddings_dict.items():
-                            # Handle kedua format embedding
-                            if isinstance(saved_embeddings, list):
-                                # Format list (multiple embeddings)
-                                for emb in saved_embeddings:
-                                    similarity = compute_similarity(face_embedding, emb)
-                                    if similarity > best_match_score:
-                                        best_match_score = similarity
-                                        best_match_name = name
-                            else:
-                                # Format array tunggal (satu embedding)
-                                similarity = compute_similarity(face_embedding, saved_embeddings)
-                                if similarity > best_match_score:
-                                    best_match_score = similarity
-                                    best_match_name = name
+                        # Bandingkan dengan semua embedding dalam satu perkalian matriks
+                        name, similarity = gallery.best_match(face_embedding)
+                        if similarity > best_match_score:
+                            best_match_score = similarity
+                            best_match_name = name
                         
                         # Tampilkan skor kecocokan
-                        cv2.putText(frame, f"Kecocokan: {best_match_score:.2f}", (10, 60), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                        overlay.text(f"Kecocokan: {best_match_score:.2f}", (10, 60), 
+                                  0.6, (255, 255, 255), 2)
                         
                         # Cek apakah kecocokan cukup tinggi
                         if best_match_score >= threshold:
-                            cv2.putText(frame, f"Dikenali: {best_match_name} ({best_match_score:.2f})", 
-                                      (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                            overlay.text(f"Dikenali: {best_match_name} ({best_match_score:.2f})", 
+                                      (10, 30), 0.7, (0, 255, 0), 2)
                             face_verified = True
                         else:
-                            cv2.putText(frame, f"Tidak dikenali ({best_match_score:.2f})", 
-                                      (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                            overlay.text(f"Tidak dikenali ({best_match_score:.2f})", 
+                                      (10, 30), 0.7, (0, 0, 255), 2)
             
             # Tampilkan waktu tersisa
             remaining = int(timeout - (time.time() - start_time))
-            cv2.putText(frame, f"Waktu: {remaining}s", (10, frame.shape[0] - 10), 
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            overlay.text(f"Waktu: {remaining}s", (10, frame.shape[0] - 10), 
+                      0.6, (0, 0, 255), 2)
             
             # Tampilkan threshold
-            cv2.putText(frame, f"Threshold: {threshold}", (frame.shape[1] - 150, frame.shape[0] - 10), 
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            overlay.text(f"Threshold: {threshold}", (frame.shape[1] - 150, frame.shape[0] - 10), 
+                      0.5, (255, 255, 255), 1)
             
-            # Tampilkan frame
-            cv2.imshow("Verifikasi Wajah", frame)
-            if cv2.waitKey(1) == 27:  # ESC
+            # Tampilkan frame (thread preview, dibatasi PREVIEW_MAX_FPS)
+            preview.submit("Verifikasi Wajah", frame, overlay)
+            if preview.key() == 27:  # ESC
                 break
         except Exception as e:
             print(f"[!] Error saat memproses frame: {e}")
@@ -1209,7 +1266,10 @@ def verify_identity(fingerprint_id=None, face_check=True, threshold=0.4, resolut
     
     # Bersihkan resources
     cap.release()
-    cv2.destroyAllWindows()
+    preview.close_window("Verifikasi Wajah")
+    
+    print(f"[INFO] Gerbang kualitas: {quality_gate.summary()}")
+    print(f"[INFO] Cache embedding: {embedding_cache.summary()}")
     
     # Jika verifikasi sukses
     if face_verified:
@@ -1275,13 +1335,26 @@ def display_embedding_file(file_path):
     Args:
         file_path: Path ke file embedding (.pkl, .json, .npy)
     """
-    if not os.path.exists(file_path):
+    if not os.path.exists(file_path) and not embedding_store.store_exists(file_path):
         print(f"[!] File embedding tidak ditemukan: {file_path}")
         return False
     
     try:
+        # Jika path sudah dimigrasikan ke store biner
+        if file_path.endswith('.pkl') and embedding_store.store_exists(file_path):
+            store = embedding_store.open_store(file_path)
+            
+            print(f"\n=== Informasi Store Embedding: {embedding_store.store_paths(file_path)[1]} ===")
+            print(f"Versi format: {store.version}, dimensi: {store.dim}")
+            print(f"Jumlah data: {len(store)}")
+            print("Daftar key/nama pengguna:")
+            
+            for i, (name, count) in enumerate(zip(store.names, store.counts), 1):
+                print(f"  {i}. {name}")
+                print(f"     Tipe: {count} template float32")
+        
         # Jika file berformat PKL (pickle)
-        if file_path.endswith('.pkl'):
+        elif file_path.endswith('.pkl'):
             with open(file_path, 'rb') as f:
                 embedding_data = pickle.load(f)
             
@@ -1430,41 +1503,26 @@ def run_access_control_system():
         print("[INFO] Sistem kontrol akses dimulai")
         display_lcd("Sistem Siap", "Tempelkan jari")
         
-        # Pra-inisialisasi kamera sekali saja di awal untuk menghemat waktu
-        print("[INFO] Pre-inisialisasi kamera...")
-        cap = None
-        try:
-            # Pendekatan sederhana seperti di combined_biometric_test_percobaan.py
-            for device in CAMERA_DEVICES:
-                print(f"[INFO] Mencoba membuka kamera: {device}")
-                try:
-                    cap = cv2.VideoCapture(device)
-                    if cap.isOpened():
-                        print(f"[INFO] Berhasil membuka kamera: {device}")
-                        
-                        # Coba baca frame untuk verifikasi
-                        ret, frame = cap.read()
-                        if ret and frame is not None:
-                            print(f"[INFO] Kamera {device} berhasil dibaca")
-                            # Tutup kamera untuk digunakan nanti
-                            cap.release()
-                            cap = None
-                            break
-                        else:
-                            print(f"[INFO] Kamera {device} tidak dapat membaca frame")
-                            cap.release()
-                            cap = None
-                    else:
-                        print(f"[INFO] Gagal membuka kamera: {device}")
-                except Exception as e:
-                    print(f"[INFO] Error saat membuka kamera {device}: {e}")
-                    if cap:
-                        cap.release()
-                        cap = None
-            
-            print("[INFO] Pre-inisialisasi kamera selesai")
-        except Exception as e:
-            print(f"[INFO] Error pada pre-inisialisasi kamera: {e}")
+        # Muat model wajah di background sementara kamera dan sensor disiapkan
+        if ARCFACE_AVAILABLE:
+            mtcnn_utils.warmup_in_background()
+            arcface_utils.warmup_in_background()
+        
+        # Muat galeri wajah sekali di awal; perubahan (pendaftaran dari web, dll.)
+        # dimuat ulang otomatis di background tanpa restart
+        if ARCFACE_AVAILABLE:
+            try:
+                gallery_cache = get_gallery_cache(EMBEDDINGS_PATH)
+                gallery_cache.start()
+                print(f"[INFO] Galeri wajah dimuat ({len(gallery_cache.get())} orang)")
+            except Exception as e:
+                print(f"[!] Gagal memuat galeri wajah: {e}")
+        
+        # Buka kamera sekali di awal; kamera tetap streaming dan dipakai bersama oleh
+        # setiap verifikasi (dibuka ulang otomatis jika terputus)
+        print("[INFO] Membuka kamera...")
+        if not get_camera_service(CAMERA_DEVICES).isOpened():
+            print("[!] Kamera belum tersedia, akan dicoba lagi saat verifikasi")
         
         while True:
             # Pindai sidik jari terlebih dahulu
@@ -1539,6 +1597,7 @@ def run_access_control_system():
             lcd.clear()
         if SELENOID_AVAILABLE and selenoid:
             selenoid.cleanup()
+        close_camera_service()
         print("[INFO] Sistem berhenti")
 
 # Jalankan setup database saat modul diimpor
@@ -1563,14 +1622,13 @@ if __name__ == "__main__":
         enroll_user()
     elif choice == "2":
         # Tampilkan informasi data embedding yang tersedia
-        if os.path.exists(EMBEDDINGS_PATH):
+        if os.path.exists(EMBEDDINGS_PATH) or embedding_store.store_exists(EMBEDDINGS_PATH):
             print("\n[INFO] Menampilkan data embedding yang tersedia:")
             display_embedding_file(EMBEDDINGS_PATH)
             
             # Pilih nama dari daftar embedding
             try:
-                with open(EMBEDDINGS_PATH, 'rb') as f:
-                    embeddings_dict = pickle.load(f)
+                embeddings_dict = embedding_store.load_embeddings(EMBEDDINGS_PATH)
                 
                 if not isinstance(embeddings_dict, dict) or len(embeddings_dict) == 0:
                     print("[!] File embedding tidak berisi data yang valid")
@@ -2,17 +2,130 @@ import cv2
 import numpy as np
 import math
 
-def calculate_face_orientation(bbox, frame_shape):
+# Model wajah 3D generik (mm) untuk 5 landmark MTCNN: mata kiri, mata kanan, ujung hidung,
+# sudut mulut kiri, sudut mulut kanan. Sumbu mengikuti kamera OpenCV (x ke kanan, y ke bawah,
+# z menjauhi kamera), titik asal di ujung hidung
+FACE_MODEL_3D = np.array([
+    [-31.0, -35.0, 30.0],
+    [31.0, -35.0, 30.0],
+    [0.0, 0.0, 0.0],
+    [-25.0, 30.0, 25.0],
+    [25.0, 30.0, 25.0],
+], dtype=np.float64)
+
+# Jarak antar mata pada model (mm), untuk tebakan awal jarak wajah
+_MODEL_EYE_DISTANCE = 62.0
+
+# Proyeksi pseudo-invers model yang sudah dipusatkan (untuk estimasi batch)
+_MODEL_CENTERED = FACE_MODEL_3D - FACE_MODEL_3D.mean(axis=0)
+_MODEL_PINV = np.linalg.pinv(_MODEL_CENTERED)
+
+def _camera_matrix(frame_shape):
+    """Matriks kamera perkiraan: fokus = lebar frame, pusat di tengah frame"""
+    height, width = frame_shape[:2]
+    return np.array([[width, 0, width / 2],
+                     [0, width, height / 2],
+                     [0, 0, 1]], dtype=np.float64)
+
+def _rotation_to_angles(rotation):
+    """
+    Konversi matriks rotasi (N, 3, 3) ke (pitch, yaw, roll) dalam derajat
+    
+    pitch > 0: menunduk, yaw > 0: menoleh ke sisi kanan gambar, roll > 0: kepala miring
+    searah jarum jam pada gambar
+    """
+    pitch = np.degrees(np.arctan2(rotation[:, 2, 1], rotation[:, 2, 2]))
+    yaw = -np.degrees(np.arcsin(-np.clip(rotation[:, 2, 0], -1.0, 1.0)))
+    roll = np.degrees(np.arctan2(rotation[:, 1, 0], rotation[:, 0, 0]))
+    return np.stack([pitch, yaw, roll], axis=1)
+
+def estimate_head_pose(landmarks, frame_shape):
+    """
+    Estimasi pose kepala dari 5 landmark MTCNN dengan cv2.solvePnP
+    
+    Args:
+        landmarks: 5 landmark (5, 2) pada koordinat frame
+        frame_shape: Ukuran frame (height, width)
+    
+    Returns:
+        tuple: (pitch, yaw, roll) dalam derajat, None jika estimasi gagal
+    """
+    points = np.asarray(landmarks, dtype=np.float64).reshape(5, 2)
+    camera = _camera_matrix(frame_shape)
+    focal = camera[0, 0]
+    
+    # Tebakan awal: wajah frontal pada jarak yang sesuai dengan jarak antar mata
+    eye_distance = np.linalg.norm(points[1] - points[0])
+    if eye_distance <= 1e-3:
+        return None
+    z = focal * _MODEL_EYE_DISTANCE / eye_distance
+    tvec = np.array([[(points[2, 0] - camera[0, 2]) * z / focal],
+                     [(points[2, 1] - camera[1, 2]) * z / focal],
+                     [z]], dtype=np.float64)
+    rvec = np.zeros((3, 1), dtype=np.float64)
+    
+    ok, rvec, tvec = cv2.solvePnP(FACE_MODEL_3D, points, camera, None, rvec, tvec,
+                                  useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE)
+    if not ok:
+        return None
+    
+    rotation, _ = cv2.Rodrigues(rvec)
+    pitch, yaw, roll = _rotation_to_angles(rotation[None])[0]
+    return float(pitch), float(yaw), float(roll)
+
+def estimate_head_pose_batch(landmarks):
+    """
+    Estimasi pose kepala banyak wajah sekaligus (tervektorisasi)
+    
+    Memakai kamera scaled-orthographic: proyeksi affine tiap wajah diperoleh dengan satu
+    perkalian terhadap pseudo-invers model 3D, lalu dijadikan rotasi dengan SVD. Selisih
+    terhadap estimate_head_pose umumnya hanya beberapa derajat (efek perspektif).
+    
+    Args:
+        landmarks: Landmark (N, 5, 2)
+    
+    Returns:
+        numpy.ndarray: (N, 3) berisi pitch, yaw, roll dalam derajat
+    """
+    points = np.asarray(landmarks, dtype=np.float64).reshape(-1, 5, 2)
+    if len(points) == 0:
+        return np.empty((0, 3))
+    
+    centered = points - points.mean(axis=1, keepdims=True)
+    projection = np.einsum('ij,njk->nik', _MODEL_PINV, centered)  # (N, 3, 2)
+    
+    rows = projection.transpose(0, 2, 1)  # dua baris pertama rotasi (berskala)
+    rows = rows / np.maximum(np.linalg.norm(rows, axis=2, keepdims=True), 1e-9)
+    third = np.cross(rows[:, 0], rows[:, 1])
+    rotation = np.concatenate([rows, third[:, None, :]], axis=1)
+    
+    # Rotasi ortonormal terdekat
+    u, _, vt = np.linalg.svd(rotation)
+    return _rotation_to_angles(u @ vt)
+
+def calculate_face_orientation(bbox, frame_shape, landmarks=None):
     """
-    Menghitung orientasi wajah (pitch, yaw, roll) berdasarkan bounding box.
+    Menghitung orientasi wajah (pitch, yaw, roll).
+    
+    Jika landmark MTCNN tersedia, pose dihitung dengan solvePnP terhadap model wajah 3D
+    (estimate_head_pose). Tanpa landmark dipakai perkiraan kasar dari posisi bounding box.
     
     Args:
         bbox: Bounding box wajah dalam format [x, y, w, h] atau [x1, y1, x2, y2]
         frame_shape: Ukuran frame (height, width)
+        landmarks: 5 landmark MTCNN (5, 2), opsional
     
     Returns:
         tuple: (pitch, yaw, roll) dalam derajat
     """
+    if landmarks is not None and isinstance(frame_shape, (list, tuple, np.ndarray)) and len(frame_shape) >= 2:
+        try:
+            pose = estimate_head_pose(landmarks, frame_shape)
+            if pose is not None:
+                return pose
+        except Exception as e:
+            print(f"[!] Error dalam estimate_head_pose: {e}")
+    
     try:
         # Validasi input
         if bbox is None or not isinstance(bbox, (list, tuple, np.ndarray)) or len(bbox) < 4:
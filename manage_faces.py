@@ -1,7 +1,7 @@
 import argparse
 import os
 import numpy as np
-from arcface_utils import load_embeddings, save_embeddings
+from arcface_utils import load_embeddings, delete_embedding
 
 # Parsing argumen
 parser = argparse.ArgumentParser(description='Mengelola Database Wajah')
@@ -40,8 +40,8 @@ def delete_face(embeddings_dict, name):
     if name in embeddings_dict:
         # Hapus dari dictionary
         embeddings_dict.pop(name)
-        # Simpan perubahan
-        save_embeddings(embeddings_dict, args.embeddings)
+        # Simpan perubahan sebagai record journal
+        delete_embedding(args.embeddings, name)
         print(f"Berhasil menghapus '{name}' dari database.")
     else:
         print(f"Nama '{name}' tidak ditemukan dalam database.")
@@ -1,79 +1,492 @@
+import os
 import cv2
 import numpy as np
-from facenet_pytorch import MTCNN
-import torch
-
-# Inisialisasi MTCNN detector
-device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
-mtcnn = MTCNN(
-    select_largest=True,  # Pilih wajah terbesar dalam frame
-    min_face_size=20,     # Ukuran minimal wajah yang terdeteksi
-    thresholds=[0.6, 0.7, 0.7],  # Threshold untuk setiap tahap deteksi
-    factor=0.709,         # Scale factor
-    post_process=True,    # Normalisasi output
-    device=device         # GPU/CPU
-)
-
-def detect_face_mtcnn(frame):
+import threading
+import importlib.util
+
+# Cek dependensi tanpa mengimpornya; torch baru diimpor saat detector pertama kali dipakai
+if importlib.util.find_spec('torch') is None or importlib.util.find_spec('facenet_pytorch') is None:
+    raise ImportError("mtcnn_utils membutuhkan torch dan facenet_pytorch")
+
+# Deteksi pada salinan frame yang diperkecil (1.0 = resolusi penuh seperti semula).
+# Orang di depan pintu mengisi sebagian besar frame, jadi 0.5 (atau lebih kecil untuk 720p)
+# biasanya cukup; cek dampaknya pada rekaman dengan benchmark_detection.py
+DETECTION_SCALE = 1.0
+
+# Ukuran wajah terkecil yang diharapkan (piksel, pada resolusi penuh). Piramida MTCNN
+# disesuaikan dengan ukuran ini setelah diperkecil, sehingga level kecil yang tidak
+# berguna dilewati
+DETECTION_MIN_FACE_SIZE = 20
+
+# Ukuran minimal yang masih masuk akal untuk MTCNN (input P-Net 12x12); di bawah ini
+# piramida justru memperbesar gambar
+MTCNN_MIN_FACE_SIZE = 12
+
+# Mode kaskade: Haar cascade dijalankan dulu pada frame grayscale kecil, dan MTCNN hanya
+# dijalankan pada ROI di sekitar hasil Haar. Saat tidak ada orang di depan pintu hanya
+# Haar yang berjalan (beberapa ms per frame)
+CASCADE_PREFILTER = False
+
+# Lebar frame grayscale untuk Haar (piksel)
+CASCADE_WIDTH = 320
+
+# Parameter detectMultiScale; dibuat longgar karena MTCNN yang memutuskan
+CASCADE_SCALE_FACTOR = 1.2
+CASCADE_MIN_NEIGHBORS = 3
+
+# Padding ROI di sekitar hasil Haar, relatif terhadap ukuran box
+CASCADE_ROI_PADDING = 0.5
+
+CASCADE_PATH = os.path.join(getattr(getattr(cv2, 'data', None), 'haarcascades', ''), 'haarcascade_frontalface_default.xml')
+
+# Crop wajah disejajarkan dengan satu similarity warp dari 5 landmark MTCNN langsung dari
+# frame asli (tanpa crop + resize yang mengubah aspek). False = crop box mentah seperti semula.
+# Galeri yang sudah terdaftar berisi template dari crop mentah, jadi mode ini baru diaktifkan
+# setelah evaluate_alignment.py menunjukkan frames-to-accept yang lebih baik dan semua
+# pengguna didaftarkan ulang dengan crop yang disejajarkan
+ALIGN_FACES = False
+ALIGNED_FACE_SIZE = (160, 160)
+
+# Probabilitas MTCNN minimal untuk wajah tambahan pada mode banyak wajah (detect_faces_mtcnn)
+DETECTION_MIN_PROB = 0.9
+
+# Jumlah wajah maksimal per frame pada mode banyak wajah
+DETECTION_MAX_FACES = 10
+
+# Posisi 5 landmark (mata kiri, mata kanan, hidung, sudut mulut kiri, sudut mulut kanan)
+# pada template ArcFace standar 112x112
+ALIGN_TEMPLATE_112 = np.array([
+    [38.2946, 51.6963],
+    [73.5318, 51.5014],
+    [56.0252, 71.7366],
+    [41.5493, 92.3655],
+    [70.7299, 92.2041],
+], dtype=np.float32)
+
+# MTCNN detector dibuat saat pertama kali dibutuhkan, satu per min_face_size (lihat get_mtcnn)
+_detectors = {}
+_device = None
+_mtcnn_lock = threading.Lock()
+
+def get_mtcnn(min_face_size=20):
     """
-    Mendeteksi wajah dalam frame menggunakan MTCNN
+    Mengambil MTCNN detector bersama (dibuat sekali, aman dipanggil dari banyak thread)
+    
+    Args:
+        min_face_size (int): Ukuran wajah minimal (menentukan level awal piramida)
+    
+    Returns:
+        MTCNN: Detector wajah
+    """
+    global _device
+    detector = _detectors.get(min_face_size)
+    if detector is None:
+        with _mtcnn_lock:
+            detector = _detectors.get(min_face_size)
+            if detector is None:
+                import torch
+                from facenet_pytorch import MTCNN
+                
+                # Inisialisasi MTCNN detector
+                device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
+                detector = MTCNN(
+                    select_largest=True,  # Pilih wajah terbesar dalam frame
+                    min_face_size=min_face_size,  # Ukuran minimal wajah yang terdeteksi
+                    thresholds=[0.6, 0.7, 0.7],  # Threshold untuk setiap tahap deteksi
+                    factor=0.709,         # Scale factor
+                    post_process=True,    # Normalisasi output
+                    device=device         # GPU/CPU
+                )
+                _device = device
+                _detectors[min_face_size] = detector
+    return detector
+
+# CascadeClassifier tidak aman dipakai bersamaan dari beberapa thread; satu per thread
+_cascade_local = threading.local()
+_cascade_failed = False
+
+def get_cascade():
+    """
+    Mengambil Haar cascade wajah frontal milik thread saat ini
+    
+    Returns:
+        cv2.CascadeClassifier: Classifier, atau None jika cascade tidak tersedia
+                               (mode kaskade lalu kembali ke MTCNN pada seluruh frame)
+    """
+    global _cascade_failed
+    cascade = getattr(_cascade_local, 'cascade', None)
+    if cascade is None and not _cascade_failed:
+        # CascadeClassifier tidak ada lagi di modul utama OpenCV 5
+        if not hasattr(cv2, 'CascadeClassifier'):
+            print("[!] cv2.CascadeClassifier tidak tersedia, prefilter Haar dinonaktifkan")
+            _cascade_failed = True
+            return None
+        cascade = cv2.CascadeClassifier(CASCADE_PATH)
+        if cascade.empty():
+            print(f"[!] Gagal memuat Haar cascade: {CASCADE_PATH}, prefilter Haar dinonaktifkan")
+            _cascade_failed = True
+            return None
+        _cascade_local.cascade = cascade
+    return cascade
+
+def haar_regions(frame, min_face_size=None):
+    """
+    Mencari kandidat wajah dengan Haar cascade pada frame grayscale kecil
+    
+    Args:
+        frame (numpy.ndarray): Frame BGR
+        min_face_size (int, optional): Wajah terkecil pada resolusi penuh
+        
+    Returns:
+        list: ROI [x1, y1, x2, y2] (koordinat frame asli, sudah diberi padding),
+              None jika cascade tidak tersedia
+    """
+    cascade = get_cascade()
+    if cascade is None:
+        return None
+    
+    height, width = frame.shape[:2]
+    ratio = min(1.0, CASCADE_WIDTH / width)
+    small = frame
+    if ratio < 1.0:
+        small = cv2.resize(frame, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.shape[2] == 3 else small
+    
+    min_face_size = DETECTION_MIN_FACE_SIZE if min_face_size is None else min_face_size
+    min_size = max(24, int(min_face_size * ratio))  # jendela Haar 24x24
+    hits = cascade.detectMultiScale(gray, CASCADE_SCALE_FACTOR, CASCADE_MIN_NEIGHBORS,
+                                    minSize=(min_size, min_size))
+    
+    regions = []
+    for (x, y, w, h) in hits:
+        pad_x = w * CASCADE_ROI_PADDING
+        pad_y = h * CASCADE_ROI_PADDING
+        regions.append([max(0, int((x - pad_x) / ratio)), max(0, int((y - pad_y) / ratio)),
+                        min(width, int((x + w + pad_x) / ratio)), min(height, int((y + h + pad_y) / ratio))])
+    return regions
+
+def detection_params(scale=None, min_face_size=None):
+    """
+    Menentukan skala frame dan min_face_size MTCNN untuk mode deteksi
+    
+    Args:
+        scale (float, optional): Faktor perkecil frame (default DETECTION_SCALE)
+        min_face_size (int, optional): Wajah terkecil pada resolusi penuh
+                                       (default DETECTION_MIN_FACE_SIZE)
+    
+    Returns:
+        tuple: (scale, min_face_size pada frame yang diperkecil)
+    """
+    scale = DETECTION_SCALE if scale is None else scale
+    min_face_size = DETECTION_MIN_FACE_SIZE if min_face_size is None else min_face_size
+    scale = min(max(float(scale), 0.05), 1.0)
+    return scale, max(MTCNN_MIN_FACE_SIZE, int(round(min_face_size * scale)))
+
+def warmup():
+    """Memuat MTCNN (sesuai mode deteksi) dan menjalankan satu deteksi pada frame kosong"""
+    _, min_face_size = detection_params()
+    get_mtcnn(min_face_size).detect(np.zeros((160, 160, 3), dtype=np.uint8))
+
+def warmup_in_background():
+    """
+    Menjalankan warmup() di thread background
+    
+    Returns:
+        threading.Thread: Thread warmup
+    """
+    def run():
+        try:
+            warmup()
+        except Exception as e:
+            print(f"[!] Gagal memuat MTCNN: {e}")
+    
+    thread = threading.Thread(target=run, name="mtcnn-warmup")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+def __getattr__(name):
+    # Kompatibilitas untuk kode lama yang memakai mtcnn_utils.mtcnn / mtcnn_utils.device
+    if name == 'mtcnn':
+        return get_mtcnn()
+    if name == 'device':
+        get_mtcnn()
+        return _device
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _run_mtcnn(image, scale, min_face_size):
+    """MTCNN pada image (diperkecil sesuai scale); box dan landmark dalam koordinat image"""
+    scale, detector_min_face = detection_params(scale, min_face_size)
+    
+    small = image
+    if scale < 1.0:
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    
+    # Konversi ke RGB jika frame dalam BGR (OpenCV)
+    if small.shape[2] == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    
+    boxes, probs, points = get_mtcnn(detector_min_face).detect(small, landmarks=True)
+    if boxes is None or len(boxes) == 0:
+        return None, None, None
+    
+    # Petakan kembali ke koordinat resolusi penuh
+    if scale < 1.0:
+        boxes = boxes / scale
+        points = points / scale
+    return boxes, probs, points
+
+def _merge_regions(regions):
+    """
+    Menggabungkan ROI yang bertumpuk (atau bersentuhan) menjadi satu ROI
+    
+    ROI yang terpisah tetap terpisah, sehingga satu hasil Haar palsu di sudut frame tidak
+    memperbesar input MTCNN untuk wajah yang sebenarnya.
+    
+    Returns:
+        list: ROI [x1, y1, x2, y2] yang tidak saling bertumpuk
+    """
+    merged = []
+    for region in regions:
+        region = list(region)
+        # Gabungan baru bisa bertumpuk dengan ROI yang sebelumnya terpisah, jadi diulang
+        overlapping = True
+        while overlapping:
+            overlapping = False
+            for other in merged:
+                if region[0] <= other[2] and other[0] <= region[2] and region[1] <= other[3] and other[1] <= region[3]:
+                    region = [min(region[0], other[0]), min(region[1], other[1]),
+                              max(region[2], other[2]), max(region[3], other[3])]
+                    merged.remove(other)
+                    overlapping = True
+                    break
+        merged.append(region)
+    return [region for region in merged if region[2] > region[0] and region[3] > region[1]]
+
+def detect_boxes(frame, scale=None, min_face_size=None, cascade=None, landmarks=False):
+    """
+    Menjalankan MTCNN pada frame (diperkecil sesuai mode deteksi)
+    
+    Args:
+        frame (numpy.ndarray): Frame BGR (OpenCV) atau RGB/grayscale
+        scale (float, optional): Faktor perkecil frame (default DETECTION_SCALE)
+        min_face_size (int, optional): Wajah terkecil pada resolusi penuh
+        cascade (bool, optional): Pakai Haar sebagai prefilter (default CASCADE_PREFILTER)
+        landmarks (bool): Kembalikan juga 5 landmark per wajah
+        
+    Returns:
+        tuple: (boxes, probs) dengan boxes [x1, y1, x2, y2] pada koordinat frame asli,
+               ditambah landmarks (N, 5, 2) jika landmarks=True; None jika tidak ada wajah
+    """
+    cascade = CASCADE_PREFILTER if cascade is None else cascade
+    regions = haar_regions(frame, min_face_size) if cascade else None
+    
+    # Tanpa kaskade (atau cascade gagal dimuat): MTCNN pada seluruh frame
+    if regions is None:
+        boxes, probs, points = _run_mtcnn(frame, scale, min_face_size)
+    elif not regions:
+        boxes, probs, points = None, None, None
+    else:
+        # MTCNN hanya pada setiap ROI hasil Haar (ROI yang bertumpuk digabung dulu agar
+        # satu wajah tidak terdeteksi dua kali)
+        found = []
+        for x1, y1, x2, y2 in _merge_regions(regions):
+            roi_boxes, roi_probs, roi_points = _run_mtcnn(frame[y1:y2, x1:x2], scale, min_face_size)
+            if roi_boxes is not None:
+                found.append((roi_boxes + np.array([x1, y1, x1, y1], dtype=roi_boxes.dtype), roi_probs,
+                              roi_points + np.array([x1, y1], dtype=roi_points.dtype)))
+        
+        if not found:
+            boxes, probs, points = None, None, None
+        else:
+            boxes = np.concatenate([item[0] for item in found])
+            probs = np.concatenate([item[1] for item in found])
+            points = np.concatenate([item[2] for item in found])
+            # Urutkan dari box terbesar seperti select_largest pada satu kali MTCNN
+            order = np.argsort(-(boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), kind='stable')
+            boxes, probs, points = boxes[order], probs[order], points[order]
+    
+    if landmarks:
+        return boxes, probs, points
+    return boxes, probs
+
+def align_face(frame, landmarks, size=ALIGNED_FACE_SIZE):
+    """
+    Crop wajah yang disejajarkan ke template 5 landmark
+    
+    Satu similarity transform (rotasi, skala seragam, translasi) dari landmark ke
+    template, lalu satu cv2.warpAffine dari frame asli ke crop berukuran size.
+    
+    Args:
+        frame (numpy.ndarray): Frame asli
+        landmarks (numpy.ndarray): 5 landmark (5, 2) pada koordinat frame
+        size (tuple): Ukuran crop (lebar, tinggi)
+        
+    Returns:
+        numpy.ndarray: Crop wajah (tinggi, lebar, 3), None jika transform gagal
+    """
+    width, height = size
+    template = ALIGN_TEMPLATE_112 * np.array([width / 112.0, height / 112.0], dtype=np.float32)
+    matrix, _ = cv2.estimateAffinePartial2D(np.asarray(landmarks, dtype=np.float32), template,
+                                            method=cv2.LMEDS)
+    if matrix is None:
+        return None
+    return cv2.warpAffine(frame, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+def _crop_face(frame, box, landmarks):
+    """
+    Crop satu wajah dari frame asli (resolusi penuh)
+    
+    Returns:
+        tuple: (face, bbox [x1, y1, x2, y2] yang sudah dipotong ke frame),
+               (None, None) jika box tidak valid
+    """
+    x1, y1, x2, y2 = [int(coord) for coord in box]
+    
+    # Validasi bounding box (pastikan koordinat valid)
+    height, width = frame.shape[:2]
+    x1 = max(0, x1)
+    y1 = max(0, y1)
+    x2 = min(width, x2)
+    y2 = min(height, y2)
+    
+    # Cek apakah box valid (lebar dan tinggi > 0)
+    if x2 <= x1 or y2 <= y1:
+        return None, None
+    
+    face = None
+    if ALIGN_FACES and landmarks is not None:
+        face = align_face(frame, landmarks)
+    if face is None:
+        face = frame[y1:y2, x1:x2]
+    
+    return face, [x1, y1, x2, y2]
+
+def detect_face_aligned(frame, scale=None, min_face_size=None, cascade=None):
+    """
+    Mendeteksi wajah utama beserta landmark dan crop yang disejajarkan
+    
+    Deteksi berjalan pada salinan frame yang diperkecil (DETECTION_SCALE), dan pada
+    mode kaskade (CASCADE_PREFILTER) hanya pada ROI hasil Haar, tetapi crop selalu
+    diambil dari frame asli: crop ALIGNED_FACE_SIZE hasil warp landmark jika
+    ALIGN_FACES, atau crop box mentah.
     
     Args:
         frame (numpy.ndarray): Frame gambar
+        scale (float, optional): Faktor perkecil frame (default DETECTION_SCALE)
+        min_face_size (int, optional): Wajah terkecil pada resolusi penuh
+                                       (default DETECTION_MIN_FACE_SIZE)
+        cascade (bool, optional): Pakai Haar sebagai prefilter (default CASCADE_PREFILTER)
         
     Returns:
-        tuple: (cropped_face, bounding_box)
+        tuple: (face, bounding_box, landmarks), (None, None, None) jika tidak ada wajah
     """
     # Validasi input frame
     if frame is None or not isinstance(frame, np.ndarray):
         print("[!] Frame tidak valid (None atau bukan numpy array)")
-        return None, None
+        return None, None, None
     
     # Cek apakah frame memiliki dimensi yang valid
     if len(frame.shape) < 3 or frame.shape[0] <= 0 or frame.shape[1] <= 0:
         print(f"[!] Dimensi frame tidak valid: {frame.shape}")
-        return None, None
+        return None, None, None
     
     try:
-        # Konversi ke RGB jika frame dalam BGR (OpenCV)
-        if frame.shape[2] == 3:
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        else:
-            rgb_frame = frame
-            
         # Deteksi wajah dengan MTCNN
-        boxes, probs = mtcnn.detect(rgb_frame)
+        boxes, probs, points = detect_boxes(frame, scale, min_face_size, cascade, landmarks=True)
         
         if boxes is None or len(boxes) == 0:
-            return None, None
+            return None, None, None
         
-        # Ambil wajah dengan probabilitas tertinggi
-        box = boxes[0]
-        x1, y1, x2, y2 = [int(coord) for coord in box]
-        
-        # Validasi bounding box (pastikan koordinat valid)
-        height, width = frame.shape[:2]
-        x1 = max(0, x1)
-        y1 = max(0, y1)
-        x2 = min(width, x2)
-        y2 = min(height, y2)
-        
-        # Cek apakah box valid (lebar dan tinggi > 0)
-        if x2 <= x1 or y2 <= y1:
+        # Ambil wajah utama (terbesar, select_largest=True)
+        landmarks = points[0] if points is not None else None
+        face, bbox = _crop_face(frame, boxes[0], landmarks)
+        if bbox is None:
             print("[!] Bounding box tidak valid")
-            return None, None
+            return None, None, None
         
-        # Crop wajah
-        cropped_face = frame[y1:y2, x1:x2]
+        return face, bbox, landmarks
+    
+    except Exception as e:
+        print(f"[!] Error dalam deteksi wajah MTCNN: {e}")
+        return None, None, None
+
+def detect_face_mtcnn(frame, scale=None, min_face_size=None, cascade=None):
+    """
+    Mendeteksi wajah dalam frame menggunakan MTCNN
+    
+    Args:
+        frame (numpy.ndarray): Frame gambar
+        scale (float, optional): Faktor perkecil frame (default DETECTION_SCALE)
+        min_face_size (int, optional): Wajah terkecil pada resolusi penuh
+                                       (default DETECTION_MIN_FACE_SIZE)
+        cascade (bool, optional): Pakai Haar sebagai prefilter (default CASCADE_PREFILTER)
         
-        # Format bounding box [x1, y1, x2, y2]
-        bbox = [x1, y1, x2, y2]
+    Returns:
+        tuple: (cropped_face, bounding_box); cropped_face adalah crop yang disejajarkan
+               jika ALIGN_FACES (lihat detect_face_aligned)
+    """
+    face, bbox, _ = detect_face_aligned(frame, scale, min_face_size, cascade)
+    return face, bbox
+
+def detect_faces_mtcnn(frame, scale=None, min_face_size=None, cascade=None,
+                       min_prob=DETECTION_MIN_PROB, max_faces=DETECTION_MAX_FACES):
+    """
+    Mendeteksi semua wajah dalam frame dengan satu kali MTCNN
+    
+    MTCNN sebenarnya selalu mengembalikan semua wajah (select_largest hanya mengurutkan
+    dari yang terbesar); detect_face_mtcnn mengambil wajah pertama saja. Fungsi ini
+    mengembalikan semua wajah dengan probabilitas >= min_prob, sehingga N orang di lobi
+    cukup satu kali deteksi, lalu satu forward pass ber-batch (preprocess_faces +
+    extract_embeddings) dan satu pencocokan matriks (Gallery.best_matches).
+    
+    Args:
+        frame (numpy.ndarray): Frame gambar
+        scale (float, optional): Faktor perkecil frame (default DETECTION_SCALE)
+        min_face_size (int, optional): Wajah terkecil pada resolusi penuh
+                                       (default DETECTION_MIN_FACE_SIZE)
+        cascade (bool, optional): Pakai Haar sebagai prefilter (default CASCADE_PREFILTER)
+        min_prob (float): Probabilitas MTCNN minimal
+        max_faces (int): Jumlah wajah maksimal (yang terbesar lebih dulu)
+        
+    Returns:
+        tuple: (faces, bboxes, landmarks) berupa list sejajar (kosong jika tidak ada wajah);
+               landmarks berisi array (5, 2) atau None per wajah
+    """
+    if frame is None or not isinstance(frame, np.ndarray):
+        print("[!] Frame tidak valid (None atau bukan numpy array)")
+        return [], [], []
+    
+    if len(frame.shape) < 3 or frame.shape[0] <= 0 or frame.shape[1] <= 0:
+        print(f"[!] Dimensi frame tidak valid: {frame.shape}")
+        return [], [], []
+    
+    faces, bboxes, all_landmarks = [], [], []
+    try:
+        boxes, probs, points = detect_boxes(frame, scale, min_face_size, cascade, landmarks=True)
+        if boxes is None:
+            return faces, bboxes, all_landmarks
         
-        return cropped_face, bbox
+        for i, box in enumerate(boxes):
+            if len(faces) >= max_faces:
+                break
+            if probs is not None and probs[i] is not None and probs[i] < min_prob:
+                continue
+            
+            landmarks = points[i] if points is not None else None
+            face, bbox = _crop_face(frame, box, landmarks)
+            if bbox is None:
+                continue
+            
+            faces.append(face)
+            bboxes.append(bbox)
+            all_landmarks.append(landmarks)
     
     except Exception as e:
         print(f"[!] Error dalam deteksi wajah MTCNN: {e}")
-        return None, None
+    
+    return faces, bboxes, all_landmarks
 
 def draw_face_box(frame, bbox, name=None, similarity=None):
     """
@@ -0,0 +1,235 @@
+import os
+import cv2
+import atexit
+import time
+import numpy as np
+import threading
+from collections import deque
+
+# Mode headless/produksi: tanpa anotasi, tanpa jendela, tanpa salinan frame untuk tampilan.
+# None = otomatis (headless jika tidak ada display X11/Wayland, misalnya unit pintu)
+HEADLESS = None
+
+# Frame rate maksimal preview; anotasi hanya digambar untuk frame yang benar-benar ditampilkan
+PREVIEW_MAX_FPS = 10
+
+def display_available():
+    """True jika ada display X11/Wayland untuk jendela OpenCV"""
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+class Overlay:
+    """
+    Daftar anotasi (teks, kotak wajah) yang baru digambar saat frame ditampilkan
+
+    Loop pemrosesan mencatat anotasi di sini alih-alih memanggil cv2.putText langsung.
+    Overlay nonaktif (headless atau preview belum waktunya) mengabaikan semua panggilan,
+    sehingga loop tidak menggambar dan tidak menyalin frame.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._ops = []
+
+    def text(self, text, org, scale, color, thickness=2):
+        """Seperti cv2.putText dengan FONT_HERSHEY_SIMPLEX"""
+        if self.enabled:
+            self._ops.append((cv2.putText, (text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness), {}))
+
+    def draw(self, function, *args, **kwargs):
+        """Fungsi gambar function(frame, *args) yang mengembalikan frame (misalnya draw_face_box)"""
+        if self.enabled:
+            self._ops.append((function, args, kwargs))
+
+    def render(self, frame, out=None):
+        """
+        Salinan frame dengan semua anotasi (frame asli tidak diubah)
+
+        Args:
+            frame (numpy.ndarray): Frame BGR
+            out (numpy.ndarray, optional): Buffer tujuan yang dipakai ulang (ukuran sama)
+        """
+        if out is not None and out.shape == frame.shape and out.dtype == frame.dtype:
+            np.copyto(out, frame)
+            frame = out
+        else:
+            frame = frame.copy()
+        for function, args, kwargs in self._ops:
+            result = function(frame, *args, **kwargs)
+            if result is not None:
+                frame = result
+        return frame
+
+class FramePreview:
+    """
+    Konsumen preview opsional dengan frame rate terbatas
+
+    Semua pemanggilan HighGUI (imshow, waitKey, destroyWindow) dijalankan oleh satu thread
+    preview. Loop pemrosesan hanya memanggil overlay() dan submit(): jika preview aktif
+    dan sudah waktunya (paling banyak PREVIEW_MAX_FPS frame per detik), frame (view
+    read-only tanpa salinan) dan anotasinya diserahkan ke thread preview yang menyalin,
+    menggambar, dan menampilkannya. Tombol yang ditekan dibaca lewat key().
+
+    Dalam mode headless overlay() selalu nonaktif, submit() tidak melakukan apa pun, dan
+    key() selalu -1.
+    """
+
+    def __init__(self, max_fps=PREVIEW_MAX_FPS, headless=HEADLESS):
+        self.max_fps = max_fps
+        self.headless = not display_available() if headless is None else headless
+        self._interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._next_frame = 0.0
+
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._pending = None
+        self._close_windows = []
+        self._keys = deque(maxlen=16)
+        self._thread = None
+        self._stop = threading.Event()
+
+        # Statistik
+        self.submitted = 0
+        self.shown = 0
+
+    @property
+    def enabled(self):
+        return not self.headless
+
+    def due(self):
+        """True jika frame berikutnya akan ditampilkan (preview aktif dan interval sudah lewat)"""
+        return not self.headless and time.monotonic() >= self._next_frame
+
+    def overlay(self):
+        """Overlay untuk frame ini; nonaktif jika frame tidak akan ditampilkan"""
+        return Overlay(self.due())
+
+    def submit(self, window, frame, overlay=None):
+        """
+        Menyerahkan frame ke thread preview
+
+        Args:
+            window (str): Nama jendela
+            frame (numpy.ndarray): Frame BGR (tidak diubah; boleh view read-only)
+            overlay (Overlay, optional): Anotasi yang digambar pada salinan frame
+
+        Returns:
+            bool: True jika frame akan ditampilkan
+        """
+        if frame is None or (overlay is not None and not overlay.enabled) or not self.due():
+            return False
+
+        self._next_frame = time.monotonic() + self._interval
+        with self._lock:
+            # Hanya frame terbaru yang ditampilkan; frame yang belum sempat tampil diganti
+            self._pending = (window, frame, overlay)
+            self.submitted += 1
+        self._ensure_thread()
+        self._event.set()
+        return True
+
+    def key(self):
+        """Tombol berikutnya yang ditekan di jendela preview (& 0xFF), -1 jika tidak ada"""
+        try:
+            return self._keys.popleft()
+        except IndexError:
+            return -1
+
+    def close_window(self, window=None):
+        """Menutup satu jendela (None = semua jendela)"""
+        if self._thread is None:
+            return
+        with self._lock:
+            self._close_windows.append(window)
+            if window is None or (self._pending is not None and self._pending[0] == window):
+                self._pending = None
+        self._event.set()
+
+    def close(self):
+        """Menutup semua jendela dan menghentikan thread preview"""
+        if self._thread is None:
+            return
+        self.close_window()
+        self._stop.set()
+        self._event.set()
+        self._thread.join(timeout=2.0)
+        self._thread = None
+        self._stop.clear()
+
+    def show(self, window, frame):
+        """Menampilkan frame beranotasi (dipanggil dari thread preview)"""
+        cv2.imshow(window, frame)
+
+    def hide(self, window):
+        """Menutup jendela (dipanggil dari thread preview)"""
+        cv2.destroyWindow(window)
+
+    def poll_key(self):
+        """Membaca tombol dan memproses event jendela (dipanggil dari thread preview)"""
+        return cv2.waitKey(1)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="frame-preview")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        windows = set()
+        canvas = None  # buffer anotasi yang dipakai ulang antar frame
+        while True:
+            self._event.wait(self._interval or 0.05)
+            self._event.clear()
+            with self._lock:
+                item, self._pending = self._pending, None
+                close_windows, self._close_windows = self._close_windows, []
+
+            try:
+                for window in close_windows:
+                    for name in (list(windows) if window is None else [window]):
+                        if name in windows:
+                            self.hide(name)
+                            windows.discard(name)
+
+                if self._stop.is_set():
+                    return
+
+                if item is not None:
+                    window, frame, overlay = item
+                    if overlay is not None:
+                        if canvas is None or canvas.shape != frame.shape:
+                            canvas = np.empty_like(frame)
+                        frame = overlay.render(frame, canvas)
+                    self.show(window, frame)
+                    windows.add(window)
+                    self.shown += 1
+
+                # waitKey juga memproses event jendela; tanpa jendela tidak perlu dipanggil
+                if windows:
+                    key = self.poll_key()
+                    if key != -1:
+                        self._keys.append(key & 0xFF)
+            except cv2.error as e:
+                print(f"[!] Preview tidak tersedia, beralih ke mode headless: {e}")
+                self.headless = True
+                return
+
+_preview = None
+_preview_lock = threading.Lock()
+
+def get_preview():
+    """FramePreview bersama untuk proses ini"""
+    global _preview
+    with _preview_lock:
+        if _preview is None:
+            _preview = FramePreview()
+            atexit.register(_preview.close)
+    return _preview
+
+def set_headless(headless):
+    """Mengatur mode headless preview bersama (misalnya dari argumen --headless)"""
+    preview = get_preview()
+    if headless:
+        preview.close()
+    preview.headless = headless
+    return preview
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Membuat varian int8 dari model ArcFace (InceptionResnetV1 facenet_pytorch, vggface2).
+
+Mode:
+- static  : kuantisasi statis FX (konvolusi + linear), dikalibrasi dengan foto wajah
+            terdaftar di `photos/`. Memberi percepatan terbesar di CPU.
+- dynamic : kuantisasi dinamis (hanya layer Linear, tanpa kalibrasi). Dipakai otomatis
+            jika kuantisasi statis gagal.
+
+Hasilnya disimpan sebagai TorchScript dan dipakai arcface_utils jika
+`ARCFACE_QUANTIZED = True`. Cek dulu dampaknya dengan evaluate_quantized_arcface.py.
+
+Contoh:
+    python quantize_arcface.py
+    python quantize_arcface.py --mode dynamic --output models/arcface_vggface2_int8.pt
+"""
+
+import os
+import copy
+import argparse
+
+import arcface_utils
+from export_arcface_onnx import load_crops
+
+def calibration_batches(batch, batch_size=8):
+    """Membagi batch kalibrasi menjadi potongan kecil"""
+    for start in range(0, len(batch), batch_size):
+        yield batch[start:start + batch_size]
+
+def quantize_static(model, calibration, engine):
+    """
+    Kuantisasi statis FX dengan kalibrasi
+
+    Args:
+        model (torch.nn.Module): Model float32 (CPU, eval)
+        calibration (numpy.ndarray): Batch wajah kalibrasi (N, 3, 160, 160)
+        engine (str): Engine kuantisasi ('qnnpack' atau 'fbgemm')
+
+    Returns:
+        torch.nn.Module: Model int8
+    """
+    import torch
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    example = torch.from_numpy(calibration[:1])
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), (example,))
+
+    with torch.no_grad():
+        for chunk in calibration_batches(calibration):
+            prepared(torch.from_numpy(chunk))
+
+    return convert_fx(prepared)
+
+def quantize_dynamic(model):
+    """Kuantisasi dinamis layer Linear (tanpa kalibrasi)"""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def main():
+    parser = argparse.ArgumentParser(description='Membuat varian int8 model ArcFace')
+    parser.add_argument('--mode', type=str, choices=['static', 'dynamic'], default='static', help='Mode kuantisasi')
+    parser.add_argument('--photos', type=str, default='photos/*.jpg', help='Pola glob foto wajah untuk kalibrasi')
+    parser.add_argument('--calibration-size', type=int, default=64, help='Jumlah foto kalibrasi maksimal')
+    parser.add_argument('--output', type=str, default=arcface_utils.QUANTIZED_MODEL_PATH, help='Path file TorchScript tujuan')
+    args = parser.parse_args()
+
+    import torch
+
+    engine = arcface_utils.quantized_engine()
+    torch.backends.quantized.engine = engine
+
+    # Kuantisasi hanya berjalan di CPU; salin agar model bersama tidak berubah
+    model = copy.deepcopy(arcface_utils.get_arcface_model()).cpu().eval()
+    calibration = load_crops(args.photos, limit=args.calibration_size)
+
+    quantized = None
+    mode = args.mode
+    if mode == 'static':
+        try:
+            quantized = quantize_static(model, calibration, engine)
+            print(f"[+] Kuantisasi statis ({engine}) dengan {len(calibration)} foto kalibrasi")
+        except Exception as e:
+            print(f"[!] Kuantisasi statis gagal ({e}), memakai kuantisasi dinamis")
+            mode = 'dynamic'
+
+    if quantized is None:
+        quantized = quantize_dynamic(model)
+        print("[+] Kuantisasi dinamis (layer Linear)")
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    example = torch.from_numpy(calibration[:1])
+    with torch.no_grad():
+        scripted = torch.jit.trace(quantized, example)
+    tmp_path = f"{args.output}.tmp"
+    torch.jit.save(scripted, tmp_path)
+    os.replace(tmp_path, args.output)
+
+    size_fp32 = sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+    print(f"[+] Model int8 ({mode}) disimpan ke {args.output} "
+          f"({os.path.getsize(args.output) / (1024 * 1024):.1f} MB, float32 {size_fp32:.1f} MB)")
+    print("[INFO] Jalankan evaluate_quantized_arcface.py, lalu set ARCFACE_QUANTIZED = True di arcface_utils.py")
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,11 @@ import cv2
 import numpy as np
 import argparse
 import time
-from mtcnn_utils import detect_face_mtcnn, draw_face_box
-from arcface_utils import preprocess_face, extract_embedding, compute_similarity, load_embeddings
-from head_pose import calculate_face_orientation, draw_face_orientation, is_face_frontal
+from mtcnn_utils import draw_face_box, detect_faces_mtcnn, DETECTION_MAX_FACES
+from face_tracker import FaceTracker
+from arcface_utils import preprocess_faces, extract_embeddings, load_embeddings, Gallery, attach_ann_index
+from camera_service import CameraService
+from head_pose import calculate_face_orientation, estimate_head_pose_batch, draw_face_orientation, is_face_frontal
 
 # Parsing argumen
 parser = argparse.ArgumentParser(description='Pengenalan Wajah dengan MTCNN dan ArcFace')
@@ -15,27 +17,43 @@ parser.add_argument('--embeddings', type=str, default='data/embeddings.pkl', hel
 parser.add_argument('--threshold', type=float, default=0.6, help='Threshold cosine similarity (0-1, default: 0.6)')
 parser.add_argument('--show_fps', action='store_true', help='Tampilkan FPS')
 parser.add_argument('--show_angles', action='store_true', help='Tampilkan sudut orientasi wajah')
+parser.add_argument('--max_faces', type=int, default=DETECTION_MAX_FACES,
+                    help=f'Jumlah wajah maksimal per frame (default: {DETECTION_MAX_FACES}, 1 = wajah utama dengan tracking)')
 args = parser.parse_args()
 
 def initialize_camera():
-    """Inisialisasi kamera untuk pengenalan wajah dengan mencoba beberapa perangkat"""
-    devices_to_try = [args.camera, args.camera_alt, args.camera_idx]
+    """Inisialisasi kamera (dengan thread grabber) untuk pengenalan wajah dengan mencoba beberapa perangkat"""
+    camera = CameraService([args.camera, args.camera_alt, args.camera_idx])
+    if not camera.open():
+        print("GAGAL: Tidak dapat membuka kamera manapun")
+        return None
     
-    for device in devices_to_try:
-        try:
-            print(f"Mencoba membuka kamera: {device}")
-            cap = cv2.VideoCapture(device)
-            if cap.isOpened():
-                print(f"Berhasil membuka kamera: {device}")
-                return cap
-            else:
-                print(f"Gagal membuka kamera: {device}")
-                cap.release()
-        except Exception as e:
-            print(f"Error saat membuka kamera {device}: {e}")
+    # Kamera dikuras terus oleh thread grabber; loop di bawah selalu memproses frame terbaru
+    camera.start_grabber()
+    return camera
+
+def face_poses(bboxes, landmarks, frame_shape):
+    """Pose (pitch, yaw, roll) semua wajah; tervektorisasi jika semua wajah memiliki landmark"""
+    if landmarks and all(points is not None for points in landmarks):
+        return [tuple(float(angle) for angle in pose) for pose in estimate_head_pose_batch(np.stack(landmarks))]
+    return [calculate_face_orientation(bbox, frame_shape, points) for bbox, points in zip(bboxes, landmarks)]
+
+def identify_faces(faces, gallery):
+    """
+    Mengidentifikasi banyak wajah dengan satu forward pass dan satu pencocokan matriks
+    
+    Returns:
+        list: (nama, similarity) per wajah, None untuk crop yang tidak valid
+    """
+    results = [None] * len(faces)
+    batch, valid_indices = preprocess_faces(faces)
+    if batch is None:
+        return results
     
-    print("GAGAL: Tidak dapat membuka kamera manapun")
-    return None
+    matches = gallery.best_matches(extract_embeddings(batch))
+    for index, match in zip(valid_indices, matches):
+        results[index] = match
+    return results
 
 def main():
     # Muat embedding dari file
@@ -46,16 +64,21 @@ def main():
         return
     
     print(f"Memuat {len(embeddings_dict)} embedding dari {args.embeddings}")
+    gallery = attach_ann_index(Gallery(embeddings_dict), args.embeddings)
     
     # Inisialisasi kamera
-    cap = initialize_camera()
-    if not cap:
+    camera = initialize_camera()
+    if not camera:
         print("Tidak dapat membuka kamera. Program dihentikan.")
         return
+    cap = camera.handle()
     
     # Setup tampilan jendela
     cv2.namedWindow('Pengenalan Wajah', cv2.WINDOW_NORMAL)
     
+    # Mode satu wajah: MTCNN hanya dijalankan berkala; di antaranya wajah diikuti dengan optical flow
+    tracker = FaceTracker()
+    
     # FPS counter
     fps_counter = 0
     fps_start_time = time.time()
@@ -65,11 +88,11 @@ def main():
     print("Tekan 'q' untuk keluar.")
     
     while True:
-        # Baca frame dari kamera
-        ret, frame = cap.read()
-        if not ret:
+        # Frame terbaru dari grabber (view read-only tanpa salinan)
+        timestamp, frame = cap.latest()
+        if frame is None:
             print("Gagal membaca frame dari kamera!")
-            break
+            continue
         
         # Update FPS counter
         fps_counter += 1
@@ -78,59 +101,49 @@ def main():
             fps_counter = 0
             fps_start_time = time.time()
         
-        # Deteksi wajah dengan MTCNN
-        face_img, bbox = detect_face_mtcnn(frame)
+        # Deteksi wajah: semua wajah dengan satu kali MTCNN, atau wajah utama dengan tracking
+        if args.max_faces > 1:
+            faces, bboxes, landmarks = detect_faces_mtcnn(frame, max_faces=args.max_faces)
+        else:
+            face_img, bbox = tracker.update(frame)
+            faces, bboxes, landmarks = ([face_img], [bbox], [tracker.landmarks]) if bbox is not None else ([], [], [])
         
-        if bbox is not None:
-            # Hitung orientasi wajah
-            pitch, yaw, roll = calculate_face_orientation(bbox, frame.shape)
-            
-            # Gambar kotak wajah dan orientasi
-            if args.show_angles:
-                frame = draw_face_orientation(frame, bbox, pitch, yaw, roll)
-            else:
-                frame = draw_face_box(frame, bbox)
-            
-            # Cek apakah wajah frontal
-            frontal = is_face_frontal(pitch, yaw, roll)
+        # Anotasi digambar pada salinan; frame di ring buffer tetap utuh
+        frame = frame.copy()
+        
+        if bboxes:
+            # Hitung orientasi semua wajah; hanya wajah frontal yang dikenali
+            poses = face_poses(bboxes, landmarks, frame.shape)
+            frontal = [i for i, pose in enumerate(poses) if is_face_frontal(*pose)]
             
-            # Tampilkan status frontal
-            frontal_text = "FRONTAL" if frontal else "TIDAK FRONTAL"
-            frontal_color = (0, 255, 0) if frontal else (0, 0, 255)
-            cv2.putText(frame, frontal_text, (frame.shape[1] - 150, 30), 
-                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, frontal_color, 2)
+            # Satu forward pass ber-batch dan satu pencocokan matriks untuk semua wajah frontal
+            matches = dict(zip(frontal, identify_faces([faces[i] for i in frontal], gallery)))
             
-            # Jika wajah frontal, lakukan pengenalan
-            if frontal:
-                # Pra-pemrosesan wajah
-                face_tensor = preprocess_face(face_img)
+            for i, bbox in enumerate(bboxes):
+                if args.show_angles:
+                    frame = draw_face_orientation(frame, bbox, *poses[i])
                 
-                if face_tensor is not None:
-                    # Ekstrak embedding
-                    embedding = extract_embedding(face_tensor)
-                    
-                    # Cari kecocokan terbaik
-                    best_match_name = None
-                    best_match_score = 0
-                    
-                    for name, embeddings_list in embeddings_dict.items():
-                        for ref_embedding in embeddings_list:
-                            similarity = compute_similarity(embedding, ref_embedding)
-                            
-                            if similarity > best_match_score:
-                                best_match_score = similarity
-                                best_match_name = name
-                    
-                    # Tampilkan hasil
-                    if best_match_score >= args.threshold:
-                        result_text = f"{best_match_name}: {best_match_score:.4f}"
-                        result_color = (0, 255, 0)  # Hijau untuk kecocokan
-                    else:
-                        result_text = f"Unknown: {best_match_score:.4f}"
-                        result_color = (0, 0, 255)  # Merah untuk tidak dikenal
-                    
-                    cv2.putText(frame, result_text, (10, 30), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, result_color, 2)
+                match = matches.get(i)
+                if i not in matches:
+                    result_text = "TIDAK FRONTAL"
+                    result_color = (0, 165, 255)
+                elif match is None:
+                    frame = draw_face_box(frame, bbox)
+                    continue
+                elif match[1] >= args.threshold:
+                    result_text = f"{match[0]}: {match[1]:.4f}"
+                    result_color = (0, 255, 0)  # Hijau untuk kecocokan
+                else:
+                    result_text = f"Unknown: {match[1]:.4f}"
+                    result_color = (0, 0, 255)  # Merah untuk tidak dikenal
+                
+                x1, y1, x2, y2 = bbox
+                cv2.rectangle(frame, (x1, y1), (x2, y2), result_color, 2)
+                cv2.putText(frame, result_text, (x1, max(15, y1 - 10)), 
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.6, result_color, 2)
+            
+            cv2.putText(frame, f"Wajah: {len(bboxes)} (frontal {len(frontal)})", (10, 30), 
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
         
         # Tampilkan FPS jika diaktifkan
         if args.show_fps:
@@ -145,7 +158,7 @@ def main():
             break
     
     # Bersihkan
-    cap.release()
+    camera.close()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
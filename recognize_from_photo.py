@@ -3,8 +3,8 @@ import numpy as np
 import argparse
 import os
 import time
-from mtcnn_utils import detect_face_mtcnn, draw_face_box
-from arcface_utils import preprocess_face, extract_embedding, compute_similarity, load_embeddings
+from mtcnn_utils import detect_face_aligned, draw_face_box
+from arcface_utils import preprocess_face, extract_embedding, load_embeddings, Gallery
 from head_pose import calculate_face_orientation, draw_face_orientation, is_face_frontal
 
 # Parsing argumen
@@ -43,7 +43,7 @@ def main():
     
     # Deteksi wajah dengan MTCNN
     start_time = time.time()
-    face_img, bbox = detect_face_mtcnn(image)
+    face_img, bbox, landmarks = detect_face_aligned(image)
     detection_time = time.time() - start_time
     
     # Hasil gambar untuk output (deep copy dari gambar asli)
@@ -60,7 +60,7 @@ def main():
         # Jika diaktifkan, hitung dan tampilkan orientasi wajah
         if args.show_angles:
             # Hitung orientasi wajah
-            pitch, yaw, roll = calculate_face_orientation(bbox, image.shape)
+            pitch, yaw, roll = calculate_face_orientation(bbox, image.shape, landmarks)
             
             # Gambar visualisasi orientasi
             result_image = draw_face_orientation(result_image, bbox, pitch, yaw, roll)
@@ -90,15 +90,9 @@ def main():
             print(f"Embedding diekstrak dalam {embedding_time:.3f} detik")
             
             # Bandingkan dengan embedding di database
-            best_match_name = None
-            best_match_similarity = 0
-            
             start_time = time.time()
-            for name, stored_embedding in embeddings_dict.items():
-                similarity = compute_similarity(face_embedding, stored_embedding)
-                if similarity > best_match_similarity:
-                    best_match_similarity = similarity
-                    best_match_name = name
+            gallery = Gallery(embeddings_dict)
+            best_match_name, best_match_similarity = gallery.best_match(face_embedding)
             
             matching_time = time.time() - start_time
             print(f"Pencocokan selesai dalam {matching_time:.3f} detik")
@@ -0,0 +1,203 @@
+import os
+import cv2
+import time
+import queue
+import datetime
+import threading
+import numpy as np
+
+import mtcnn_utils
+from face_quality import quality_gate
+from camera_service import CAMERA_PREROLL_SECONDS
+
+# Panjang pre-roll yang diperiksa saat penolakan (detik sebelum kejadian)
+EVIDENCE_PREROLL_SECONDS = CAMERA_PREROLL_SECONDS
+
+# Jumlah frame pre-roll maksimal yang dijalankan MTCNN (diambil merata, termasuk yang terbaru)
+EVIDENCE_MAX_CANDIDATES = 10
+
+# Jumlah kejadian yang boleh mengantre; kejadian berikutnya dibuang jika antrean penuh
+EVIDENCE_QUEUE_SIZE = 4
+
+EVIDENCE_DIR = 'unknown_faces'
+
+def sample_frames(frames, max_candidates=EVIDENCE_MAX_CANDIDATES):
+    """Mengambil paling banyak max_candidates frame secara merata (frame terbaru selalu ikut)"""
+    if len(frames) <= max_candidates:
+        return list(frames)
+    indices = np.linspace(len(frames) - 1, 0, max_candidates).round().astype(int)
+    return [frames[i] for i in sorted(set(indices))]
+
+def score_frame(frame):
+    """
+    Menilai satu frame sebagai bukti wajah
+
+    Skor = probabilitas deteksi MTCNN x log(1 + ketajaman crop wajah), sehingga wajah
+    yang jelas terdeteksi dan tidak buram karena gerakan dipilih.
+
+    Returns:
+        tuple: (skor, bbox, probabilitas, ketajaman), None jika tidak ada wajah
+    """
+    boxes, probs = mtcnn_utils.detect_boxes(frame)
+    if boxes is None or len(boxes) == 0:
+        return None
+
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = [int(coord) for coord in boxes[0]]
+    x1, y1, x2, y2 = max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+    if x2 <= x1 or y2 <= y1:
+        return None
+
+    prob = float(probs[0]) if probs is not None and probs[0] is not None else 0.0
+    sharpness = quality_gate.score(frame[y1:y2, x1:x2])['sharpness']
+    return prob * np.log1p(sharpness), [x1, y1, x2, y2], prob, sharpness
+
+def select_best_frame(frames, max_candidates=EVIDENCE_MAX_CANDIDATES):
+    """
+    Memilih frame wajah terbaik dari pre-roll
+
+    Args:
+        frames (list): Frame BGR terurut dari yang terlama
+        max_candidates (int): Jumlah frame maksimal yang diperiksa
+
+    Returns:
+        tuple: (frame, bbox, probabilitas, ketajaman), (None, None, 0.0, 0.0) jika tidak ada wajah
+    """
+    best = (None, None, 0.0, 0.0)
+    best_score = -1.0
+    for frame in sample_frames(frames, max_candidates):
+        result = score_frame(frame)
+        if result is None:
+            continue
+        score, bbox, prob, sharpness = result
+        if score > best_score:
+            best_score = score
+            best = (frame, bbox, prob, sharpness)
+    return best
+
+def annotate_evidence(frame, bbox, timestamp):
+    """Salinan frame dengan kotak wajah, label UNKNOWN, dan timestamp"""
+    frame = mtcnn_utils.draw_face_box(frame.copy(), bbox)
+    cv2.putText(frame, "UNKNOWN", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+    cv2.putText(frame, timestamp, (10, frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+    return frame
+
+class EvidenceRecorder:
+    """
+    Penyimpan bukti wajah tidak dikenal di background
+
+    submit() hanya memasukkan frame pre-roll (view dari ring buffer kamera, tanpa salinan)
+    ke antrean dan langsung kembali, sehingga loop pintu bisa segera memindai lagi.
+    Satu thread worker memilih frame terbaik (select_best_frame), menyimpannya sebagai
+    JPEG, lalu memanggil callback on_saved(image_path) dari thread worker.
+    """
+
+    def __init__(self, max_candidates=EVIDENCE_MAX_CANDIDATES, queue_size=EVIDENCE_QUEUE_SIZE):
+        self.max_candidates = max_candidates
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Statistik
+        self.saved = 0
+        self.no_face = 0
+        self.dropped = 0
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="unknown-evidence")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def submit(self, frames, output_dir=EVIDENCE_DIR, on_saved=None):
+        """
+        Menjadwalkan penyimpanan bukti dari frame pre-roll
+
+        Args:
+            frames (list): Frame BGR terurut dari yang terlama
+            output_dir (str): Folder tujuan
+            on_saved (callable, optional): Dipanggil dengan path gambar setelah tersimpan
+
+        Returns:
+            str: Path gambar yang akan ditulis, None jika tidak ada frame atau antrean penuh
+        """
+        if not frames:
+            return None
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        image_path = os.path.join(output_dir, f"unknown_{timestamp}.jpg")
+        try:
+            self._queue.put_nowait((list(frames), image_path, timestamp, on_saved))
+        except queue.Full:
+            self.dropped += 1
+            print("[!] Antrean bukti wajah tidak dikenal penuh, kejadian dilewati")
+            return None
+
+        self._ensure_worker()
+        return image_path
+
+    def _run(self):
+        while True:
+            frames, image_path, timestamp, on_saved = self._queue.get()
+            try:
+                self.save(frames, image_path, timestamp, on_saved)
+            except Exception as e:
+                print(f"[!] Gagal menyimpan bukti wajah tidak dikenal: {e}")
+            finally:
+                self._queue.task_done()
+
+    def save(self, frames, image_path, timestamp, on_saved=None):
+        """
+        Memilih frame terbaik dan menyimpannya (dijalankan oleh worker)
+
+        Returns:
+            bool: True jika bukti tersimpan
+        """
+        start = time.perf_counter()
+        frame, bbox, prob, sharpness = select_best_frame(frames, self.max_candidates)
+        if frame is None:
+            self.no_face += 1
+            print(f"[!] Tidak ada wajah terdeteksi di {len(frames)} frame pre-roll")
+            return False
+
+        os.makedirs(os.path.dirname(image_path) or '.', exist_ok=True)
+        cv2.imwrite(image_path, annotate_evidence(frame, bbox, timestamp))
+        self.saved += 1
+        print(f"[+] Bukti wajah tidak dikenal disimpan: {image_path} "
+              f"(prob {prob:.2f}, ketajaman {sharpness:.0f}, {(time.perf_counter() - start) * 1000:.0f} ms)")
+
+        if on_saved is not None:
+            on_saved(image_path)
+        return True
+
+    def wait(self):
+        """Menunggu semua kejadian di antrean selesai diproses"""
+        self._queue.join()
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+def get_evidence_recorder():
+    """EvidenceRecorder bersama untuk proses ini"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = EvidenceRecorder()
+    return _recorder
+
+def preroll_frames(camera, seconds=EVIDENCE_PREROLL_SECONDS):
+    """
+    Frame pre-roll dari handle kamera (CameraHandle)
+
+    Tanpa grabber atau jika ring buffer masih kosong, frame terbaru dibaca sekali.
+
+    Returns:
+        list: Frame BGR terurut dari yang terlama
+    """
+    frames = [frame for _, frame in camera.frames_since(time.monotonic() - seconds)]
+    if not frames:
+        _, frame = camera.latest()
+        if frame is not None:
+            frames = [frame]
+    return frames